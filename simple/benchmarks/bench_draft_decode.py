@@ -0,0 +1,90 @@
+"""Compare plain decode+LANCZOS against the draft/reduce-aware loaders in src.imaging.
+
+Run from the `simple/` directory:
+
+    python -m benchmarks.bench_draft_decode [--megapixels 24 45] [--repeat 5]
+
+Each case runs in a fresh subprocess so its peak RSS can be reported on its own.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from PIL import Image
+
+from benchmarks.common import make_image, peak_rss_mb
+
+THUMB_TARGET = (200, 200)
+VIEWER_TARGET = (1200, 700)
+
+
+def _run_case(path: str, mode: str, target: Tuple[int, int], repeat: int) -> Dict[str, float]:
+    from src.imaging import fit_size, make_thumbnail, open_image_for_screen
+
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if mode == "plain":
+            img = Image.open(path)
+            img.load()
+            img = img.resize(fit_size(img.size, target), Image.LANCZOS)
+        elif target == THUMB_TARGET:
+            img = make_thumbnail(path, target)
+        else:
+            img = open_image_for_screen(path, target)
+        timings.append(time.perf_counter() - start)
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=int, nargs="+", default=[24, 45])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "photo_selector_bench"))
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--case", nargs=4, metavar=("PATH", "MODE", "WIDTH", "HEIGHT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        path, mode, width, height = args.case
+        print(json.dumps(_run_case(path, mode, (int(width), int(height)), args.repeat)))
+        return
+
+    os.makedirs(args.fixtures, exist_ok=True)
+    results = []
+    for megapixels in args.megapixels:
+        path = make_image(args.fixtures, megapixels)
+        for target_name, target in (("thumbnail", THUMB_TARGET), ("viewer", VIEWER_TARGET)):
+            for mode in ("plain", "draft"):
+                out = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_draft_decode", "--repeat", str(args.repeat),
+                     "--case", path, mode, str(target[0]), str(target[1])],
+                    check=True, capture_output=True, text=True,
+                )
+                row = {"megapixels": megapixels, "target": target_name, "mode": mode}
+                row.update(json.loads(out.stdout))
+                results.append(row)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'MP':>4} {'target':<10} {'mode':<6} {'median ms':>10} {'min ms':>8} {'peak RSS MB':>12}")
+    for row in results:
+        print(
+            f"{row['megapixels']:>4} {row['target']:<10} {row['mode']:<6} "
+            f"{row['median_ms']:>10.1f} {row['min_ms']:>8.1f} {row['peak_rss_mb']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Cold-start import cost of the GUI, held to a budget.
+
+Run from the `simple/` directory; no display is needed:
+
+    python -m benchmarks.bench_startup [--repeat 5] [--budget-ms 500] [--json]
+
+Each run is a fresh interpreter importing `src.app` under `-X importtime`. The
+report gives the median import time, the slowest modules, and any heavy optional
+module (rawpy, numpy, sqlite3, multiprocessing) that got imported at startup instead of on
+first use. Exits with status 1 when the budget is exceeded or a heavy module leaks
+into startup, so it can gate changes.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from src.perf import STARTUP_BUDGET_MS
+
+# Optional or heavy modules that must only load on first use
+DEFERRED_MODULES = ("rawpy", "numpy", "sqlite3", "multiprocessing", "concurrent.futures.process")
+TOP_MODULES = 10
+
+
+def _import_profile() -> Tuple[float, Dict[str, float], List[str]]:
+    # (total ms, {module: cumulative ms}, deferred modules that were imported)
+    probe = (
+        "import json, sys, src.app; "
+        f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe], check=True, capture_output=True, text=True
+    )
+    cumulative: Dict[str, float] = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        try:
+            cumulative[name.strip()] = int(cumulative_us) / 1000
+        except ValueError:
+            continue
+    total = cumulative.get("src.app", 0.0)
+    return total, cumulative, json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    totals: List[float] = []
+    modules: Dict[str, List[float]] = {}
+    leaked: List[str] = []
+    for _ in range(args.repeat):
+        total, cumulative, deferred = _import_profile()
+        totals.append(total)
+        for name, ms in cumulative.items():
+            modules.setdefault(name, []).append(ms)
+        leaked = sorted(set(leaked) | set(deferred))
+
+    median = statistics.median(totals)
+    # Top-level packages only; their children are already inside the cumulative time
+    top = sorted(
+        ((name, statistics.median(values)) for name, values in modules.items() if "." not in name and name != "src"),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:TOP_MODULES]
+    result = {
+        "import_median_ms": median,
+        "import_min_ms": min(totals),
+        "budget_ms": args.budget_ms,
+        "within_budget": median <= args.budget_ms,
+        "deferred_modules_imported": leaked,
+        "slowest_modules": [{"module": name, "cumulative_ms": ms} for name, ms in top],
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import src.app: median {median:.0f} ms, min {min(totals):.0f} ms (budget {args.budget_ms:.0f} ms)")
+        for name, ms in top:
+            print(f"  {name:<28} {ms:>7.1f} ms")
+        if leaked:
+            print(f"Imported at startup but should load on first use: {', '.join(leaked)}")
+    if median > args.budget_ms or leaked:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import resource
+import shutil
+import sys
+from typing import List, Optional
+
+from PIL import Image
+
+
+# Fixture formats and the encoder options used for each
+FIXTURE_FORMATS = {
+    "jpeg": ("jpg", {"format": "JPEG", "quality": 92}),
+    "png": ("png", {"format": "PNG", "compress_level": 1}),
+    "tiff": ("tif", {"format": "TIFF"}),
+}
+RAW_SAMPLE_EXTENSIONS = {".nef", ".arw", ".cr2", ".cr3", ".dng", ".rw2", ".orf", ".raf"}
+SCAN_FILES_PER_DIR = 250
+
+
+def peak_rss_mb() -> float:
+    # VmHWM belongs to this process image; ru_maxrss on Linux survives exec() and would
+    # report the parent's peak from building the fixtures
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_image(directory: str, megapixels: float, fmt: str = "jpeg") -> str:
+    # 3:2 frame; gradient plus noise so encoders cannot shortcut flat blocks. Fixtures
+    # are deterministic and reused across runs.
+    extension, options = FIXTURE_FORMATS[fmt]
+    width = int((megapixels * 1_000_000 * 1.5) ** 0.5)
+    height = int(width / 1.5)
+    path = os.path.join(directory, f"fixture_{megapixels:g}mp.{extension}")
+    if not os.path.exists(path):
+        base = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+        noise = Image.effect_noise((width, height), 48).convert("RGB")
+        tmp_path = path + ".tmp"
+        Image.blend(base, noise, 0.35).save(tmp_path, **options)
+        os.replace(tmp_path, path)
+    return path
+
+
+def make_scan_folder(directory: str, count: int) -> str:
+    # A tree of `count` small JPEGs, SCAN_FILES_PER_DIR per subdirectory, plus a
+    # sidecar per directory for the scanner to skip
+    root = os.path.join(directory, f"scan_{count}")
+    marker = os.path.join(root, ".complete")
+    if os.path.exists(marker):
+        return root
+    shutil.rmtree(root, ignore_errors=True)
+    os.makedirs(root)
+    seed = os.path.join(root, ".seed.jpg")
+    Image.effect_noise((64, 43), 48).convert("RGB").save(seed, "JPEG", quality=80)
+    for start in range(0, count, SCAN_FILES_PER_DIR):
+        subdir = os.path.join(root, f"day_{start // SCAN_FILES_PER_DIR:04d}")
+        os.makedirs(subdir)
+        for i in range(start, min(count, start + SCAN_FILES_PER_DIR)):
+            shutil.copyfile(seed, os.path.join(subdir, f"IMG_{i:06d}.jpg"))
+        open(os.path.join(subdir, "notes.xmp"), "w").close()
+    os.remove(seed)
+    open(marker, "w").close()
+    return root
+
+
+def raw_samples(sample_dir: Optional[str]) -> List[str]:
+    # rawpy can only read RAWs, so RAW cases run on real camera files supplied by the user
+    if not sample_dir or not os.path.isdir(sample_dir):
+        return []
+    return sorted(
+        os.path.join(sample_dir, name)
+        for name in os.listdir(sample_dir)
+        if os.path.splitext(name)[1].lower() in RAW_SAMPLE_EXTENSIONS
+    )
@@ -0,0 +1,246 @@
+"""Benchmark suite for the scan, decode, thumbnail and viewer hot paths.
+
+Run from the `simple/` directory; no display is needed:
+
+    python -m benchmarks.suite [--quick] [--output results.json] [--compare baseline.json]
+
+Synthetic JPEG/PNG/TIFF fixtures are generated once under --fixtures (RAW cases
+run on camera files from --raw-samples when rawpy is installed). Each case runs
+in a fresh subprocess, so its peak RSS is its own, and the OS file cache is warm
+(every case decodes its file once before timing). Results are written as JSON with
+the commit and library versions; --compare prints the change against an earlier
+results file and exits with status 1 when a case got slower than --threshold.
+
+A case counts as slower only when both its fastest and its median repeat are more
+than --threshold (default 0.10, i.e. 10%) behind the baseline. Noise only ever adds
+time, so the fastest repeat is the stable figure; also requiring the median keeps one
+lucky baseline repeat from flagging a change. Compare runs from the same machine.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import PIL
+from PIL import Image
+
+from benchmarks.common import FIXTURE_FORMATS, make_image, make_scan_folder, peak_rss_mb, raw_samples
+
+VIEWER_TARGET = (1920, 1080)
+RESIZE_TARGET = (1200, 700)
+DEFAULT_MEGAPIXELS = [12, 24, 45]
+DEFAULT_FOLDER_SIZES = [1000, 10000]
+
+
+def _time(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    timings: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "mean_ms": statistics.fmean(timings) * 1000,
+    }
+
+
+def run_case(spec: Dict[str, Any]) -> Dict[str, Any]:
+    # Runs inside the case's own subprocess; imports stay here so RSS only counts them
+    from src.cli import scan_folder
+    from src.imaging import VIEWER_REDUCING_GAP, make_thumbnail, open_image_for_screen, open_image_full
+    from src.pyramid import ImagePyramid
+    from src.scanner import SCAN_INDEX_FILENAME
+    from src.thumbnails import THUMBNAIL_SIZE, cache_dir_for
+
+    kind, path, repeat = spec["case"], spec["path"], spec["repeat"]
+    result: Dict[str, Any] = {}
+    if kind == "scan":
+        index_path = os.path.join(cache_dir_for(path), SCAN_INDEX_FILENAME)
+
+        def _drop_index() -> None:
+            try:
+                os.remove(index_path)
+            except FileNotFoundError:
+                pass
+
+        found = len(scan_folder(path)[0])
+        result.update(_time(lambda: scan_folder(path), repeat, _drop_index if spec["variant"] == "cold" else None))
+        result["files"] = found
+    elif kind == "thumbnail":
+        make_thumbnail(path, THUMBNAIL_SIZE)
+        result.update(_time(lambda: make_thumbnail(path, THUMBNAIL_SIZE), repeat))
+    elif kind == "full_decode":
+        open_image_full(path).load()
+        result.update(_time(lambda: open_image_full(path).load(), repeat))
+    elif kind == "viewer":
+        open_image_for_screen(path, VIEWER_TARGET)
+        result.update(_time(lambda: open_image_for_screen(path, VIEWER_TARGET), repeat))
+    elif kind == "resize":
+        # The viewer's _resize_to_fit on an already decoded image, fresh pyramid each time
+        img = open_image_full(path)
+        img.load()
+        resample = Image.LANCZOS if spec["variant"] == "lanczos" else Image.BILINEAR
+        gap = VIEWER_REDUCING_GAP if resample == Image.LANCZOS else 1.0
+        result.update(_time(lambda: ImagePyramid(img).resize_to_fit(*RESIZE_TARGET, resample, gap), repeat))
+        result["throughput_mp_s"] = img.width * img.height / 1e6 / (result["median_ms"] / 1000)
+    else:
+        raise ValueError(f"Unknown case {kind}")
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def build_cases(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    cases: List[Dict[str, Any]] = []
+    for count in args.folder_sizes:
+        root = make_scan_folder(args.fixtures, count)
+        for variant in ("cold", "warm"):
+            cases.append({"case": "scan", "variant": variant, "format": "jpeg", "size": f"{count} files", "path": root})
+    for fmt in args.formats:
+        for megapixels in args.megapixels:
+            path = make_image(args.fixtures, megapixels, fmt)
+            size = f"{megapixels:g}mp"
+            for kind in ("thumbnail", "full_decode", "viewer"):
+                cases.append({"case": kind, "variant": "", "format": fmt, "size": size, "path": path})
+            if fmt == "jpeg":
+                for variant in ("lanczos", "bilinear"):
+                    cases.append({"case": "resize", "variant": variant, "format": fmt, "size": size, "path": path})
+    samples = raw_samples(args.raw_samples) if importlib.util.find_spec("rawpy") is not None else []
+    for path in samples:
+        for kind in ("thumbnail", "full_decode", "viewer"):
+            cases.append({"case": kind, "variant": "", "format": "raw", "size": os.path.basename(path), "path": path})
+    return cases
+
+
+def case_key(row: Dict[str, Any]) -> str:
+    return "/".join(part for part in (row["case"], row["variant"], row["format"], row["size"]) if part)
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+    versions: Dict[str, Optional[str]] = {"pillow": PIL.__version__}
+    for module in ("rawpy", "numpy"):
+        try:
+            versions[module] = getattr(__import__(module), "__version__", "unknown")
+        except ImportError:
+            versions[module] = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def _change(row: Dict[str, Any], before: Dict[str, Any], key: str) -> float:
+    # Relative change of one timing; older results files may lack min_ms
+    old, new = before.get(key, before["median_ms"]), row.get(key, row["median_ms"])
+    return new / old - 1 if old else 0.0
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> int:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {case_key(row): row for row in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nAgainst {baseline_path} (regression threshold {threshold:.0%}):")
+    for row in results:
+        key = case_key(row)
+        before = baseline.get(key)
+        if before is None:
+            print(f"  {key:<40} new")
+            continue
+        change = _change(row, before, "min_ms")
+        median_change = _change(row, before, "median_ms")
+        flag = ""
+        if change > threshold and median_change > threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif change < -threshold and median_change < -threshold:
+            flag = "  faster"
+        print(
+            f"  {key:<40} min {before.get('min_ms', before['median_ms']):>9.1f} -> "
+            f"{row.get('min_ms', row['median_ms']):>9.1f} ms  {change:+7.1%}  median {median_change:+7.1%}{flag}"
+        )
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="one size of everything, 3 repeats")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=None)
+    parser.add_argument("--folder-sizes", type=int, nargs="+", default=None)
+    parser.add_argument("--formats", nargs="+", choices=sorted(FIXTURE_FORMATS), default=sorted(FIXTURE_FORMATS))
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "photo_selector_bench"))
+    parser.add_argument("--raw-samples", help="directory of camera RAW files for the RAW cases")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON from an earlier run")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10,
+        help="relative slowdown of both the min and the median time counted as a regression (default 0.10)",
+    )
+    parser.add_argument("--clean", action="store_true", help="delete generated fixtures first")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+
+    if args.megapixels is None:
+        args.megapixels = DEFAULT_MEGAPIXELS[:1] if args.quick else DEFAULT_MEGAPIXELS
+    if args.folder_sizes is None:
+        args.folder_sizes = DEFAULT_FOLDER_SIZES[:1] if args.quick else DEFAULT_FOLDER_SIZES
+    if args.repeat is None:
+        args.repeat = 3 if args.quick else 5
+    if args.clean:
+        shutil.rmtree(args.fixtures, ignore_errors=True)
+    os.makedirs(args.fixtures, exist_ok=True)
+
+    results: List[Dict[str, Any]] = []
+    print(f"{'case':<40} {'median ms':>10} {'min ms':>9} {'peak RSS MB':>12}", file=sys.stderr)
+    for spec in build_cases(args):
+        spec["repeat"] = args.repeat
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", "--case", json.dumps(spec)],
+            check=True, capture_output=True, text=True,
+        )
+        row = {key: spec[key] for key in ("case", "variant", "format", "size")}
+        row["repeat"] = args.repeat
+        row.update(json.loads(out.stdout.strip().splitlines()[-1]))
+        results.append(row)
+        extra = f"  {row['throughput_mp_s']:.0f} MP/s" if "throughput_mp_s" in row else ""
+        print(
+            f"{case_key(row):<40} {row['median_ms']:>10.1f} {row['min_ms']:>9.1f} {row['peak_rss_mb']:>12.1f}{extra}",
+            file=sys.stderr,
+        )
+
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        sys.exit(compare(results, args.compare, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
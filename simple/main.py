@@ -1,5 +1,13 @@
-from src.app import run_app
+import sys
+import time
+
+STARTED = time.perf_counter()
 
 
 if __name__ == "__main__":
-	run_app()
+	if len(sys.argv) > 1:
+		# Batch commands (see src/cli.py) never import tkinter
+		from src.cli import main
+		sys.exit(main())
+	from src.app import run_app
+	run_app(STARTED)
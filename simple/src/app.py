@@ -1,45 +1,111 @@
-import os
 import csv
+import os
+import queue
 import sys
-import io
+import threading
+import time
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from collections import OrderedDict
+from concurrent.futures import Executor
+from tkinter import ttk, filedialog, messagebox, simpledialog
 from PIL import Image, ImageTk
-from typing import List, Optional
-
-try:
-    import rawpy  # type: ignore
-    HAS_RAWPY = True
-except Exception:
-    rawpy = None  # type: ignore
-    HAS_RAWPY = False
-
-
-IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tiff", ".webp"}
-RAW_EXTENSIONS = {".nef", ".arw", ".cr2", ".cr3", ".dng", ".rw2", ".orf", ".raf", ".srw", ".pef", ".erf", ".3fr", ".iiq", ".mos", ".mef", ".nrw"}
-SIDE_CAR_EXTENSIONS = {".xmp"}
-IMAGE_EXTENSIONS = IMAGE_EXTENSIONS.union(RAW_EXTENSIONS)
-DEFAULT_SCORE = 5
-CSV_FILENAME = "image_selections.csv"
-THUMB_SIZE = (200, 200)
-
-
-class ImageRecord:
-    def __init__(self, path: str) -> None:
-        self.path: str = path
-        self.filename: str = os.path.basename(path)
-        self.liked: bool = False
-        self.rejected: bool = False
-        self.score: int = DEFAULT_SCORE
-
-    def to_csv_row(self) -> List[str]:
-        return [
-            self.filename,
-            self.path,
-            "1" if self.liked else "0",
-            "1" if self.rejected else "0",
-            str(self.score),
-        ]
+from typing import Dict, List, Optional, Tuple
+
+from .catalog import Catalog, CatalogAnswer, CatalogRow, catalog_path, parse_query, sqlite3
+from .decode import DECODE_WORKERS, FocusIndexer, HashIndexer, ThumbnailLoader, create_executor, shutdown_executor
+from .export import EXPORT_HARDLINK, ExportOptions, Exporter, export_target_error, select_for_export
+from .focus import HAS_NUMPY, SOFT_FOCUS_RATIO, soft_frames
+from .imaging import (
+    EMBEDDED_PREVIEW_KEY,
+    RAW_MODE_FULL,
+    RAW_MODE_PREVIEW,
+    RAW_MODE_REFINE,
+    RAW_MODES,
+    VIEWER_REDUCING_GAP,
+    is_raw_path,
+    open_image_for_screen,
+    open_image_for_thumbnail,
+    open_image_full,
+)
+from .metadata import MetadataLoader, format_exif_summary
+from .perf import PERF, PERF_ENABLED, STARTUP_BUDGET_MS, span
+from .pyramid import PYRAMID_BUDGET_MB, ImagePyramid, PyramidBudget
+from .records import ImageRecord, RecordStore
+from .render import VIEWER_FAST_RESAMPLE, VIEWER_REFINE_DELAY_MS, ProgressiveRenderer
+from .scanner import ScanIndex, iter_image_batches, scan_sort_key
+from .selections import CSV_FILENAME, SelectionJournal, read_selections_csv, selection_key
+from .similarity import group_bursts
+from .thumbnails import THUMBNAIL_SIZE
+from .views import (
+    SORT_CAPTURE_TIME,
+    SORT_FILENAME,
+    SORT_SCAN,
+    SORT_SHARPNESS,
+    STATE_ALL,
+    STATE_LIKED,
+    STATE_NOT_REJECTED,
+    STATE_REJECTED,
+    STATE_UNMARKED,
+    RecordView,
+)
+from .viewer_cache import VIEWER_CACHE_MB, VIEWER_PREFETCH_AHEAD, VIEWER_PREFETCH_BEHIND, ViewerPrefetcher
+from .watcher import FolderChanges, FolderWatcher
+
+
+THUMB_SIZE = THUMBNAIL_SIZE
+THUMB_POLL_MS = 15
+THUMB_DRAIN_BATCH = 32
+# Upper bound on PhotoImages kept alive for the gallery
+THUMB_MEMORY_LIMIT = 400
+GALLERY_CELL_PAD = 8
+GALLERY_CELL_WIDTH = THUMB_SIZE[0] + 20 + 2 * GALLERY_CELL_PAD
+GALLERY_CELL_HEIGHT = THUMB_SIZE[1] + 44 + 2 * GALLERY_CELL_PAD
+GALLERY_SCROLL_STEP = GALLERY_CELL_HEIGHT // 4
+# Rows beyond the viewport that get canvas items / queued decodes
+GALLERY_OVERSCAN_ROWS = 1
+GALLERY_PREFETCH_ROWS = 6
+VIEWER_POLL_MS = 10
+SCAN_POLL_MS = 30
+# Watch mode (e.g. tethered shooting): on at startup when PHOTO_SELECTOR_WATCH=1
+WATCH_FOLDER = os.environ.get("PHOTO_SELECTOR_WATCH", "0") == "1"
+WATCH_POLL_MS = 250
+METADATA_POLL_MS = 100
+HASH_POLL_MS = 200
+FOCUS_POLL_MS = 200
+PERF_OVERLAY_MS = 1000
+EXPORT_POLL_MS = 200
+CATALOG_POLL_MS = 50
+# On quit, how long to let files being exported finish so the manifest records them
+EXPORT_CLOSE_TIMEOUT_SECONDS = 5.0
+COLLAPSE_BURSTS = os.environ.get("PHOTO_SELECTOR_COLLAPSE_BURSTS", "1") == "1"
+# Journal compaction into the CSV: after this many changes, or this long after the last one
+JOURNAL_COMPACT_EVERY = 200
+AUTOSAVE_IDLE_MS = 5000
+AUTOSAVE_RETRY_MS = 250
+# Default RAW viewer mode (see imaging.RAW_MODES) and how long to dwell before the full render
+RAW_VIEW_MODE = os.environ.get("PHOTO_SELECTOR_RAW_VIEW", RAW_MODE_REFINE)
+RAW_REFINE_DELAY_MS = 400
+# Gallery/viewer view choices, by the label shown in the toolbar
+VIEW_STATES = {
+    "All": STATE_ALL,
+    "Liked": STATE_LIKED,
+    "Rejected": STATE_REJECTED,
+    "Unmarked": STATE_UNMARKED,
+    "Not rejected": STATE_NOT_REJECTED,
+}
+VIEW_SCORE_RANGES = {
+    "Any score": (1, 5),
+    "Score 5": (5, 5),
+    "Score 4–5": (4, 5),
+    "Score 3–5": (3, 5),
+    "Score 1–3": (1, 3),
+}
+VIEW_SORTS = {
+    "Folder order": SORT_SCAN,
+    "Filename": SORT_FILENAME,
+    "Capture time": SORT_CAPTURE_TIME,
+    "Sharpness": SORT_SHARPNESS,
+}
 
 
 class ImageGalleryApp(tk.Tk):
@@ -48,19 +114,90 @@ class ImageGalleryApp(tk.Tk):
         self.title("Photo Selector")
         self.geometry("1200x800")
         self.minsize(900, 600)
+        # Put the empty window on screen before building menus, toolbar and state
+        self.update()
+        self.window_shown_at = time.perf_counter()
 
         self.folder_path: Optional[str] = None
-        self.images: List[ImageRecord] = []
+        self.images = RecordStore()
+        # What the gallery shows and the viewer steps through; current_index is a store index
+        self.view_state_var = tk.StringVar(self, value="All")
+        self.view_score_var = tk.StringVar(self, value="Any score")
+        self.view_sort_var = tk.StringVar(self, value="Folder order")
+        # EXIF capture time and camera settings by path, filled in by a background reader
+        self._metadata: Dict[str, Dict[str, object]] = {}
+        self._metadata_loader: Optional[MetadataLoader] = None
+        self.exif_overlay_var = tk.BooleanVar(self, value=False)
+        # Perceptual hashes by path, and the burst/near-duplicate stack each path is in
+        self._hashes: Dict[str, int] = {}
+        self._stacks: Dict[str, int] = {}
+        self._hash_indexer: Optional[HashIndexer] = None
+        self._stack_generation: int = 0
+        self._stack_results: "queue.Queue[Tuple[int, Dict[str, int]]]" = queue.Queue()
+        self.collapse_stacks_var = tk.BooleanVar(self, value=COLLAPSE_BURSTS)
+        # Sharpness scores by path, measured after hashing so thumbnails come first
+        self._focus: Dict[str, float] = {}
+        self._focus_indexer: Optional[FocusIndexer] = None
+        # Export of liked images to another folder; keeps running if another folder is opened
+        self._exporter: Optional[Exporter] = None
+        # Optional catalog of every folder opened (PHOTO_SELECTOR_CATALOG). A query result
+        # is shown like a folder, with folder_path None and each image's folder kept here.
+        self._catalog: Optional[Catalog] = self._open_catalog()
+        self._catalog_query: Optional[str] = None
+        self._catalog_folders: Dict[str, str] = {}
+        self._catalog_journals: Dict[str, SelectionJournal] = {}
+        self._view = self._new_view()
         self.current_index: int = 0
         self.photo_cache: List[ImageTk.PhotoImage] = []
-        self.thumb_cache: List[ImageTk.PhotoImage] = []
+        # Gallery thumbnails by path, least recently shown first
+        self.thumb_cache: "OrderedDict[str, Optional[ImageTk.PhotoImage]]" = OrderedDict()
+        self._decode_executor: Optional[Executor] = None
+        self._thumb_loader: Optional[ThumbnailLoader] = None
+        self._thumb_generation: int = 0
+        self._thumb_polling: bool = False
+        self._thumb_columns: int = 0
+        self._gallery_slots: Dict[int, Tuple[int, int, int, int]] = {}
+        self._gallery_free_slots: List[Tuple[int, int, int, int]] = []
+        self._gallery_refresh_pending: bool = False
         self.viewer_photo: Optional[ImageTk.PhotoImage] = None
         self.is_fullscreen: bool = False
         self.is_dirty: bool = False
+        self.journal: Optional[SelectionJournal] = None
+        # Journals of folders closed while their CSV was being written: the snapshot
+        # still to write (None once started), so exit can finish them
+        self._closed_journals: Dict[SelectionJournal, Optional[List[List[str]]]] = {}
+        # Folder scans run on a thread; a newer generation abandons an older scan
+        self._scan_generation: int = 0
+        self._scan_active_generation: int = -1
+        self._scan_skipped: int = 0
+        # Set when a scan stopped early: the CSV is then left alone, as saving a partial
+        # record list would drop the rest; changes stay in the journal
+        self._scan_incomplete: bool = False
+        self._autosave_after: Optional[str] = None
+        self._watcher: Optional[FolderWatcher] = None
+        self.watch_var = tk.BooleanVar(self, value=WATCH_FOLDER)
 
         # Cache the original PIL image for the current viewer to avoid re-decoding on resize
         self._current_viewer_original: Optional[Image.Image] = None
         self._current_viewer_path: Optional[str] = None
+        self._viewer_prefetcher: Optional[ViewerPrefetcher] = None
+        self._viewer_direction: int = 1
+        self._viewer_polling: bool = False
+        self._viewer_target_size: Tuple[int, int] = (1200, 700)
+        # Progressive rendering: what is on screen, and the pending LANCZOS refine
+        self._viewer_renderer: Optional[ProgressiveRenderer] = None
+        self._viewer_shown: Optional[Tuple[Image.Image, int, int]] = None
+        self._viewer_refine_after: Optional[str] = None
+        self._viewer_resize_pending: bool = False
+        self._viewer_pyramid: Optional[ImagePyramid] = None
+        self._pyramid_budget = PyramidBudget(PYRAMID_BUDGET_MB * 1024 * 1024)
+        self._raw_view_mode: str = RAW_VIEW_MODE if RAW_VIEW_MODE in RAW_MODES else RAW_MODE_REFINE
+        self.raw_view_mode_var = tk.StringVar(self, value=self._raw_view_mode)
+        # Hot-path timings (src/perf.py); recording is on while the readout is shown
+        self.perf_overlay_var = tk.BooleanVar(self, value=PERF_ENABLED)
+        self.perf_var = tk.StringVar(self, value="")
+        self.perf_label: Optional[ttk.Label] = None
+        self._perf_after: Optional[str] = None
 
         # Apply a visible, stable ttk theme and base styles
         self._apply_theme()
@@ -69,10 +206,11 @@ class ImageGalleryApp(tk.Tk):
         self._build_menubar()
         self.container = ttk.Frame(self)
         self.container.pack(fill=tk.BOTH, expand=True)
+        if self.perf_overlay_var.get():
+            self._on_perf_overlay_toggled()
         self.update_idletasks()
 
         self.gallery_canvas: Optional[tk.Canvas] = None
-        self.gallery_inner: Optional[ttk.Frame] = None
         self.gallery_scrollbar: Optional[ttk.Scrollbar] = None
 
         self.viewer_frame: Optional[ttk.Frame] = None
@@ -107,6 +245,19 @@ class ImageGalleryApp(tk.Tk):
         self.fullscreen_btn = ttk.Button(self.toolbar, text="Toggle Fullscreen (F11)", command=self.toggle_fullscreen)
         self.fullscreen_btn.pack(side=tk.LEFT, padx=6, pady=6)
 
+        for label, variable, choices in (
+            ("Show", self.view_state_var, VIEW_STATES),
+            ("", self.view_score_var, VIEW_SCORE_RANGES),
+            ("Sort", self.view_sort_var, VIEW_SORTS),
+        ):
+            if label:
+                ttk.Label(self.toolbar, text=label).pack(side=tk.LEFT, padx=(10, 2))
+            combo = ttk.Combobox(
+                self.toolbar, textvariable=variable, values=list(choices), state="readonly", width=12
+            )
+            combo.pack(side=tk.LEFT, padx=2, pady=6)
+            combo.bind("<<ComboboxSelected>>", lambda e: self._on_view_changed())
+
         self.status_var = tk.StringVar(value="No folder selected")
         self.status_label = ttk.Label(self.toolbar, textvariable=self.status_var, anchor=tk.W)
         self.status_label.pack(side=tk.RIGHT, padx=8)
@@ -115,7 +266,11 @@ class ImageGalleryApp(tk.Tk):
         menubar = tk.Menu(self)
         file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="Open…", command=self.open_folder_dialog, accelerator="Cmd+O")
+        file_menu.add_command(label="Open Catalog Query…", command=self.open_catalog_query)
         file_menu.add_command(label="Save CSV", command=self.save_csv, accelerator="Cmd+S")
+        file_menu.add_command(label="Export Liked Images…", command=self.export_liked)
+        file_menu.add_command(label="Cancel Export", command=self.cancel_export)
+        file_menu.add_command(label="Export Performance Trace…", command=self.export_perf_trace)
         file_menu.add_separator()
         file_menu.add_command(label="Quit", command=self._on_close, accelerator="Cmd+Q")
         menubar.add_cascade(label="File", menu=file_menu)
@@ -124,8 +279,26 @@ class ImageGalleryApp(tk.Tk):
         view_menu.add_command(label="Gallery", command=self.show_gallery)
         view_menu.add_command(label="Viewer", command=self.show_viewer_current)
         view_menu.add_command(label="Toggle Fullscreen", command=self.toggle_fullscreen, accelerator="F11")
+        view_menu.add_separator()
+        view_menu.add_checkbutton(label="Watch Folder for Changes", variable=self.watch_var, command=self._on_watch_toggled)
+        view_menu.add_checkbutton(label="Show EXIF in Viewer", variable=self.exif_overlay_var, command=self._on_exif_overlay_toggled)
+        view_menu.add_checkbutton(label="Collapse Bursts", variable=self.collapse_stacks_var, command=self._on_collapse_toggled)
+        view_menu.add_checkbutton(label="Show Performance Stats", variable=self.perf_overlay_var, command=self._on_perf_overlay_toggled)
+        view_menu.add_separator()
+        for label, mode in (
+            ("RAW: Embedded Preview", RAW_MODE_PREVIEW),
+            ("RAW: Preview, Then Full Render", RAW_MODE_REFINE),
+            ("RAW: Full Render", RAW_MODE_FULL),
+        ):
+            view_menu.add_radiobutton(
+                label=label, value=mode, variable=self.raw_view_mode_var, command=self._on_raw_view_mode_changed
+            )
         menubar.add_cascade(label="View", menu=view_menu)
 
+        select_menu = tk.Menu(menubar, tearoff=0)
+        select_menu.add_command(label="Reject Soft Frames…", command=self._reject_soft_frames)
+        menubar.add_cascade(label="Select", menu=select_menu)
+
         self.config(menu=menubar)
 
         # Bind common accelerators (macOS Command key)
@@ -140,53 +313,756 @@ class ImageGalleryApp(tk.Tk):
             return
         self.load_folder(selected)
 
-    def _should_skip_entry(self, entry: str, full_path: str) -> bool:
-        # Skip hidden entries, resource forks and sidecars
-        if entry.startswith("._"):
-            return True
-        if entry.startswith('.'):
-            return True
-        if not os.path.isfile(full_path):
-            return True
-        _, ext = os.path.splitext(entry)
-        if ext.lower() in SIDE_CAR_EXTENSIONS:
-            return True
-        return False
-
-    def _gather_images_recursive(self, root_folder: str) -> (List[ImageRecord], int):
-        images: List[ImageRecord] = []
+    def _gather_images_recursive(self, root_folder: str) -> Tuple[RecordStore, int]:
+        # Synchronous scan; load_folder streams the same walk from a background thread
+        images = RecordStore()
         skipped = 0
-        for dirpath, dirnames, filenames in os.walk(root_folder):
-            # Skip hidden directories
-            dirnames[:] = [d for d in dirnames if not d.startswith('.') and not d.startswith('._')]
-            for entry in sorted(filenames):
-                full_path = os.path.join(dirpath, entry)
-                if self._should_skip_entry(entry, full_path):
-                    skipped += 1
-                    continue
-                _, ext = os.path.splitext(entry)
-                if ext.lower() in IMAGE_EXTENSIONS:
-                    images.append(ImageRecord(full_path))
-                else:
-                    skipped += 1
+        index = ScanIndex(root_folder).load()
+        for paths, batch_skipped in iter_image_batches(root_folder, index):
+            images.extend(paths)
+            skipped += batch_skipped
+        index.save()
         return images, skipped
 
-    def load_folder(self, folder_path: str) -> None:
-        self.folder_path = folder_path
-        self.images = []
+    def _close_current(self) -> None:
+        # Snapshot the previous folder's selections before its records go away
+        if self.is_dirty:
+            self._flush_selections(closing=True)
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        self._close_catalog_journals()
+        self._catalog_query = None
+        self._catalog_folders = {}
+        self._stop_watching()
+        self._stop_metadata()
+        self._stop_hashing()
+        self._stop_focus()
+        self.images = RecordStore()
+        self._metadata = {}
+        self._hashes = {}
+        self._stacks = {}
+        self._focus = {}
+        self._view = self._new_view()
         self.photo_cache = []
-        self.thumb_cache = []
+        self.thumb_cache = OrderedDict()
         self.current_index = 0
+        self._current_viewer_original = None
+        self._current_viewer_path = None
+        # Abandon any half-finished scan, render or prefetch of the previous folder
+        if self._thumb_loader is not None:
+            self._thumb_loader.cancel()
+        if self._viewer_prefetcher is not None:
+            self._viewer_prefetcher.clear()
 
-        self.images, skipped = self._gather_images_recursive(folder_path)
+    def load_folder(self, folder_path: str) -> None:
+        self._close_current()
+        self.folder_path = folder_path
+        self._scan_generation += 1
+        generation = self._scan_generation
+        self._scan_active_generation = generation
+        self._scan_skipped = 0
+        self._scan_incomplete = False
+        self.journal = SelectionJournal(folder_path)
+        results: "queue.Queue[tuple]" = queue.Queue()
+        threading.Thread(
+            target=self._scan_worker,
+            args=(folder_path, generation, results),
+            name="folder-scan",
+            daemon=True,
+        ).start()
+
+        # The gallery fills in as batches arrive
+        self.status_var.set(f"Scanning {folder_path}…")
+        self.show_gallery()
+        # Bound now: a later load_folder must not poll this scan's queue as its own
+        self.after(SCAN_POLL_MS, lambda: self._poll_scan(generation, results))
+
+    def _scanning(self) -> bool:
+        return self._scan_active_generation == self._scan_generation
+
+    def _scan_worker(self, folder_path: str, generation: int, results: "queue.Queue[tuple]") -> None:
+        # Background thread: lists images and matches them to the saved CSV; records are
+        # only created on the Tk thread, which owns the store
+        try:
+            saved = read_selections_csv(os.path.join(folder_path, CSV_FILENAME))
+        except (OSError, ValueError, csv.Error) as ex:
+            print(f"Could not read saved selections in {folder_path}: {ex}")
+            saved = {}
+        restored = 0
+        try:
+            index = ScanIndex(folder_path).load()
+            for paths, skipped in iter_image_batches(folder_path, index):
+                if generation != self._scan_generation:
+                    return
+                selections = [saved.get(selection_key(path)) for path in paths]
+                restored += sum(1 for selection in selections if selection is not None)
+                results.put(("batch", paths, selections, skipped))
+            index.save()
+        except Exception as ex:
+            # Always end the scan, or the folder would stay "scanning" and never save
+            print(f"Scan of {folder_path} failed: {ex}")
+            results.put(("error", restored, len(saved), str(ex)))
+            return
+        results.put(("done", restored, len(saved)))
+
+    def _poll_scan(self, generation: int, results: "queue.Queue[tuple]") -> None:
+        if generation != self._scan_generation:
+            return
+        added = 0
+        finished = None
+        while True:
+            try:
+                message = results.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "batch":
+                self.images.extend(message[1], message[2])
+                self._view.extend()
+                self._scan_skipped += message[3]
+                added += len(message[1])
+            else:
+                finished = message
+        if added and self.gallery_canvas is not None and self.gallery_canvas.winfo_exists():
+            self._layout_gallery()
+        if finished is None:
+            if added:
+                self.status_var.set(f"Scanning {self.folder_path}… {len(self.images)} images")
+            self.after(SCAN_POLL_MS, lambda: self._poll_scan(generation, results))
+            return
 
-        self.status_var.set(f"Loaded {len(self.images)} images (skipped {skipped}) from {folder_path}")
+        self._scan_active_generation = -1
+        kind, restored, saved_count = finished[:3]
+        status = f"Loaded {len(self.images)} images (skipped {self._scan_skipped}) from {self.folder_path}"
+        status += self._restore_selections(restored, saved_count)
+        # Journal replay changed selections, and non-scan sorts need every record
+        self._view.rebuild()
+        self._relayout_gallery()
+        if kind == "error":
+            self._scan_incomplete = True
+            self.status_var.set(f"{status} • scan stopped early: {finished[3]}; the CSV will not be rewritten")
+            return
+        self.status_var.set(status)
+        # Synced again as EXIF and sharpness come in
+        self._sync_catalog()
+        if self.watch_var.get():
+            self._start_watching()
+        self._start_metadata()
+        self._start_hashing()
         if not self.images:
             messagebox.showinfo("No Images", "No supported images found in the selected folder.")
             self.show_empty_state()
-            return
 
+    def _restore_selections(self, restored: int, saved_count: int) -> str:
+        # The saved CSV was merged during the scan; now replay changes that never made it
+        # into it (e.g. after a crash). Returns a summary for the status bar.
+        if self.journal is None:
+            return ""
+        by_key = {selection_key(path): index for index, path in enumerate(self.images.paths())}
+
+        def _apply(path: str, liked: bool, rejected: bool, score: int) -> bool:
+            index = by_key.get(selection_key(path))
+            if index is None:
+                return False
+            self.images.set_selection(index, liked, rejected, score)
+            return True
+
+        recovered = self.journal.recover(_apply)
+        self.is_dirty = self.is_dirty or recovered > 0
+
+        summary = ""
+        if saved_count:
+            added = len(self.images) - restored
+            removed = saved_count - restored
+            summary += f" • restored {restored} selections ({added} new, {removed} missing files)"
+        if recovered:
+            summary += f" • recovered {recovered} unsaved changes"
+        return summary
+
+    # Catalog
+    def _open_catalog(self) -> Optional[Catalog]:
+        path = catalog_path()
+        if path is None:
+            return None
+        try:
+            return Catalog(path)
+        except (OSError, sqlite3.Error) as ex:
+            print(f"Catalog {path} unavailable: {ex}")
+            return None
+
+    def _sync_catalog(self) -> None:
+        # Also after the metadata and focus passes go idle: the catalog reads their caches
+        # Never a partial record list: the sync deletes rows for files it does not see
+        if self._scanning() or self._scan_incomplete:
+            return
+        if self._catalog is not None and self.folder_path and self.images:
+            self._catalog.sync_folder(self.folder_path, self.images.csv_rows())
+
+    def open_catalog_query(self) -> None:
+        if self._catalog is None:
+            messagebox.showinfo(
+                "No Catalog", "Start with PHOTO_SELECTOR_CATALOG=1 to keep a catalog of every folder you open."
+            )
+            return
+        text = simpledialog.askstring(
+            "Open Catalog Query",
+            "Images matching all of:\n"
+            "liked  rejected  unmarked  not-rejected  score=5  score>=4\n"
+            "date:2024  since:2024-03  until:2024-09\n"
+            "camera:…  lens:…  folder:…  name:…",
+            initialvalue=self._catalog_query or "liked score=5",
+            parent=self,
+        )
+        if not text:
+            return
+        try:
+            query = parse_query(text)
+        except ValueError as ex:
+            messagebox.showerror("Invalid Query", str(ex))
+            return
+        # The open folder's latest sync is queued first, so the result agrees with the gallery;
+        # a flush deferred behind a running CSV write still syncs the catalog now
+        if self.is_dirty:
+            self._flush_selections()
+        answers = self._catalog.submit_query(query)
+        generation = self._scan_generation
+        status = self.status_var.get()
+        self.status_var.set(f"Querying catalog for “{text}”…")
+        self.after(CATALOG_POLL_MS, lambda: self._poll_catalog_query(generation, text, answers, status))
+
+    def _poll_catalog_query(
+        self, generation: int, text: str, answers: "queue.Queue[CatalogAnswer]", status: str
+    ) -> None:
+        # Dropped if another folder or query was opened meanwhile
+        if generation != self._scan_generation:
+            return
+        try:
+            answer = answers.get_nowait()
+        except queue.Empty:
+            self.after(CATALOG_POLL_MS, lambda: self._poll_catalog_query(generation, text, answers, status))
+            return
+        self.status_var.set(status)
+        if answer.error is not None:
+            messagebox.showerror("Query Failed", answer.error)
+            return
+        if not answer.rows:
+            folders, images = answer.counts
+            messagebox.showinfo("No Matches", f"No images in the catalog ({images} images in {folders} folders) match.")
+            return
+        self.load_catalog_result(text, answer.rows, answer.truncated)
+
+    def load_catalog_result(self, text: str, rows: List[CatalogRow], truncated: bool) -> None:
+        self._close_current()
+        # Abandon a folder scan still running; the result replaces it
+        self._scan_generation += 1
+        self._scan_active_generation = -1
+        self.folder_path = None
+        self._catalog_query = text
+        self._catalog_folders = {row.path: row.folder for row in rows}
+        self.images.extend([row.path for row in rows], [(row.liked, row.rejected, row.score) for row in rows])
+        for row in rows:
+            if row.sharpness is not None:
+                self.images.set_sharpness(row.path, row.sharpness)
+                self._focus[row.path] = row.sharpness
+            if row.metadata:
+                self._metadata[row.path] = row.metadata
+        self._view.rebuild()
         self.show_gallery()
+        limit = f" (first {len(rows)})" if truncated else ""
+        self.status_var.set(f"Catalog query “{text}”{limit} • {self._count_text()}")
+
+    def _record_catalog_change(self, record: ImageRecord) -> None:
+        # Query results span folders: each change goes to the journal of the image's own
+        # folder, replayed into its CSV the next time that folder is opened
+        folder = self._catalog_folders.get(record.path)
+        if folder is None:
+            return
+        journal = self._catalog_journals.get(folder)
+        if journal is None:
+            journal = self._catalog_journals[folder] = SelectionJournal(folder)
+        journal.append(record.path, record.liked, record.rejected, record.score)
+        if self._catalog is not None:
+            self._catalog.update_selections([(record.path, record.liked, record.rejected, record.score)])
+
+    def _close_catalog_journals(self) -> None:
+        for journal in self._catalog_journals.values():
+            journal.close()
+        self._catalog_journals = {}
+
+    # Watch mode
+    def _on_watch_toggled(self) -> None:
+        if not self.watch_var.get():
+            self._stop_watching()
+        elif self.folder_path and not self._scanning():
+            self._start_watching()
+        # Otherwise the scan in progress starts watching when it finishes
+
+    def _start_watching(self) -> None:
+        self._stop_watching()
+        if not self.folder_path:
+            return
+        self._watcher = FolderWatcher(self.folder_path, self.images.paths()).start()
+        watcher = self._watcher
+        self.after(WATCH_POLL_MS, lambda: self._poll_watcher(watcher))
+
+    def _stop_watching(self) -> None:
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def _poll_watcher(self, watcher: FolderWatcher) -> None:
+        if watcher is not self._watcher:
+            return
+        while True:
+            try:
+                changes = watcher.changes.get_nowait()
+            except queue.Empty:
+                break
+            self._apply_folder_changes(changes)
+        self.after(WATCH_POLL_MS, lambda: self._poll_watcher(watcher))
+
+    def _apply_folder_changes(self, changes: FolderChanges) -> None:
+        # Patch the loaded folder in place: selections, cached thumbnails of untouched
+        # files and the viewer position all survive
+        current = self.images[self.current_index] if self.images else None
+        if changes.removed:
+            self.images.remove_paths(changes.removed)
+        stale = changes.removed + changes.changed
+        for path in stale:
+            self.thumb_cache.pop(path, None)
+            self._metadata.pop(path, None)
+        if self._metadata_loader is not None:
+            self._metadata_loader.enqueue(changes.added + changes.changed, refresh=True)
+        for path in changes.removed:
+            self._hashes.pop(path, None)
+            self._focus.pop(path, None)
+        if self._hash_indexer is not None:
+            self._hash_indexer.enqueue(changes.added + changes.changed)
+        if self._focus_indexer is not None:
+            self._focus_indexer.enqueue(changes.added + changes.changed)
+        if self._viewer_prefetcher is not None and stale:
+            self._viewer_prefetcher.forget(stale)
+        for path in changes.added:
+            self.images.insert(self._insertion_index(path), path)
+        # Store indices shifted
+        self._view.rebuild()
+
+        if current is not None and current.path not in changes.removed:
+            self.current_index = self.images.index(current)
+        else:
+            self.current_index = min(self.current_index, max(0, len(self.images) - 1))
+        if current is None or current.path in stale:
+            self._current_viewer_original = None
+            self._current_viewer_path = None
+
+        self.status_var.set(
+            f"Folder changed • {len(changes.added)} new, {len(changes.removed)} removed, "
+            f"{len(changes.changed)} updated • {self._count_text()}"
+        )
+        if self.gallery_canvas is not None and self.gallery_canvas.winfo_exists():
+            self._relayout_gallery()
+        elif self.viewer_label is not None and self.viewer_label.winfo_exists():
+            if self.images:
+                self._render_current_image()
+            else:
+                self.show_empty_state()
+
+    def _insertion_index(self, path: str) -> int:
+        # Binary search in scan order; keys are built only for the probed records
+        key = scan_sort_key(self.folder_path or "", path)
+        lo, hi = 0, len(self.images)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if scan_sort_key(self.folder_path or "", self.images[mid].path) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    # Filtered and sorted views
+    def _new_view(self) -> RecordView:
+        return RecordView(
+            self.images,
+            VIEW_STATES.get(self.view_state_var.get(), STATE_ALL),
+            VIEW_SCORE_RANGES.get(self.view_score_var.get(), (1, 5)),
+            VIEW_SORTS.get(self.view_sort_var.get(), SORT_SCAN),
+            capture_time=self._capture_time,
+            stack_of=self._stacks.get,
+            collapse=self.collapse_stacks_var.get(),
+        )
+
+    def _capture_time(self, path: str) -> float:
+        # Never touches the file; images whose metadata is not read yet sort last
+        meta = self._metadata.get(path)
+        if meta is not None:
+            stamp = meta.get("time", meta.get("file_time"))
+            if isinstance(stamp, (int, float)):
+                return float(stamp)
+        return float("inf")
+
+    def _on_view_changed(self) -> None:
+        self._view.configure(
+            VIEW_STATES.get(self.view_state_var.get(), STATE_ALL),
+            VIEW_SCORE_RANGES.get(self.view_score_var.get(), (1, 5)),
+            VIEW_SORTS.get(self.view_sort_var.get(), SORT_SCAN),
+        )
+        self.status_var.set(f"Showing {self._count_text()}")
+        if self.gallery_canvas is not None and self.gallery_canvas.winfo_exists():
+            self.gallery_canvas.yview_moveto(0)
+            self._relayout_gallery()
+        elif self.viewer_label is not None and self.viewer_label.winfo_exists() and self.images:
+            # Stay on the current image; prev/next now move within the new view
+            self._render_current_image()
+
+    def _count_text(self) -> str:
+        if self._view.filtered:
+            text = f"{self._view.count} of {len(self.images)} images"
+        else:
+            text = f"{len(self.images)} images"
+        if len(self._view) < self._view.count:
+            text += f" in {len(self._view)} stacks"
+        return text
+
+    def _gallery_record(self, idx: int) -> ImageRecord:
+        # Gallery cells are numbered by view position
+        return self.images[self._view[idx]]
+
+    # Burst and near-duplicate stacks
+    def _start_hashing(self) -> None:
+        self._stop_hashing()
+        if not self.folder_path or not self.images:
+            return
+        self._get_thumb_loader()
+        assert self._decode_executor is not None
+        self._hash_indexer = HashIndexer(self._decode_executor, self.folder_path, THUMB_SIZE).start(self.images.paths())
+        indexer = self._hash_indexer
+        self.after(HASH_POLL_MS, lambda: self._poll_hashes(indexer))
+
+    def _stop_hashing(self) -> None:
+        # Also drops any regrouping still running for the previous folder
+        self._stack_generation += 1
+        if self._hash_indexer is not None:
+            self._hash_indexer.stop()
+            self._hash_indexer = None
+
+    def _poll_hashes(self, indexer: HashIndexer) -> None:
+        if indexer is not self._hash_indexer:
+            return
+        idle = False
+        while True:
+            try:
+                batch = indexer.results.get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                idle = True
+                continue
+            for path, value in batch:
+                if value is None:
+                    self._hashes.pop(path, None)
+                else:
+                    self._hashes[path] = value
+        while True:
+            try:
+                generation, stacks = self._stack_results.get_nowait()
+            except queue.Empty:
+                break
+            self._apply_stacks(generation, stacks)
+        if idle:
+            self._regroup_stacks()
+            if self._focus_indexer is None:
+                self._start_focus()
+        self.after(HASH_POLL_MS, lambda: self._poll_hashes(indexer))
+
+    def _regroup_stacks(self) -> None:
+        # Group on a thread from a snapshot in capture order; _poll_hashes applies it
+        self._stack_generation += 1
+        generation = self._stack_generation
+        paths = sorted(self.images.paths(), key=self._capture_time)
+        hashes = [self._hashes.get(path) for path in paths]
+        times = [self._capture_time(path) for path in paths]
+
+        def _work() -> None:
+            groups = group_bursts(hashes, times)
+            stacks = {paths[i]: root for i, root in groups.items()}
+            self._stack_results.put((generation, stacks))
+
+        threading.Thread(target=_work, name="burst-group", daemon=True).start()
+
+    def _apply_stacks(self, generation: int, stacks: Dict[str, int]) -> None:
+        if generation != self._stack_generation or stacks == self._stacks:
+            return
+        self._stacks = stacks
+        self._view.stack_of = self._stacks.get
+        self._view.rebuild()
+        if self._stacks:
+            self.status_var.set(f"Found {len(set(self._stacks.values()))} bursts • {self._count_text()}")
+        self._relayout_gallery()
+
+    def _on_collapse_toggled(self) -> None:
+        self._view.configure(collapse=self.collapse_stacks_var.get())
+        self.status_var.set(f"Showing {self._count_text()}")
+        self._relayout_gallery()
+
+    # Sharpness
+    def _start_focus(self) -> None:
+        self._stop_focus()
+        if not HAS_NUMPY or not self.folder_path or not self.images:
+            return
+        self._get_thumb_loader()
+        assert self._decode_executor is not None
+        self._focus_indexer = FocusIndexer(self._decode_executor, self.folder_path).start(self.images.paths())
+        indexer = self._focus_indexer
+        self.after(FOCUS_POLL_MS, lambda: self._poll_focus(indexer))
+
+    def _stop_focus(self) -> None:
+        if self._focus_indexer is not None:
+            self._focus_indexer.stop()
+            self._focus_indexer = None
+
+    def _poll_focus(self, indexer: FocusIndexer) -> None:
+        if indexer is not self._focus_indexer:
+            return
+        idle = False
+        current_path = self.images[self.current_index].path if self.images else None
+        show_current = False
+        while True:
+            try:
+                batch = indexer.results.get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                idle = True
+                continue
+            for path, value in batch:
+                if value is None:
+                    self._focus.pop(path, None)
+                else:
+                    self._focus[path] = value
+                self.images.set_sharpness(path, value)
+                show_current = show_current or path == current_path
+        if idle:
+            self._sync_catalog()
+        if idle and self._view.sort == SORT_SHARPNESS:
+            self._view.rebuild()
+            self._relayout_gallery()
+        if show_current and self.viewer_label is not None and self.viewer_label.winfo_exists():
+            self._render_current_image()
+        self.after(FOCUS_POLL_MS, lambda: self._poll_focus(indexer))
+
+    def _reject_soft_frames(self) -> None:
+        # Only unmarked images are candidates; likes and earlier decisions are kept
+        if not HAS_NUMPY:
+            messagebox.showinfo("Sharpness Unavailable", "Install numpy to measure sharpness.")
+            return
+        if not self._focus:
+            messagebox.showinfo("Sharpness Not Ready", "Sharpness has not been measured for this folder yet.")
+            return
+        candidates = []
+        for path in soft_frames(self._focus):
+            row = self.images.row_of(path)
+            if row is not None and not self.images.flags[row]:
+                candidates.append(path)
+        if not candidates:
+            messagebox.showinfo("No Soft Frames", "No unmarked images are noticeably softer than the rest of the folder.")
+            return
+        if not messagebox.askyesno(
+            "Reject Soft Frames",
+            f"Reject {len(candidates)} unmarked images scoring below {SOFT_FOCUS_RATIO:.0%} of the folder's median sharpness?",
+        ):
+            return
+        rejected = set(candidates)
+        for index, path in enumerate(self.images.paths()):
+            if path in rejected:
+                self.images[index].rejected = True
+                self._record_changed(index)
+        self.status_var.set(f"Rejected {len(candidates)} soft frames • {self._count_text()}")
+        if self.gallery_canvas is not None and self.gallery_canvas.winfo_exists():
+            self._relayout_gallery()
+        elif self.viewer_label is not None and self.viewer_label.winfo_exists() and self.images:
+            self._render_current_image()
+
+    # Metadata
+    def _start_metadata(self) -> None:
+        self._stop_metadata()
+        if not self.folder_path or not self.images:
+            return
+        self._metadata_loader = MetadataLoader(self.folder_path).start(self.images.paths())
+        loader = self._metadata_loader
+        self.after(METADATA_POLL_MS, lambda: self._poll_metadata(loader))
+
+    def _stop_metadata(self) -> None:
+        if self._metadata_loader is not None:
+            self._metadata_loader.stop()
+            self._metadata_loader = None
+
+    def _poll_metadata(self, loader: MetadataLoader) -> None:
+        if loader is not self._metadata_loader:
+            return
+        current_path = self.images[self.current_index].path if self.images else None
+        show_current = False
+        idle = False
+        while True:
+            try:
+                batch = loader.results.get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                idle = True
+                continue
+            for path, meta in batch:
+                self._metadata[path] = meta
+                show_current = show_current or path == current_path
+        viewer_open = self.viewer_label is not None and self.viewer_label.winfo_exists()
+        if idle:
+            self._sync_catalog()
+        if idle and self._hashes:
+            # Capture times decide which similar neighbours count as one burst
+            self._regroup_stacks()
+        if idle and self._view.sort == SORT_CAPTURE_TIME:
+            # Every capture time is known now; put the view in its final order
+            self._view.rebuild()
+            self._relayout_gallery()
+            show_current = True
+        if show_current and viewer_open and self.images:
+            self._render_current_image()
+        self.after(METADATA_POLL_MS, lambda: self._poll_metadata(loader))
+
+    def _on_exif_overlay_toggled(self) -> None:
+        if self.viewer_label is not None and self.viewer_label.winfo_exists() and self.images:
+            self._render_current_image()
+
+    def _exif_status(self, record: ImageRecord) -> str:
+        meta = self._metadata.get(record.path)
+        if meta is None:
+            if self._metadata_loader is not None:
+                self._metadata_loader.prioritize(record.path)
+            return "Reading EXIF…"
+        return format_exif_summary(meta) or "No EXIF"
+
+    # Performance overlay
+    def _on_perf_overlay_toggled(self) -> None:
+        if self._perf_after is not None:
+            self.after_cancel(self._perf_after)
+            self._perf_after = None
+        if self.perf_overlay_var.get():
+            PERF.enabled = True
+            if self.perf_label is None:
+                self.perf_label = ttk.Label(self, textvariable=self.perf_var, anchor=tk.W, font="TkFixedFont")
+                self.perf_label.pack(side=tk.BOTTOM, fill=tk.X, padx=8, before=self.container)
+            self._update_perf_overlay()
+        else:
+            # PHOTO_SELECTOR_PERF=1 keeps recording for a trace export without the readout
+            PERF.enabled = PERF_ENABLED
+            if self.perf_label is not None:
+                self.perf_label.destroy()
+                self.perf_label = None
+
+    def _update_perf_overlay(self) -> None:
+        self._perf_after = None
+        if self.perf_label is None:
+            return
+        readout = "p50/p95  " + PERF.readout()
+        if self._viewer_prefetcher is not None:
+            readout += f"  •  viewer cache {self._viewer_prefetcher.cache.nbytes / (1024 * 1024):.0f} MB"
+        self.perf_var.set(readout)
+        self._perf_after = self.after(PERF_OVERLAY_MS, self._update_perf_overlay)
+
+    def export_perf_trace(self) -> None:
+        if not PERF.enabled and not PERF.summary():
+            messagebox.showinfo(
+                "No Timings Recorded",
+                "Turn on View ▸ Show Performance Stats (or start with PHOTO_SELECTOR_PERF=1), use the app, then export.",
+            )
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Performance Trace",
+            defaultextension=".json",
+            initialfile="photo_selector_trace.json",
+            filetypes=[("Chrome trace", "*.json")],
+        )
+        if not path:
+            return
+        try:
+            count = PERF.export_trace(path)
+        except OSError as ex:
+            messagebox.showerror("Export Failed", f"Could not write {path}: {ex}")
+            return
+        self.status_var.set(f"Exported {count} timing spans to {path} (open in chrome://tracing or Perfetto)")
+
+    # Export
+    def export_liked(self) -> None:
+        # Liked images at or above the toolbar's minimum score; PHOTO_SELECTOR_EXPORT_MODE
+        # and PHOTO_SELECTOR_EXPORT_JPEG choose hard links and JPEG renders
+        if self._exporter is not None:
+            messagebox.showinfo("Export Running", "An export is already running; cancel it or wait for it to finish.")
+            return
+        if not self.folder_path or not self.images:
+            messagebox.showinfo("No Folder", "Open a folder before exporting.")
+            return
+        min_score = VIEW_SCORE_RANGES[self.view_score_var.get()][0]
+        paths = select_for_export(self.images, min_score)
+        if not paths:
+            messagebox.showinfo("Nothing to Export", "No liked images match the current score filter.")
+            return
+        target = filedialog.askdirectory(title="Export liked images to")
+        if not target:
+            return
+        problem = export_target_error(self.folder_path, target)
+        if problem is not None:
+            messagebox.showerror("Export Failed", problem)
+            return
+        options = ExportOptions()
+        verb = "Hard-link" if options.mode == EXPORT_HARDLINK else "Copy"
+        extra = f" and render {options.jpeg_edge} px JPEGs" if options.jpeg_edge else ""
+        if not messagebox.askyesno(
+            "Export Liked Images",
+            f"{verb} {len(paths)} liked images with their sidecars{extra} to {target}?\n\n"
+            "Files already exported are skipped, so an interrupted export resumes where it stopped.",
+        ):
+            return
+        self._get_thumb_loader()
+        assert self._decode_executor is not None
+        self._exporter = Exporter(self._decode_executor, self.folder_path, target, options, DECODE_WORKERS).start(paths)
+        exporter = self._exporter
+        totals = {"done": 0, "files": 0, "bytes": 0, "failed": 0}
+        self.status_var.set(f"Exporting {len(paths)} images to {target}…")
+        self.after(EXPORT_POLL_MS, lambda: self._poll_export(exporter, len(paths), totals))
+
+    def cancel_export(self) -> None:
+        if self._exporter is None:
+            return
+        self._exporter.stop()
+        self.status_var.set("Cancelling export; files being written will finish…")
+
+    def _poll_export(self, exporter: Exporter, total: int, totals: Dict[str, int]) -> None:
+        finished = False
+        while True:
+            try:
+                result = exporter.results.get_nowait()
+            except queue.Empty:
+                break
+            if result is None:
+                finished = True
+                break
+            totals["done"] += 1
+            totals["files"] += len(result.written)
+            totals["bytes"] += result.nbytes
+            totals["failed"] += result.error is not None
+        written = f"{totals['files']} files, {totals['bytes'] / (1024 * 1024):.0f} MB"
+        if not finished:
+            if not exporter.cancelled:
+                self.status_var.set(f"Exporting {totals['done']}/{total} images ({written})…")
+            self.after(EXPORT_POLL_MS, lambda: self._poll_export(exporter, total, totals))
+            return
+        self._exporter = None
+        outcome = "Export cancelled" if exporter.cancelled else "Exported"
+        self.status_var.set(f"{outcome}: {totals['done']}/{total} images to {exporter.target_folder} ({written})")
+        if totals["failed"]:
+            messagebox.showerror(
+                "Export Incomplete",
+                f"{totals['failed']} images could not be exported (details in the console). Export again to retry them.",
+            )
 
     # Gallery view
     def show_empty_state(self) -> None:
@@ -199,121 +1075,287 @@ class ImageGalleryApp(tk.Tk):
         for child in self.container.winfo_children():
             child.destroy()
 
-        self.gallery_canvas = tk.Canvas(self.container, highlightthickness=0, background="#1e1e1e")
-        self.gallery_scrollbar = ttk.Scrollbar(self.container, orient=tk.VERTICAL, command=self.gallery_canvas.yview)
-        self.gallery_inner = ttk.Frame(self.gallery_canvas)
-
-        self.gallery_inner.bind(
-            "<Configure>",
-            lambda e: self.gallery_canvas.configure(scrollregion=self.gallery_canvas.bbox("all")),
+        self.gallery_canvas = tk.Canvas(
+            self.container, highlightthickness=0, background="#1e1e1e", yscrollincrement=GALLERY_SCROLL_STEP
         )
-
-        inner_window = self.gallery_canvas.create_window((0, 0), window=self.gallery_inner, anchor="nw")
-
-        def _resize_canvas(event: tk.Event) -> None:
-            self.gallery_canvas.itemconfig(inner_window, width=event.width)
-
-        self.gallery_canvas.bind("<Configure>", _resize_canvas)
-        self.gallery_canvas.configure(yscrollcommand=self.gallery_scrollbar.set)
+        self.gallery_scrollbar = ttk.Scrollbar(self.container, orient=tk.VERTICAL, command=self._gallery_yview)
+        self.gallery_canvas.configure(yscrollcommand=self._gallery_yscroll)
 
         self.gallery_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.gallery_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+        self.gallery_canvas.bind("<Configure>", lambda e: self._layout_gallery())
+        self.gallery_canvas.bind("<Button-1>", self._on_gallery_click)
+        # Windows/macOS wheel and X11 buttons 4/5
+        self.gallery_canvas.bind("<MouseWheel>", self._on_gallery_wheel)
+        self.gallery_canvas.bind("<Button-4>", lambda e: self._scroll_gallery(-1))
+        self.gallery_canvas.bind("<Button-5>", lambda e: self._scroll_gallery(1))
+
         self._populate_thumbnails()
 
     def _populate_thumbnails(self) -> None:
-        if self.gallery_inner is None:
+        if self.gallery_canvas is None:
             return
-        for child in self.gallery_inner.winfo_children():
-            child.destroy()
-
-        # Compute grid columns from current width
-        columns = max(1, self.gallery_inner.winfo_toplevel().winfo_width() // (THUMB_SIZE[0] + 20))
-        if columns < 1:
-            columns = 4
-        self._thumb_columns = columns  # type: ignore[attr-defined]
+        self.gallery_canvas.delete("all")
+
+        # The grid is virtual: only cells in or near the viewport have canvas items,
+        # and slots are recycled between indices as the user scrolls
+        self._thumb_columns = 0
+        self._gallery_slots = {}
+        self._gallery_free_slots = []
+
+        loader = self._get_thumb_loader()
+        loader.start(self.folder_path or "", THUMB_SIZE, [], self._catalog_folders)
+        self._thumb_generation += 1
+        self._thumb_polling = False
+        self._layout_gallery()
+
+    def _relayout_gallery(self) -> None:
+        # Cell indices changed meaning; rebind visible cells (thumbnails are cached by path)
+        if self.gallery_canvas is None or not self.gallery_canvas.winfo_exists():
+            return
+        for idx in list(self._gallery_slots):
+            self._release_gallery_slot(idx)
+        self._layout_gallery()
 
-        # Incremental loader state
-        self._thumb_next_index = 0  # type: ignore[attr-defined]
-        self._thumb_loading = True  # type: ignore[attr-defined]
-        self.thumb_cache = []
+    def _layout_gallery(self) -> None:
+        canvas = self.gallery_canvas
+        if canvas is None or not canvas.winfo_exists():
+            return
+        width = max(canvas.winfo_width(), GALLERY_CELL_WIDTH)
+        columns = max(1, width // GALLERY_CELL_WIDTH)
+        rows = (len(self._view) + columns - 1) // columns
+        canvas.configure(scrollregion=(0, 0, width, max(rows * GALLERY_CELL_HEIGHT, canvas.winfo_height())))
+        if columns != self._thumb_columns:
+            self._thumb_columns = columns
+            for idx in list(self._gallery_slots):
+                self._release_gallery_slot(idx)
+        self._refresh_gallery()
+
+    def _gallery_yview(self, *args) -> None:
+        if self.gallery_canvas is not None:
+            self.gallery_canvas.yview(*args)
+
+    def _gallery_yscroll(self, first: str, last: str) -> None:
+        # Called by the canvas whenever the view moves, whatever moved it
+        if self.gallery_scrollbar is not None:
+            self.gallery_scrollbar.set(first, last)
+        if not self._gallery_refresh_pending:
+            self._gallery_refresh_pending = True
+            self.after_idle(self._refresh_gallery)
+
+    def _on_gallery_wheel(self, event: tk.Event) -> None:
+        delta = event.delta
+        if sys.platform != "darwin":
+            delta = delta // 120
+        self._scroll_gallery(-delta)
+
+    def _scroll_gallery(self, steps: int) -> None:
+        if self.gallery_canvas is not None and steps:
+            self.gallery_canvas.yview_scroll(steps, "units")
+
+    def _gallery_index_at(self, x: float, y: float) -> Optional[int]:
+        if self._thumb_columns <= 0:
+            return None
+        col = int(x // GALLERY_CELL_WIDTH)
+        row = int(y // GALLERY_CELL_HEIGHT)
+        if col >= self._thumb_columns:
+            return None
+        idx = row * self._thumb_columns + col
+        if 0 <= idx < len(self._view):
+            return idx
+        return None
+
+    def _on_gallery_click(self, event: tk.Event) -> None:
+        if self.gallery_canvas is None:
+            return
+        idx = self._gallery_index_at(self.gallery_canvas.canvasx(event.x), self.gallery_canvas.canvasy(event.y))
+        if idx is not None:
+            self.open_viewer(self._view[idx])
+
+    def _visible_gallery_range(self, overscan_rows: int) -> range:
+        canvas = self.gallery_canvas
+        if canvas is None or self._thumb_columns <= 0:
+            return range(0)
+        top = canvas.canvasy(0)
+        bottom = canvas.canvasy(canvas.winfo_height())
+        first_row = max(0, int(top // GALLERY_CELL_HEIGHT) - overscan_rows)
+        last_row = int(bottom // GALLERY_CELL_HEIGHT) + overscan_rows
+        start = first_row * self._thumb_columns
+        stop = min(len(self._view), (last_row + 1) * self._thumb_columns)
+        return range(start, max(start, stop))
+
+    def _refresh_gallery(self) -> None:
+        self._gallery_refresh_pending = False
+        canvas = self.gallery_canvas
+        if canvas is None or not canvas.winfo_exists():
+            return
+        visible = self._visible_gallery_range(GALLERY_OVERSCAN_ROWS)
+        with span("gallery.layout"):
+            for idx in [i for i in self._gallery_slots if i not in visible]:
+                self._release_gallery_slot(idx)
+            for idx in visible:
+                if idx not in self._gallery_slots:
+                    self._bind_gallery_slot(idx)
+
+        # Decode what is on screen first, then a few screens further down
+        wanted = self._visible_gallery_range(GALLERY_PREFETCH_ROWS)
+        jobs = []
+        for idx in list(visible) + [i for i in wanted if i not in visible]:
+            path = self._gallery_record(idx).path
+            if path not in self.thumb_cache:
+                jobs.append((path, path))
+        self._get_thumb_loader().request(jobs)
+        self._ensure_thumb_polling()
+
+    def _bind_gallery_slot(self, idx: int) -> None:
+        canvas = self.gallery_canvas
+        if canvas is None:
+            return
+        if self._gallery_free_slots:
+            items = self._gallery_free_slots.pop()
+        else:
+            items = (
+                canvas.create_rectangle(0, 0, 0, 0, outline="#3a3a3a", fill="#2b2b2b"),
+                canvas.create_image(0, 0, anchor=tk.CENTER),
+                canvas.create_text(0, 0, fill="#8a8a8a", anchor=tk.CENTER),
+                canvas.create_text(0, 0, fill="#e6e6e6", anchor=tk.N, justify=tk.CENTER, width=GALLERY_CELL_WIDTH - 16),
+            )
+        frame_item, image_item, status_item, caption_item = items
+        row, col = divmod(idx, self._thumb_columns)
+        x0 = col * GALLERY_CELL_WIDTH + GALLERY_CELL_PAD
+        y0 = row * GALLERY_CELL_HEIGHT + GALLERY_CELL_PAD
+        x1 = x0 + GALLERY_CELL_WIDTH - 2 * GALLERY_CELL_PAD
+        y1 = y0 + GALLERY_CELL_HEIGHT - 2 * GALLERY_CELL_PAD
+        image_center = (x0 + x1) / 2, y0 + 4 + THUMB_SIZE[1] / 2
+        canvas.coords(frame_item, x0, y0, x1, y1)
+        canvas.coords(image_item, *image_center)
+        canvas.coords(status_item, *image_center)
+        canvas.coords(caption_item, (x0 + x1) / 2, y0 + THUMB_SIZE[1] + 10)
+        caption = self._caption_for_record(self._gallery_record(idx))
+        if self._view.collapse:
+            stacked = self._view.stack_size(self._view[idx])
+            if stacked > 1:
+                caption = f"▣ {stacked}  {caption}"
+        canvas.itemconfigure(caption_item, text=caption)
+        for item in items:
+            canvas.itemconfigure(item, state=tk.NORMAL)
+        self._gallery_slots[idx] = items
+        self._show_slot_thumbnail(idx)
+
+    def _release_gallery_slot(self, idx: int) -> None:
+        items = self._gallery_slots.pop(idx)
+        if self.gallery_canvas is not None:
+            for item in items:
+                self.gallery_canvas.itemconfigure(item, state=tk.HIDDEN)
+            self.gallery_canvas.itemconfigure(items[1], image="")
+        self._gallery_free_slots.append(items)
+
+    def _show_slot_thumbnail(self, idx: int) -> None:
+        if self.gallery_canvas is None:
+            return
+        _, image_item, status_item, _ = self._gallery_slots[idx]
+        path = self._gallery_record(idx).path
+        PERF.count("thumbnail.memory", path in self.thumb_cache)
+        if path in self.thumb_cache:
+            photo = self.thumb_cache[path]
+            self.thumb_cache.move_to_end(path)
+            if photo is not None:
+                self.gallery_canvas.itemconfigure(image_item, image=photo)
+                self.gallery_canvas.itemconfigure(status_item, text="")
+            else:
+                self.gallery_canvas.itemconfigure(image_item, image="")
+                self.gallery_canvas.itemconfigure(status_item, text="Failed")
+        else:
+            self.gallery_canvas.itemconfigure(image_item, image="")
+            self.gallery_canvas.itemconfigure(status_item, text="Loading…")
 
-        # Process thumbnails in small chunks to keep UI responsive
-        def process_chunk() -> None:
-            if self.gallery_inner is None:
-                return
-            CHUNK = 16
-            made_any = False
-            count = 0
-            while self._thumb_next_index < len(self.images) and count < CHUNK:  # type: ignore[attr-defined]
-                idx = self._thumb_next_index  # type: ignore[attr-defined]
-                record = self.images[idx]
-                try:
-                    img = self._open_image_for_thumbnail(record.path)
-                    img.thumbnail(THUMB_SIZE, Image.LANCZOS)
-                    photo = ImageTk.PhotoImage(img)
-                    self.thumb_cache.append(photo)
-                except Exception as ex:
-                    print(f"Failed to load thumbnail for {record.path}: {ex}")
-                    self.thumb_cache.append(None)  # type: ignore
-                    photo = None  # type: ignore
-
-                frame = ttk.Frame(self.gallery_inner, relief=tk.RIDGE, borderwidth=1)
-                r = idx // self._thumb_columns  # type: ignore[attr-defined]
-                c = idx % self._thumb_columns  # type: ignore[attr-defined]
-                frame.grid(row=r, column=c, padx=8, pady=8, sticky="nsew")
-
-                if photo is not None:
-                    label = ttk.Label(frame, image=photo)
-                    label.image = photo
-                else:
-                    label = ttk.Label(frame, text="Failed", anchor=tk.CENTER)
-                label.pack()
-
-                caption_text = record.filename
-                if record.rejected:
-                    caption_text += "  [Rejected]"
-                elif record.liked:
-                    caption_text += f"  [Liked • {record.score}]"
+    def _caption_for_record(self, record: ImageRecord) -> str:
+        caption_text = record.filename
+        if record.rejected:
+            caption_text += "  [Rejected]"
+        elif record.liked:
+            caption_text += f"  [Liked • {record.score}]"
+        else:
+            caption_text += f"  [Score {record.score}]"
+        return caption_text
+
+    def _ensure_thumb_polling(self) -> None:
+        if not self._thumb_polling:
+            self._thumb_polling = True
+            generation = self._thumb_generation
+            self.after(THUMB_POLL_MS, lambda: self._poll_thumbnails(generation))
+
+    def _poll_thumbnails(self, generation: int) -> None:
+        # Decoding happens in the pool; this thread only builds PhotoImages
+        if generation != self._thumb_generation:
+            return
+        loader = self._get_thumb_loader()
+        if self.gallery_canvas is None or not self.gallery_canvas.winfo_exists():
+            # Gallery was replaced by the viewer; stop decoding for it
+            loader.cancel()
+            self._thumb_polling = False
+            return
+        results = loader.drain(THUMB_DRAIN_BATCH)
+        slot_by_path = {self._gallery_record(idx).path: idx for idx in self._gallery_slots}
+        with span("gallery.drain"):
+            for result in results:
+                if PERF.enabled:
+                    # Measured in the worker: a disk cache read or a full decode
+                    PERF.add("thumbnail.cached" if result.cache_hit else "thumbnail.decode", result.decode_ms / 1000)
+                    PERF.count("thumbnail.disk", result.cache_hit)
+                photo = None
+                if result.data is not None:
+                    try:
+                        img = Image.frombytes(result.mode, result.size, result.data)
+                        with span("photoimage.thumbnail"):
+                            photo = ImageTk.PhotoImage(img)
+                    except Exception as ex:
+                        print(f"Failed to load thumbnail for {result.path}: {ex}")
                 else:
-                    caption_text += f"  [Score {record.score}]"
-                caption = ttk.Label(frame, text=caption_text)
-                caption.pack(pady=(4, 6))
-
-                def _open(i=idx) -> None:
-                    self.open_viewer(i)
-
-                label.bind("<Button-1>", lambda e, i=idx: _open(i))
-                frame.bind("<Button-1>", lambda e, i=idx: _open(i))
-
-                self._thumb_next_index += 1  # type: ignore[attr-defined]
-                count += 1
-                made_any = True
+                    print(f"Failed to load thumbnail for {result.path}: {result.error}")
+                self.thumb_cache[result.key] = photo
+                idx = slot_by_path.get(result.key)
+                if idx is not None:
+                    self._show_slot_thumbnail(idx)
+        self._evict_thumbnails()
+
+        pending = sum(1 for idx in self._gallery_slots if self._gallery_record(idx).path not in self.thumb_cache)
+        if pending:
+            self.status_var.set(f"Rendering thumbnails • {pending} visible remaining of {self._count_text()}")
+        else:
+            self.status_var.set(f"Ready • {self._count_text()}")
 
-            # Force layout updates so content becomes visible
-            try:
-                self.gallery_inner.update_idletasks()
-                if self.gallery_canvas is not None:
-                    self.gallery_canvas.configure(scrollregion=self.gallery_canvas.bbox("all"))
-            except Exception:
-                pass
+        if results or loader.busy():
+            self.after(THUMB_POLL_MS, lambda: self._poll_thumbnails(generation))
+        else:
+            self._thumb_polling = False
 
-            self.status_var.set(f"Rendering thumbnails {min(self._thumb_next_index, len(self.images))}/{len(self.images)}")  # type: ignore[attr-defined]
+    def _evict_thumbnails(self) -> None:
+        # Keep PhotoImages bounded; anything on screen was touched recently and survives
+        limit = max(THUMB_MEMORY_LIMIT, 2 * len(self._gallery_slots))
+        while len(self.thumb_cache) > limit:
+            self.thumb_cache.popitem(last=False)
 
-            if self._thumb_next_index < len(self.images):  # type: ignore[attr-defined]
-                self.after(1, process_chunk)
-            else:
-                self._thumb_loading = False  # type: ignore[attr-defined]
-                self.status_var.set(f"Ready • {len(self.images)} images")
-
-        # Start processing thumbnails
-        process_chunk()
+    def _get_thumb_loader(self) -> ThumbnailLoader:
+        # Pool is created on first use and shared for the lifetime of the window
+        if self._thumb_loader is None:
+            self._decode_executor = create_executor()
+            self._thumb_loader = ThumbnailLoader(self._decode_executor)
+        return self._thumb_loader
 
     # Viewer view
     def show_viewer_current(self) -> None:
         if not self.images:
             self.show_empty_state()
             return
+        if self._view.position_of(self.current_index) is None:
+            # The current image is filtered out; start from the top of the view
+            first = self._view.first()
+            if first is None:
+                self.status_var.set("No images match the current filter")
+                return
+            self.current_index = first
         self.open_viewer(self.current_index)
 
     def open_viewer(self, index: int) -> None:
@@ -337,6 +1379,8 @@ class ImageGalleryApp(tk.Tk):
         if self.viewer_label is not None:
             self.viewer_label.bind("<Configure>", self._on_viewer_resize)
 
+        # Fresh label: nothing is on screen yet
+        self._viewer_shown = None
         self._render_current_image()
         self._bind_viewer_keys()
 
@@ -355,50 +1399,204 @@ class ImageGalleryApp(tk.Tk):
             return
         record = self.images[self.current_index]
         try:
-            # Load original only when switching image or cache missing
+            # Take the decoded image from the prefetch cache when switching image;
+            # on a miss it is decoded in the background and rendered by _poll_viewer_decodes
             if self._current_viewer_path != record.path or self._current_viewer_original is None:
-                self._current_viewer_original = self._open_image_full(record.path)
-                self._current_viewer_path = record.path
-
-            frame_width = self.viewer_label.winfo_width() or self.viewer_label.winfo_toplevel().winfo_width()
-            frame_height = self.viewer_label.winfo_height() or (self.viewer_label.winfo_toplevel().winfo_height() - 80)
-            if frame_width < 50 or frame_height < 50:
-                frame_width, frame_height = 1200, 700
-
-            img = self._resize_to_fit(self._current_viewer_original, frame_width, frame_height)
-            self.viewer_photo = ImageTk.PhotoImage(img)
-            self.viewer_label.configure(image=self.viewer_photo, text="")
+                self._current_viewer_original = None
+                self._current_viewer_path = None
+                prefetcher = self._get_viewer_prefetcher()
+                self._queue_viewer_decodes()
+                failure = prefetcher.failure(record.path)
+                cached = prefetcher.cache.get(record.path)
+                PERF.count("viewer.prefetch", cached is not None)
+                if failure is not None:
+                    print(f"Failed to open {record.path}: {failure}")
+                    self.viewer_label.configure(text=f"Failed to open: {record.filename}", image="")
+                elif cached is None:
+                    self.viewer_label.configure(text=f"Loading {record.filename}…", image="")
+                else:
+                    self._current_viewer_original = cached
+                    self._current_viewer_path = record.path
+                    if self._is_embedded_preview(cached) and self._raw_view_mode == RAW_MODE_REFINE:
+                        self.after(RAW_REFINE_DELAY_MS, lambda path=record.path: self._refine_current(path))
+
+            if self._current_viewer_original is not None:
+                frame_width = self.viewer_label.winfo_width() or self.viewer_label.winfo_toplevel().winfo_width()
+                frame_height = self.viewer_label.winfo_height() or (self.viewer_label.winfo_toplevel().winfo_height() - 80)
+                if frame_width < 50 or frame_height < 50:
+                    frame_width, frame_height = 1200, 700
+                self._viewer_target_size = (frame_width, frame_height)
+                self._display_viewer_image(frame_width, frame_height)
+            else:
+                self._viewer_shown = None
         except Exception as ex:
             print(f"Failed to open {record.path}: {ex}")
             self.viewer_label.configure(text=f"Failed to open: {record.filename}", image="")
 
         status = self._status_for_record(record)
+        if self._is_embedded_preview(self._current_viewer_original):
+            status += "  •  RAW: embedded preview"
+        if self.exif_overlay_var.get():
+            status += "\n" + self._exif_status(record)
         self.viewer_status.configure(text=status)
 
         # Update window title with progress
-        self.title(f"Photo Selector - {record.filename}  [{self.current_index + 1}/{len(self.images)}]")
+        position = self._view.position_of(self.current_index)
+        counter = f"{position + 1}/{self._view.count}" if position is not None else f"–/{self._view.count}"
+        self.title(f"Photo Selector - {record.filename}  [{counter}]")
+
+    def _get_viewer_prefetcher(self) -> ViewerPrefetcher:
+        if self._viewer_prefetcher is None:
+            # Decode no larger than the screen; the viewer never shows more pixels than that
+            max_size = (max(self.winfo_screenwidth(), 1200), max(self.winfo_screenheight(), 700))
+            # Workers read the plain attributes, never the Tk variables
+            self._viewer_prefetcher = ViewerPrefetcher(
+                lambda path: self._decode_for_viewer(path, max_size, self._raw_view_mode),
+                VIEWER_CACHE_MB * 1024 * 1024,
+                refine=lambda path: self._decode_for_viewer(path, max_size, RAW_MODE_FULL),
+            )
+        return self._viewer_prefetcher
+
+    def _decode_for_viewer(self, path: str, max_size: Tuple[int, int], raw_mode: str) -> Image.Image:
+        # Prefetch worker thread
+        with span("viewer.decode"):
+            return open_image_for_screen(path, max_size, raw_mode, self._viewer_target_size)
+
+    def _is_embedded_preview(self, img: Optional[Image.Image]) -> bool:
+        return img is not None and bool(img.info.get(EMBEDDED_PREVIEW_KEY))
+
+    def _refine_current(self, path: str) -> None:
+        # Swap in the demosaiced render once the user has stayed on the image for a moment
+        if not self.images or self.images[self.current_index].path != path:
+            return
+        if self._current_viewer_path != path or not self._is_embedded_preview(self._current_viewer_original):
+            return
+        self._get_viewer_prefetcher().refine(path)
+        self._ensure_viewer_polling()
+
+    def _on_raw_view_mode_changed(self) -> None:
+        mode = self.raw_view_mode_var.get()
+        if mode not in RAW_MODES or mode == self._raw_view_mode:
+            return
+        self._raw_view_mode = mode
+        # Cached decodes were made for the old mode, and so are the ones still running; a new
+        # generation drops both, and the current image is decoded again below
+        if self._viewer_prefetcher is not None:
+            self._viewer_prefetcher.clear()
+        self._current_viewer_original = None
+        self._current_viewer_path = None
+        if self.viewer_label is not None and self.viewer_label.winfo_exists() and self.images:
+            self._render_current_image()
+
+    def _queue_viewer_decodes(self) -> None:
+        # Current image first, then ahead in the direction of travel, then behind
+        if not self.images:
+            return
+        order = [self.current_index]
+        for step, count in ((self._viewer_direction, VIEWER_PREFETCH_AHEAD), (-self._viewer_direction, VIEWER_PREFETCH_BEHIND)):
+            index: Optional[int] = self.current_index
+            for _ in range(count):
+                index = self._view.step(index, step)
+                if index is None:
+                    break
+                order.append(index)
+        paths = list(dict.fromkeys(self.images[i].path for i in order))
+        self._get_viewer_prefetcher().request(paths)
+        self._ensure_viewer_polling()
+
+    def _ensure_viewer_polling(self) -> None:
+        if not self._viewer_polling:
+            self._viewer_polling = True
+            self.after(VIEWER_POLL_MS, self._poll_viewer_decodes)
+
+    def _poll_viewer_decodes(self) -> None:
+        prefetcher = self._get_viewer_prefetcher()
+        finished = prefetcher.drain()
+        if self.images and self.viewer_label is not None and self.viewer_label.winfo_exists():
+            path = self.images[self.current_index].path
+            # Render a decode that just landed, or a full render replacing the preview
+            if path in finished and prefetcher.cache.peek(path) is not self._current_viewer_original:
+                self._current_viewer_path = None
+                self._render_current_image()
+        if prefetcher.busy():
+            self.after(VIEWER_POLL_MS, self._poll_viewer_decodes)
+        else:
+            self._viewer_polling = False
 
     def _on_viewer_resize(self, event=None) -> None:
-        if self.viewer_label is None or self._current_viewer_original is None:
+        # <Configure> arrives in bursts while the window edge is dragged; coalesce them
+        if not self._viewer_resize_pending:
+            self._viewer_resize_pending = True
+            self.after_idle(self._apply_viewer_resize)
+
+    def _apply_viewer_resize(self) -> None:
+        self._viewer_resize_pending = False
+        if self.viewer_label is None or self._current_viewer_original is None or not self.viewer_label.winfo_exists():
             return
         frame_width = self.viewer_label.winfo_width()
         frame_height = self.viewer_label.winfo_height()
         if frame_width < 2 or frame_height < 2:
             return
-        img = self._resize_to_fit(self._current_viewer_original, frame_width, frame_height)
-        self.viewer_photo = ImageTk.PhotoImage(img)
-        self.viewer_label.configure(image=self.viewer_photo)
+        self._viewer_target_size = (frame_width, frame_height)
+        self._display_viewer_image(frame_width, frame_height)
 
-    def _resize_to_fit(self, img: Image.Image, frame_width: int, frame_height: int) -> Image.Image:
-        img_ratio = img.width / img.height
-        frame_ratio = frame_width / frame_height
-        if img_ratio > frame_ratio:
-            new_width = frame_width
-            new_height = int(new_width / img_ratio)
-        else:
-            new_height = frame_height
-            new_width = int(new_height * img_ratio)
-        return img.resize((max(1, new_width), max(1, new_height)), Image.LANCZOS)
+    def _display_viewer_image(self, frame_width: int, frame_height: int) -> None:
+        # Draw a cheap resize now and queue the LANCZOS pass for when input settles
+        original = self._current_viewer_original
+        if self.viewer_label is None or original is None:
+            return
+        shown = (original, frame_width, frame_height)
+        if self._viewer_shown is not None and self._viewer_shown[0] is original and self._viewer_shown[1:] == shown[1:]:
+            # Same image at the same size (e.g. a like/score change): keep what is on screen
+            return
+        self._viewer_shown = shown
+        img = self._resize_to_fit(original, frame_width, frame_height, VIEWER_FAST_RESAMPLE)
+        with span("photoimage.viewer"):
+            self.viewer_photo = ImageTk.PhotoImage(img)
+        self.viewer_label.configure(image=self.viewer_photo, text="")
+
+        renderer = self._get_viewer_renderer()
+        renderer.invalidate()
+        if self._viewer_refine_after is not None:
+            self.after_cancel(self._viewer_refine_after)
+            self._viewer_refine_after = None
+        if img is not original:
+            self._viewer_refine_after = self.after(VIEWER_REFINE_DELAY_MS, self._start_viewer_refine)
+
+    def _start_viewer_refine(self) -> None:
+        self._viewer_refine_after = None
+        if self._current_viewer_original is None or self._viewer_shown is None:
+            return
+        _, frame_width, frame_height = self._viewer_shown
+        pyramid = self._pyramid_for(self._current_viewer_original)
+        self._get_viewer_renderer().submit(pyramid, (frame_width, frame_height))
+        self.after(VIEWER_POLL_MS, self._poll_viewer_refine)
+
+    def _poll_viewer_refine(self) -> None:
+        renderer = self._get_viewer_renderer()
+        refined = renderer.take()
+        if refined is not None and self.viewer_label is not None and self.viewer_label.winfo_exists():
+            with span("photoimage.viewer"):
+                self.viewer_photo = ImageTk.PhotoImage(refined)
+            self.viewer_label.configure(image=self.viewer_photo, text="")
+        elif renderer.busy():
+            self.after(VIEWER_POLL_MS, self._poll_viewer_refine)
+
+    def _get_viewer_renderer(self) -> ProgressiveRenderer:
+        if self._viewer_renderer is None:
+            self._viewer_renderer = ProgressiveRenderer()
+        return self._viewer_renderer
+
+    def _pyramid_for(self, img: Image.Image) -> ImagePyramid:
+        # One pyramid per decoded image on screen; levels are built on first use
+        if self._viewer_pyramid is None or self._viewer_pyramid.base is not img:
+            self._viewer_pyramid = ImagePyramid(img, self._pyramid_budget)
+        return self._viewer_pyramid
+
+    def _resize_to_fit(self, img: Image.Image, frame_width: int, frame_height: int, resample: int = Image.LANCZOS) -> Image.Image:
+        gap = VIEWER_REDUCING_GAP if resample == Image.LANCZOS else 1.0
+        with span("viewer.resize"):
+            return self._pyramid_for(img).resize_to_fit(frame_width, frame_height, resample, gap)
 
     def _status_for_record(self, record: ImageRecord) -> str:
         if record.rejected:
@@ -407,24 +1605,30 @@ class ImageGalleryApp(tk.Tk):
             state = f"Liked • Score {record.score}"
         else:
             state = f"Score {record.score}"
+        if record.sharpness is not None:
+            state += f" • Sharpness {record.sharpness:.0f}"
         return (
             f"{record.filename}  |  {state}  |  Space: Like  •  n: Reject  •  1-5: Score  •  ←/→: Prev/Next  •  g: Gallery"
         )
 
     # Key handlers
     def _prev_image(self, event=None) -> None:
-        if not self.images:
+        previous = self._view.step(self.current_index, -1) if self.images else None
+        if previous is None:
             return
-        self.current_index = (self.current_index - 1) % len(self.images)
+        self.current_index = previous
+        self._viewer_direction = -1
         # Reset cache when switching image
         self._current_viewer_original = None
         self._current_viewer_path = None
         self._render_current_image()
 
     def _next_image(self, event=None) -> None:
-        if not self.images:
+        following = self._view.step(self.current_index, 1) if self.images else None
+        if following is None:
             return
-        self.current_index = (self.current_index + 1) % len(self.images)
+        self.current_index = following
+        self._viewer_direction = 1
         # Reset cache when switching image
         self._current_viewer_original = None
         self._current_viewer_path = None
@@ -435,21 +1639,21 @@ class ImageGalleryApp(tk.Tk):
         if record.rejected:
             record.rejected = False
         record.liked = not record.liked
-        self.is_dirty = True
+        self._record_changed(self.current_index)
         self._render_current_image()
 
     def _reject(self, event=None) -> None:
         record = self.images[self.current_index]
         record.rejected = True
         record.liked = False
-        self.is_dirty = True
+        self._record_changed(self.current_index)
         self._render_current_image()
 
     def _set_score_factory(self, value: int):
         def _set_score(event=None) -> None:
             record = self.images[self.current_index]
             record.score = value
-            self.is_dirty = True
+            self._record_changed(self.current_index)
             self._render_current_image()
         return _set_score
 
@@ -473,77 +1677,182 @@ class ImageGalleryApp(tk.Tk):
                 self.show_gallery()
 
     # CSV persistence
-    def save_csv(self) -> None:
-        if not self.folder_path:
-            messagebox.showinfo("No Folder", "Open a folder before saving.")
+    def _record_changed(self, index: int) -> None:
+        # O(1) append to the folder's journal; the CSV is rewritten later in the background
+        record = self.images[index]
+        self._view.update(index)
+        if self._catalog_query is not None:
+            self._record_catalog_change(record)
             return
-        out_path = os.path.join(self.folder_path, CSV_FILENAME)
-        try:
-            with open(out_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["filename", "path", "liked", "rejected", "score"])
-                for rec in self.images:
-                    writer.writerow(rec.to_csv_row())
-            self.is_dirty = False
-            self.status_var.set(f"Saved CSV to {out_path}")
-        except Exception as ex:
-            messagebox.showerror("Save Failed", f"Could not save CSV: {ex}")
+        self.is_dirty = True
+        if self.journal is None:
+            return
+        self.journal.append(record.path, record.liked, record.rejected, record.score)
+        if self.journal.pending_changes >= JOURNAL_COMPACT_EVERY:
+            self._autosave()
+        else:
+            if self._autosave_after is not None:
+                self.after_cancel(self._autosave_after)
+            self._autosave_after = self.after(AUTOSAVE_IDLE_MS, self._autosave)
 
-    def _maybe_save_prompt(self) -> bool:
-        if not self.is_dirty:
-            return True
-        if not self.folder_path:
-            return True
-        response = messagebox.askyesnocancel(
-            "Unsaved Changes",
-            "You have unsaved changes. Save to CSV before exiting?",
-        )
-        if response is None:
+    def _autosave(self) -> None:
+        self._autosave_after = None
+        if not self.is_dirty or self.journal is None:
+            return
+        if self.journal.compacting() or self._scanning():
+            # Never wait on the Tk thread; try again once the running write or scan is done
+            self._autosave_after = self.after(AUTOSAVE_RETRY_MS, self._autosave)
+            return
+        if self._flush_selections():
+            self._check_compaction(self.journal, False)
+
+    def _flush_selections(self, wait: bool = False, closing: bool = False) -> bool:
+        # Snapshot rows here (cheap); the CSV write happens on the journal's thread.
+        # False when no write was started now.
+        if self.journal is None or not self.folder_path:
             return False
-        if response is True:
-            self.save_csv()
-            return True
+        if self._autosave_after is not None:
+            self.after_cancel(self._autosave_after)
+            self._autosave_after = None
+        if self._scanning() or self._scan_incomplete:
+            # A partial record list must never overwrite the CSV; the journal keeps the changes
+            return False
+        rows = self.images.csv_rows()
+        if self.journal.compacting() and not wait:
+            # Never join the running write on the Tk thread
+            if self._catalog is not None:
+                self._catalog.sync_folder(self.folder_path, rows)
+            if closing:
+                # Nothing more is appended to a closed journal, so this snapshot stays current
+                self._prune_closed_journals()
+                self._closed_journals[self.journal] = rows
+                journal = self.journal
+                self.after(AUTOSAVE_RETRY_MS, lambda: self._compact_closed_journal(journal))
+                self.is_dirty = False
+            else:
+                # Changes keep arriving; take a fresh snapshot once the write is done
+                self._autosave_after = self.after(AUTOSAVE_RETRY_MS, self._autosave)
+            return False
+        if not self.journal.compact(rows, wait=wait):
+            return False
+        if closing:
+            self._prune_closed_journals()
+            self._closed_journals[self.journal] = None
+        if self._catalog is not None:
+            self._catalog.sync_folder(self.folder_path, rows)
+        self.is_dirty = False
         return True
 
+    def _compact_closed_journal(self, journal: SelectionJournal) -> None:
+        rows = self._closed_journals.get(journal)
+        if rows is None:
+            return
+        if journal.compacting():
+            self.after(AUTOSAVE_RETRY_MS, lambda: self._compact_closed_journal(journal))
+            return
+        self._prune_closed_journals()
+        self._closed_journals[journal] = None
+        if not journal.compact(rows):
+            print(f"Could not save selections for {journal.folder_path}: {journal.last_error}")
+
+    def _prune_closed_journals(self) -> None:
+        # Keep only journals with a write still to start or still running
+        for journal, rows in list(self._closed_journals.items()):
+            if rows is None and not journal.compacting():
+                del self._closed_journals[journal]
+
+    def _finish_closed_journals(self) -> None:
+        # On exit: write what was deferred and wait for writes still running
+        for journal, rows in self._closed_journals.items():
+            if rows is not None:
+                journal.compact(rows, wait=True)
+            else:
+                journal.wait()
+            if journal.last_error is not None:
+                print(f"Could not save selections for {journal.folder_path} (changes kept in its journal): {journal.last_error}")
+        self._closed_journals = {}
+
+    def _check_compaction(self, journal: SelectionJournal, announce: bool) -> None:
+        if journal.compacting():
+            self.after(AUTOSAVE_RETRY_MS, lambda: self._check_compaction(journal, announce))
+            return
+        if journal.last_error is not None:
+            if journal is self.journal:
+                self.is_dirty = True
+            if announce:
+                messagebox.showerror("Save Failed", f"Could not save CSV: {journal.last_error}")
+            else:
+                self.status_var.set(f"Autosave failed: {journal.last_error}")
+        elif announce:
+            self.status_var.set(f"Saved CSV to {journal.csv_path}")
+
+    def save_csv(self) -> None:
+        if self._catalog_query is not None:
+            self.status_var.set("Changes to catalog results are saved in the catalog and in each folder's journal")
+            return
+        if not self.folder_path or self.journal is None:
+            messagebox.showinfo("No Folder", "Open a folder before saving.")
+            return
+        if self._scan_incomplete:
+            self.status_var.set("The folder scan stopped early; changes are kept in the journal, not the CSV")
+            return
+        if self.journal.compacting():
+            # Save once the running write is done rather than joining it here
+            self.status_var.set("Saving…")
+            self.after(AUTOSAVE_RETRY_MS, self.save_csv)
+            return
+        self._flush_selections()
+        self._check_compaction(self.journal, True)
+
     def _on_close(self) -> None:
-        if self._maybe_save_prompt():
-            self.destroy()
+        # Selections are journaled as they change; write the final CSV before exiting
+        if self.is_dirty:
+            self._flush_selections(wait=True)
+        self._stop_watching()
+        self._stop_metadata()
+        self._stop_hashing()
+        self._stop_focus()
+        if self._exporter is not None:
+            self._exporter.stop()
+            self._exporter.join(EXPORT_CLOSE_TIMEOUT_SECONDS)
+        if self.journal is not None:
+            self.journal.wait()
+            if self.journal.last_error is not None:
+                print(f"Could not save CSV on exit (changes kept in the journal): {self.journal.last_error}")
+            self.journal.close()
+        self._finish_closed_journals()
+        self._close_catalog_journals()
+        if self._catalog is not None:
+            self._catalog.close()
+        if self._thumb_loader is not None:
+            self._thumb_loader.cancel()
+        shutdown_executor(self._decode_executor)
+        if self._viewer_prefetcher is not None:
+            self._viewer_prefetcher.shutdown()
+        if self._viewer_renderer is not None:
+            self._viewer_renderer.shutdown()
+        self.destroy()
+
+    def report_startup(self, started: float, imported: float) -> None:
+        window_ms = (self.window_shown_at - started) * 1000
+        message = (
+            f"Startup: imports {(imported - started) * 1000:.0f} ms, window {window_ms:.0f} ms, "
+            f"ready {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        if window_ms > STARTUP_BUDGET_MS:
+            print(f"{message} (over the {STARTUP_BUDGET_MS:.0f} ms budget)")
+        elif PERF.enabled:
+            print(message)
 
     # Image loading helpers
     def _is_raw_path(self, path: str) -> bool:
-        _, ext = os.path.splitext(path)
-        return ext.lower() in RAW_EXTENSIONS
+        return is_raw_path(path)
 
-    def _open_image_for_thumbnail(self, path: str) -> Image.Image:
-        if self._is_raw_path(path) and HAS_RAWPY:
-            try:
-                with rawpy.imread(path) as raw:  # type: ignore
-                    try:
-                        thumb = raw.extract_thumb()  # type: ignore
-                        if thumb.format == rawpy.ThumbFormat.JPEG:  # type: ignore
-                            return Image.open(io.BytesIO(thumb.data))
-                        else:
-                            # BITMAP returns RGB numpy array
-                            return Image.fromarray(thumb.data)
-                    except Exception:
-                        # No thumb -> quick postprocess (half size for speed)
-                        rgb = raw.postprocess(use_auto_wb=True, no_auto_bright=True, output_bps=8, half_size=True)  # type: ignore
-                        return Image.fromarray(rgb)
-            except Exception as ex:
-                print(f"RAW thumb fallback failed for {path}: {ex}")
-        # Non-RAW or rawpy missing -> standard open
-        return Image.open(path)
-
-    def _open_image_full(self, path: str) -> Image.Image:
-        if self._is_raw_path(path) and HAS_RAWPY:
-            try:
-                with rawpy.imread(path) as raw:  # type: ignore
-                    # Full decode; half_size speeds up and is enough for screen viewing
-                    rgb = raw.postprocess(use_auto_wb=True, no_auto_bright=True, output_bps=8, half_size=True)  # type: ignore
-                    return Image.fromarray(rgb)
-            except Exception as ex:
-                print(f"RAW full decode failed for {path}: {ex}")
-        return Image.open(path)
+    def _open_image_for_thumbnail(self, path: str, size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        return open_image_for_thumbnail(path, size)
+
+    def _open_image_full(self, path: str, size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        return open_image_full(path, size)
 
     def _apply_theme(self) -> None:
         try:
@@ -559,9 +1868,13 @@ class ImageGalleryApp(tk.Tk):
             pass
 
 
-def run_app() -> None:
+def run_app(started: Optional[float] = None) -> None:
+    # `started` is the perf_counter() reading when the process began (see main.py)
+    imported = time.perf_counter()
     try:
         app = ImageGalleryApp()
+        if started is not None:
+            app.after_idle(lambda: app.report_startup(started, imported))
         app.mainloop()
     except KeyboardInterrupt:
         sys.exit(0)
@@ -0,0 +1,396 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .focus import FOCUS_FILENAME, FOCUS_VERSION
+from .lazy import LazyModule
+from .metadata import MetadataCache, camera_name
+from .thumbnails import SignatureCache
+
+# The catalog is optional; sqlite3 is imported when one is first opened, not at startup
+sqlite3 = LazyModule("sqlite3")
+
+
+# Optional catalog of every opened folder: PHOTO_SELECTOR_CATALOG=1 uses the default
+# location, any other value is the database path; unset or 0 leaves it off
+CATALOG_SETTING = os.environ.get("PHOTO_SELECTOR_CATALOG", "")
+DEFAULT_CATALOG_PATH = os.path.join(os.path.expanduser("~"), ".photo_selector", "catalog.sqlite3")
+CATALOG_VERSION = 1
+# Query results opened in the gallery are capped so a broad query stays responsive
+CATALOG_QUERY_LIMIT = int(os.environ.get("PHOTO_SELECTOR_CATALOG_LIMIT", "100000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    synced_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    folder_id INTEGER NOT NULL REFERENCES folders(id) ON DELETE CASCADE,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    liked INTEGER NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    score INTEGER NOT NULL DEFAULT 5,
+    sharpness REAL,
+    capture_time REAL,
+    camera TEXT,
+    lens TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS images_folder ON images(folder_id);
+CREATE INDEX IF NOT EXISTS images_liked ON images(liked, score, capture_time);
+CREATE INDEX IF NOT EXISTS images_rejected ON images(rejected, score, capture_time);
+CREATE INDEX IF NOT EXISTS images_score ON images(score, capture_time);
+CREATE INDEX IF NOT EXISTS images_capture ON images(capture_time);
+"""
+
+# Columns compared to decide whether a synced row changed, in table order
+_SYNC_COLUMNS = ("name", "liked", "rejected", "score", "sharpness", "capture_time", "camera", "lens", "metadata")
+CatalogValues = Tuple[str, int, int, int, Optional[float], Optional[float], Optional[str], Optional[str], Optional[str]]
+
+
+def catalog_path(setting: str = CATALOG_SETTING) -> Optional[str]:
+    if setting in ("", "0"):
+        return None
+    return DEFAULT_CATALOG_PATH if setting == "1" else os.path.abspath(os.path.expanduser(setting))
+
+
+class CatalogQuery(NamedTuple):
+    liked: Optional[bool] = None
+    rejected: Optional[bool] = None
+    min_score: Optional[int] = None
+    max_score: Optional[int] = None
+    # Capture time range, seconds since the epoch; `until` is exclusive
+    since: Optional[float] = None
+    until: Optional[float] = None
+    camera: Optional[str] = None
+    lens: Optional[str] = None
+    folder: Optional[str] = None
+    name: Optional[str] = None
+
+
+class CatalogRow(NamedTuple):
+    path: str
+    folder: str
+    liked: bool
+    rejected: bool
+    score: int
+    sharpness: Optional[float]
+    metadata: Dict[str, object]
+
+
+class CatalogAnswer(NamedTuple):
+    rows: List[CatalogRow]
+    truncated: bool
+    # (folders, images) in the whole catalog; only counted when nothing matched
+    counts: Tuple[int, int]
+    error: Optional[str]
+
+
+def _local_time(text: str, term: str) -> float:
+    for fmt in ("%Y-%m-%d", "%Y-%m", "%Y"):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"{term}: dates are YYYY, YYYY-MM or YYYY-MM-DD")
+
+
+def _next_period(text: str, term: str) -> float:
+    # Start of the year, month or day after the one written
+    start = time.localtime(_local_time(text, term))
+    parts = text.count("-")
+    year, month, day = start.tm_year, start.tm_mon, start.tm_mday
+    if parts == 0:
+        return time.mktime((year + 1, 1, 1, 0, 0, 0, 0, 0, -1))
+    if parts == 1:
+        return time.mktime((year + month // 12, month % 12 + 1, 1, 0, 0, 0, 0, 0, -1))
+    return time.mktime((year, month, day + 1, 0, 0, 0, 0, 0, -1))
+
+
+def parse_query(text: str) -> CatalogQuery:
+    """Catalog query from space-separated terms, all of which must match.
+
+    `liked`, `rejected`, `unmarked`, `not-rejected`; `score=5`, `score>=4`, `score<=2`;
+    `date:2024` (or `2024-06`, `2024-06-01`), `since:2024-03`, `until:2024-09`;
+    `camera:`, `lens:`, `folder:` and `name:` match part of the text, case-insensitively.
+    A bare word is the same as `name:`.
+    """
+    fields: Dict[str, object] = {}
+    for term in text.split():
+        lowered = term.lower()
+        key, sep, value = lowered.partition(":")
+        if lowered == "liked":
+            fields["liked"] = True
+        elif lowered == "rejected":
+            fields["rejected"] = True
+        elif lowered == "not-rejected":
+            fields["rejected"] = False
+        elif lowered == "unmarked":
+            fields["liked"] = False
+            fields["rejected"] = False
+        elif lowered.startswith("score"):
+            op = lowered[5:7] if lowered[5:7] in (">=", "<=") else lowered[5:6]
+            try:
+                if op not in ("=", ":", ">=", "<="):
+                    raise ValueError
+                score = int(lowered[5 + len(op):])
+            except ValueError:
+                raise ValueError(f"{term}: use score=N, score>=N or score<=N")
+            if op != "<=":
+                fields["min_score"] = score
+            if op != ">=":
+                fields["max_score"] = score
+        elif sep and key in ("date", "year"):
+            fields["since"] = _local_time(value, term)
+            fields["until"] = _next_period(value, term)
+        elif sep and key == "since":
+            fields["since"] = _local_time(value, term)
+        elif sep and key == "until":
+            fields["until"] = _next_period(value, term)
+        elif sep and key in ("camera", "lens", "folder", "name"):
+            # Original case; LIKE ignores ASCII case anyway
+            fields[key] = term.partition(":")[2]
+        elif sep:
+            raise ValueError(f"{term}: unknown term")
+        else:
+            fields["name"] = term
+    return CatalogQuery(**fields)  # type: ignore[arg-type]
+
+
+def _like(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _where(query: CatalogQuery) -> Tuple[str, List[object]]:
+    clauses: List[str] = []
+    params: List[object] = []
+    if query.liked is not None:
+        clauses.append("images.liked = ?")
+        params.append(int(query.liked))
+    if query.rejected is not None:
+        clauses.append("images.rejected = ?")
+        params.append(int(query.rejected))
+    if query.min_score is not None and query.min_score == query.max_score:
+        # Equality keeps the capture-time part of the state indexes usable
+        clauses.append("images.score = ?")
+        params.append(query.min_score)
+    else:
+        if query.min_score is not None:
+            clauses.append("images.score >= ?")
+            params.append(query.min_score)
+        if query.max_score is not None:
+            clauses.append("images.score <= ?")
+            params.append(query.max_score)
+    if query.since is not None:
+        clauses.append("images.capture_time >= ?")
+        params.append(query.since)
+    if query.until is not None:
+        clauses.append("images.capture_time < ?")
+        params.append(query.until)
+    if query.folder:
+        # Matched against the small folders table, then looked up by folder id
+        clauses.append("images.folder_id IN (SELECT id FROM folders WHERE path LIKE ? ESCAPE '\\')")
+        params.append(_like(query.folder))
+    for column, value in (("images.camera", query.camera), ("images.lens", query.lens), ("images.name", query.name)):
+        if value:
+            clauses.append(f"{column} LIKE ? ESCAPE '\\'")
+            params.append(_like(value))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _parse_csv_row(row: List[str]) -> Tuple[str, str, int, int, int, Optional[float]]:
+    # (path, name, liked, rejected, score, sharpness) from RecordStore.csv_row()
+    name, path, liked, rejected, score, sharpness = row[:6]
+    return path, name, int(liked == "1"), int(rejected == "1"), int(score), float(sharpness) if sharpness else None
+
+
+class Catalog:
+    """SQLite catalog of the images in every folder opened, for queries across them.
+
+    Writes go through one background thread: `sync_folder()` hands it a folder's
+    CSV rows (the same snapshot the autosave writes) and it merges in the folder's
+    cached metadata and sharpness, then writes only rows that changed and deletes
+    rows for files that are gone. `submit_query()` runs a query on the same thread,
+    after the syncs already handed to it, and answers on a queue for the Tk thread
+    to poll. `query()` runs on the caller's thread on its own connection; WAL mode
+    lets it read while a sync is writing.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+        finally:
+            conn.close()
+        self.last_error: Optional[str] = None
+        self._tasks: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="catalog", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> "sqlite3.Connection":
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def sync_folder(self, folder_path: str, rows: List[List[str]]) -> None:
+        self._tasks.put(("sync", (os.path.abspath(folder_path), rows)))
+
+    def update_selections(self, changes: Iterable[Tuple[str, bool, bool, int]]) -> None:
+        # Selections made in a query result, whose folders are not loaded
+        self._tasks.put(("selections", (list(changes),)))
+
+    def submit_query(self, query: CatalogQuery, limit: int = CATALOG_QUERY_LIMIT) -> "queue.Queue[CatalogAnswer]":
+        # One CatalogAnswer arrives on the returned queue once earlier syncs are written
+        answers: "queue.Queue[CatalogAnswer]" = queue.Queue()
+        self._tasks.put(("query", (query, limit, answers)))
+        return answers
+
+    def wait(self) -> None:
+        self._tasks.join()
+
+    def close(self) -> None:
+        self._tasks.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                task = self._tasks.get()
+                try:
+                    if task is None:
+                        # Refreshes the planner's statistics when the tables changed a lot
+                        conn.execute("PRAGMA optimize")
+                        return
+                    kind, args = task
+                    if kind == "query":
+                        self._answer(conn, *args)
+                        continue
+                    try:
+                        with conn:
+                            if kind == "sync":
+                                self._sync(conn, *args)
+                            else:
+                                self._update(conn, *args)
+                        self.last_error = None
+                    except (sqlite3.Error, OSError, ValueError) as ex:
+                        self.last_error = str(ex)
+                        print(f"Catalog {kind} failed: {ex}")
+                finally:
+                    self._tasks.task_done()
+        finally:
+            conn.close()
+
+    def _sync(self, conn: "sqlite3.Connection", folder_path: str, rows: List[List[str]]) -> None:
+        # The folder's caches are already validated against file signatures whenever the
+        # folder is open in the app, so their entries are taken as they are
+        metadata = MetadataCache(folder_path).load().entries
+        focus = SignatureCache(folder_path, FOCUS_FILENAME, FOCUS_VERSION).load().entries
+        conn.execute(
+            "INSERT INTO folders (path, synced_at) VALUES (?, ?) ON CONFLICT(path) DO UPDATE SET synced_at = excluded.synced_at",
+            (folder_path, time.time()),
+        )
+        (folder_id,) = conn.execute("SELECT id FROM folders WHERE path = ?", (folder_path,)).fetchone()
+        existing: Dict[str, Tuple[int, CatalogValues]] = {
+            row[1]: (row[0], tuple(row[2:]))  # type: ignore[misc]
+            for row in conn.execute(f"SELECT id, path, {', '.join(_SYNC_COLUMNS)} FROM images WHERE folder_id = ?", (folder_id,))
+        }
+        changed: List[tuple] = []
+        seen = set()
+        for row in rows:
+            path, name, liked, rejected, score, sharpness = _parse_csv_row(row)
+            seen.add(path)
+            relative = os.path.relpath(path, folder_path)
+            meta_entry = metadata.get(relative)
+            meta = meta_entry[1] if meta_entry is not None and isinstance(meta_entry[1], dict) else {}
+            if sharpness is None:
+                focus_entry = focus.get(relative)
+                if focus_entry is not None and isinstance(focus_entry[1], (int, float)) and focus_entry[1] >= 0:
+                    sharpness = float(focus_entry[1])
+            # EXIF capture time, else the file time, as the gallery's capture-time sort uses
+            stamp = meta.get("time", meta.get("file_time"))
+            lens = meta.get("lens")
+            values: CatalogValues = (
+                name,
+                liked,
+                rejected,
+                score,
+                sharpness,
+                float(stamp) if isinstance(stamp, (int, float)) else None,
+                camera_name(meta) or None,
+                str(lens) if lens else None,
+                json.dumps(meta, separators=(",", ":"), sort_keys=True) if meta else None,
+            )
+            previous = existing.get(path)
+            if previous is None or previous[1] != values:
+                changed.append((folder_id, path) + values)
+        conn.executemany(
+            f"INSERT INTO images (folder_id, path, {', '.join(_SYNC_COLUMNS)}) VALUES ({', '.join('?' * (len(_SYNC_COLUMNS) + 2))}) "
+            "ON CONFLICT(path) DO UPDATE SET folder_id = excluded.folder_id, "
+            + ", ".join(f"{column} = excluded.{column}" for column in _SYNC_COLUMNS),
+            changed,
+        )
+        gone = [(image_id,) for path, (image_id, _) in existing.items() if path not in seen]
+        conn.executemany("DELETE FROM images WHERE id = ?", gone)
+
+    def _update(self, conn: "sqlite3.Connection", changes: List[Tuple[str, bool, bool, int]]) -> None:
+        conn.executemany(
+            "UPDATE images SET liked = ?, rejected = ?, score = ? WHERE path = ?",
+            [(int(liked), int(rejected), score, path) for path, liked, rejected, score in changes],
+        )
+
+    def _answer(self, conn: "sqlite3.Connection", query: CatalogQuery, limit: int, answers: "queue.Queue[CatalogAnswer]") -> None:
+        try:
+            rows, truncated = _select(conn, query, limit)
+            answers.put(CatalogAnswer(rows, truncated, (0, 0) if rows else _count(conn), None))
+        except sqlite3.Error as ex:
+            answers.put(CatalogAnswer([], False, (0, 0), str(ex)))
+
+    def query(self, query: CatalogQuery, limit: int = CATALOG_QUERY_LIMIT) -> Tuple[List[CatalogRow], bool]:
+        # Matches in capture time order, and whether there were more than `limit`
+        conn = self._connect()
+        try:
+            return _select(conn, query, limit)
+        finally:
+            conn.close()
+
+    def counts(self) -> Tuple[int, int]:
+        # (folders, images)
+        conn = self._connect()
+        try:
+            return _count(conn)
+        finally:
+            conn.close()
+
+
+def _select(conn: "sqlite3.Connection", query: CatalogQuery, limit: int) -> Tuple[List[CatalogRow], bool]:
+    where, params = _where(query)
+    sql = (
+        "SELECT images.path, folders.path, liked, rejected, score, sharpness, metadata "
+        "FROM images JOIN folders ON folders.id = images.folder_id"
+        f"{where} ORDER BY capture_time LIMIT ?"
+    )
+    rows = conn.execute(sql, params + [limit + 1]).fetchall()
+    results = [
+        CatalogRow(path, folder, bool(liked), bool(rejected), score, sharpness, json.loads(meta) if meta else {})
+        for path, folder, liked, rejected, score, sharpness, meta in rows[:limit]
+    ]
+    return results, len(rows) > limit
+
+
+def _count(conn: "sqlite3.Connection") -> Tuple[int, int]:
+    folders = conn.execute("SELECT COUNT(*) FROM folders").fetchone()[0]
+    images = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+    return folders, images
@@ -0,0 +1,375 @@
+import argparse
+import os
+import queue
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .catalog import CATALOG_QUERY_LIMIT, DEFAULT_CATALOG_PATH, Catalog, catalog_path, parse_query
+from .decode import DECODE_POOL_KIND, DECODE_WORKERS, FocusIndexer, HashIndexer, create_executor, shutdown_executor
+from .export import (
+    EXPORT_HARDLINK,
+    EXPORT_JPEG_EDGE,
+    EXPORT_JPEG_QUALITY,
+    EXPORT_MODE,
+    EXPORT_MODES,
+    ExportOptions,
+    Exporter,
+    export_target_error,
+    select_for_export,
+)
+from .focus import FOCUS_FILENAME, FOCUS_VERSION, HAS_NUMPY
+from .metadata import MetadataLoader
+from .records import RecordStore, Selection
+from .scanner import ScanIndex, iter_image_batches
+from .selections import (
+    CSV_FILENAME,
+    SelectionJournal,
+    iter_selection_rows,
+    read_selections_csv,
+    selection_key,
+    write_selections_csv,
+)
+from .thumbnails import THUMBNAIL_SIZE, SignatureCache, file_signature
+
+
+# Headless batch commands for `python main.py <command>`. Nothing here imports
+# tkinter, so they run on servers without a display.
+
+PROGRESS_INTERVAL_SECONDS = 1.0
+WARM_STEPS = ("thumbnails", "metadata", "focus")
+
+
+def scan_folder(folder_path: str) -> Tuple[List[str], int]:
+    # The GUI's scan: same order, same skip rules, and the scan index is saved so the
+    # next open of the folder only re-lists changed directories
+    index = ScanIndex(folder_path).load()
+    paths: List[str] = []
+    skipped = 0
+    for batch, batch_skipped in iter_image_batches(folder_path, index):
+        paths.extend(batch)
+        skipped += batch_skipped
+    index.save()
+    return paths, skipped
+
+
+def load_selections(folder_path: str, paths: Sequence[str]) -> Tuple[RecordStore, int]:
+    # Saved CSV plus any journal entries not compacted into it yet, as the GUI loads them
+    saved = read_selections_csv(os.path.join(folder_path, CSV_FILENAME))
+    store = RecordStore()
+    store.extend(paths, [saved.get(selection_key(path)) for path in paths])
+    by_key = {selection_key(path): index for index, path in enumerate(paths)}
+
+    def _apply(path: str, liked: bool, rejected: bool, score: int) -> bool:
+        index = by_key.get(selection_key(path))
+        if index is None:
+            return False
+        store.set_selection(index, liked, rejected, score)
+        return True
+
+    journal = SelectionJournal(folder_path)
+    try:
+        recovered = journal.recover(_apply)
+    finally:
+        journal.close()
+    return store, recovered
+
+
+def fill_sharpness(store: RecordStore, folder_path: str) -> int:
+    # Sharpness scores already measured (by the GUI or `warm`); nothing is decoded here
+    cache = SignatureCache(folder_path, FOCUS_FILENAME, FOCUS_VERSION).load()
+    found = 0
+    for path in list(store.paths()):
+        signature = file_signature(path)
+        value = cache.get(path, signature) if signature is not None else None
+        if isinstance(value, (int, float)) and value >= 0:
+            store.set_sharpness(path, float(value))
+            found += 1
+    return found
+
+
+class _Progress:
+    def __init__(self, total: int, steps: Sequence[str]) -> None:
+        self.total = total
+        self.done: Dict[str, int] = {step: 0 for step in steps}
+        self.started = time.monotonic()
+        self._last = 0.0
+        self._tty = sys.stderr.isatty()
+
+    def report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last < PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last = now
+        elapsed = max(now - self.started, 1e-6)
+        parts = [f"{step} {count}/{self.total}" for step, count in self.done.items()]
+        rate = sum(self.done.values()) / len(self.done) / elapsed if self.done else 0.0
+        line = "  ".join(parts) + f"  {rate:.1f} images/s  {elapsed:.0f}s"
+        if self._tty:
+            sys.stderr.write("\r" + line + ("\n" if force else ""))
+        else:
+            sys.stderr.write(line + "\n")
+        sys.stderr.flush()
+
+
+def warm_folder(folder_path: str, steps: Sequence[str], kind: str, workers: int) -> int:
+    started = time.monotonic()
+    paths, skipped = scan_folder(folder_path)
+    print(f"{folder_path}: {len(paths)} images (skipped {skipped}) in {time.monotonic() - started:.1f}s")
+    if not paths:
+        return 0
+    if "focus" in steps and not HAS_NUMPY:
+        print("Skipping focus: numpy is not installed")
+        steps = [step for step in steps if step != "focus"]
+
+    executor = create_executor(kind, workers)
+    loaders: Dict[str, object] = {}
+    try:
+        # Hashing goes through the cached thumbnail, so it also fills the thumbnail cache
+        if "thumbnails" in steps:
+            loaders["thumbnails"] = HashIndexer(executor, folder_path, THUMBNAIL_SIZE, workers).start(paths)
+        if "metadata" in steps:
+            loaders["metadata"] = MetadataLoader(folder_path).start(paths)
+        if "focus" in steps:
+            loaders["focus"] = FocusIndexer(executor, folder_path, workers=workers).start(paths)
+        progress = _Progress(len(paths), list(loaders))
+        running = set(loaders)
+        while running:
+            for step in list(running):
+                results: "queue.Queue" = loaders[step].results  # type: ignore[attr-defined]
+                while True:
+                    try:
+                        batch = results.get(timeout=0.05)
+                    except queue.Empty:
+                        break
+                    if batch is None:
+                        # Every path was queued up front, so the first idle means done
+                        running.discard(step)
+                        break
+                    progress.done[step] += len(batch)
+            progress.report()
+        progress.report(force=True)
+    except KeyboardInterrupt:
+        print("\nInterrupted; caches keep what was finished")
+        return 130
+    finally:
+        for loader in loaders.values():
+            loader.stop()  # type: ignore[attr-defined]
+        shutdown_executor(executor)
+    return 0
+
+
+def export_folder(folder_path: str, out_path: Optional[str]) -> int:
+    paths, _ = scan_folder(folder_path)
+    store, recovered = load_selections(folder_path, paths)
+    fill_sharpness(store, folder_path)
+    rows = store.csv_rows()
+    if out_path is None:
+        # The folder's own CSV: compact the journal into it, as the GUI does on save
+        journal = SelectionJournal(folder_path)
+        try:
+            if not journal.compact(rows, wait=True) or journal.last_error is not None:
+                return 1
+        finally:
+            journal.close()
+        out_path = journal.csv_path
+    else:
+        write_selections_csv(out_path, rows)
+    counts = store.counts()
+    print(
+        f"Wrote {counts['total']} images to {out_path} ({counts['liked']} liked, {counts['rejected']} rejected"
+        + (f", {recovered} recovered from the journal)" if recovered else ")")
+    )
+    return 0
+
+
+def export_files(
+    folder_path: str, target: str, options: ExportOptions, min_score: Optional[int], liked_only: bool, kind: str, workers: int
+) -> int:
+    problem = export_target_error(folder_path, target)
+    if problem is not None:
+        print(problem)
+        return 1
+    paths, _ = scan_folder(folder_path)
+    store, _ = load_selections(folder_path, paths)
+    selected = select_for_export(store, min_score, liked_only)
+    if not selected:
+        print("Nothing to export: no images match")
+        return 0
+    verb = "Linking" if options.mode == EXPORT_HARDLINK else "Copying"
+    print(f"{verb} {len(selected)} images to {target}" + (f" with {options.jpeg_edge} px JPEGs" if options.jpeg_edge else ""))
+
+    executor = create_executor(kind, workers)
+    exporter = Exporter(executor, folder_path, target, options, workers).start(selected)
+    progress = _Progress(len(selected), ["exported"])
+    written = nbytes = failed = current = 0
+    status = 0
+    try:
+        while True:
+            try:
+                result = exporter.results.get(timeout=0.05)
+            except queue.Empty:
+                progress.report()
+                continue
+            if result is None:
+                break
+            progress.done["exported"] += 1
+            written += len(result.written)
+            nbytes += result.nbytes
+            failed += result.error is not None
+            current += not result.written and result.error is None
+            progress.report()
+        progress.report(force=True)
+    except KeyboardInterrupt:
+        # Files being written finish and go into the manifest before exiting
+        exporter.stop()
+        exporter.join()
+        print("\nInterrupted; run the same command again to resume")
+        status = 130
+    finally:
+        shutdown_executor(executor)
+    if not status:
+        print(
+            f"Wrote {written} files ({nbytes / (1024 * 1024):.0f} MB), {current} images already up to date"
+            + (f", {failed} images failed" if failed else "")
+        )
+    return status or (1 if failed else 0)
+
+
+def merge_csvs(csv_paths: Sequence[str], out_path: str) -> int:
+    # Later files win for images that appear in several
+    merged: Dict[str, Tuple[str, Selection, Optional[float]]] = {}
+    for csv_path in csv_paths:
+        if not os.path.isfile(csv_path):
+            print(f"No such file: {csv_path}")
+            return 1
+        for path, selection, sharpness in iter_selection_rows(csv_path):
+            previous = merged.get(selection_key(path))
+            # A file written before sharpness was measured keeps the earlier score
+            if sharpness is None and previous is not None:
+                sharpness = previous[2]
+            merged[selection_key(path)] = (path, selection, sharpness)
+    store = RecordStore()
+    store.extend([path for path, _, _ in merged.values()], [selection for _, selection, _ in merged.values()])
+    for path, _, sharpness in merged.values():
+        if sharpness is not None:
+            store.set_sharpness(path, sharpness)
+    write_selections_csv(out_path, store.csv_rows())
+    print(f"Merged {len(csv_paths)} files into {out_path} ({len(store)} images)")
+    return 0
+
+
+def sync_catalog(folder_paths: Sequence[str], path: str) -> int:
+    # Same rows the GUI syncs: selections with the journal applied, plus cached sharpness
+    catalog = Catalog(path)
+    try:
+        for folder_path in folder_paths:
+            paths, _ = scan_folder(folder_path)
+            store, _ = load_selections(folder_path, paths)
+            fill_sharpness(store, folder_path)
+            catalog.sync_folder(folder_path, store.csv_rows())
+            catalog.wait()
+            if catalog.last_error is not None:
+                return 1
+            print(f"{folder_path}: {len(store)} images")
+        folders, images = catalog.counts()
+        print(f"{path}: {images} images in {folders} folders")
+    finally:
+        catalog.close()
+    return 0
+
+
+def find_images(text: str, path: str, limit: int) -> int:
+    try:
+        query = parse_query(text)
+    except ValueError as ex:
+        print(ex)
+        return 1
+    if not os.path.exists(path):
+        print(f"No catalog at {path}; run catalog-sync first")
+        return 1
+    catalog = Catalog(path)
+    try:
+        rows, truncated = catalog.query(query, limit)
+    finally:
+        catalog.close()
+    for row in rows:
+        print(row.path)
+    if truncated:
+        print(f"Stopped after {limit} matches; use --limit for more", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="Photo Selector batch commands (run without arguments for the GUI).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    warm = commands.add_parser("warm", help="pre-generate thumbnails, metadata and sharpness caches")
+    warm.add_argument("folders", nargs="+", help="folders to warm, each scanned recursively")
+    warm.add_argument("--skip", action="append", choices=WARM_STEPS, default=[], help="leave out a step (repeatable)")
+    warm.add_argument("--workers", type=int, default=DECODE_WORKERS, help=f"decode workers (default {DECODE_WORKERS})")
+    warm.add_argument("--pool", choices=("process", "thread"), default=DECODE_POOL_KIND, help="decode pool kind")
+
+    export = commands.add_parser("export", help="write a folder's selections, journal included, to CSV")
+    export.add_argument("folder")
+    export.add_argument("-o", "--output", help=f"output CSV (default: the folder's own {CSV_FILENAME})")
+
+    files = commands.add_parser("export-files", help="copy or hard-link liked images, with their .xmp sidecars, to a folder")
+    files.add_argument("folder")
+    files.add_argument("target", help="destination folder; the source folder's layout is kept below it")
+    files.add_argument("--min-score", type=int, help="only images scored at least this")
+    files.add_argument("--not-rejected", action="store_true", help="every image not rejected, not only liked ones")
+    files.add_argument("--mode", choices=EXPORT_MODES, default=EXPORT_MODE, help="how originals are exported")
+    files.add_argument("--jpeg", type=int, default=EXPORT_JPEG_EDGE, metavar="PX", help="also render JPEGs this long on the long edge")
+    files.add_argument("--quality", type=int, default=EXPORT_JPEG_QUALITY, help="JPEG quality of the renders")
+    files.add_argument("--workers", type=int, default=DECODE_WORKERS, help=f"export workers (default {DECODE_WORKERS})")
+    files.add_argument("--pool", choices=("process", "thread"), default=DECODE_POOL_KIND, help="worker pool kind")
+
+    default_catalog = catalog_path() or DEFAULT_CATALOG_PATH
+    sync = commands.add_parser("catalog-sync", help="add or refresh folders in the SQLite catalog")
+    sync.add_argument("folders", nargs="+")
+    sync.add_argument("--catalog", default=default_catalog, help=f"catalog database (default {default_catalog})")
+
+    find = commands.add_parser("find", help="print catalogued images matching a query, e.g. 'liked score=5 date:2024'")
+    find.add_argument("query")
+    find.add_argument("--catalog", default=default_catalog, help=f"catalog database (default {default_catalog})")
+    find.add_argument("--limit", type=int, default=CATALOG_QUERY_LIMIT)
+
+    merge = commands.add_parser("merge", help="merge selection CSVs; later files win")
+    merge.add_argument("csvs", nargs="+")
+    merge.add_argument("-o", "--output", required=True)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "merge":
+        return merge_csvs(args.csvs, args.output)
+    if args.command == "find":
+        return find_images(args.query, args.catalog, max(1, args.limit))
+    folders = args.folders if args.command in ("warm", "catalog-sync") else [args.folder]
+    for folder in folders:
+        if not os.path.isdir(folder):
+            print(f"Not a folder: {folder}")
+            return 1
+    if args.command == "export":
+        return export_folder(os.path.abspath(args.folder), args.output)
+    if args.command == "catalog-sync":
+        return sync_catalog([os.path.abspath(folder) for folder in folders], args.catalog)
+    if args.command == "export-files":
+        options = ExportOptions(args.mode, max(0, args.jpeg), args.quality)
+        return export_files(
+            os.path.abspath(args.folder),
+            os.path.abspath(args.target),
+            options,
+            args.min_score,
+            not args.not_rejected,
+            args.pool,
+            max(1, args.workers),
+        )
+    steps = [step for step in WARM_STEPS if step not in args.skip]
+    for folder in folders:
+        status = warm_folder(os.path.abspath(folder), steps, args.pool, max(1, args.workers))
+        if status:
+            return status
+    return 0
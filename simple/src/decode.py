@@ -0,0 +1,336 @@
+import abc
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from .focus import FOCUS_FILENAME, FOCUS_SIZE, FOCUS_VERSION, score_image
+from .imaging import make_thumbnail
+from .similarity import HASH_FILENAME, HASH_VERSION, dhash
+from .thumbnails import SignatureCache, ThumbnailCache, file_signature
+
+
+# Pool configuration; both can be overridden from the environment.
+# "process" scales CPU-bound rawpy/PIL work across cores, "thread" avoids worker start-up cost.
+DECODE_POOL_KIND = os.environ.get("PHOTO_SELECTOR_DECODE_POOL", "process")
+DECODE_WORKERS = int(os.environ.get("PHOTO_SELECTOR_DECODE_WORKERS", "0")) or max(1, (os.cpu_count() or 2) - 1)
+# Indexer results (hashes, focus scores) reach the Tk thread in batches; their
+# caches are rewritten this often. Unreadable files are cached as INDEX_UNREADABLE.
+INDEX_BATCH_SIZE = 500
+INDEX_SAVE_EVERY = 2000
+INDEX_UNREADABLE = -1
+
+
+class ThumbnailResult(NamedTuple):
+    key: Any
+    path: str
+    mode: str
+    size: Tuple[int, int]
+    data: Optional[bytes]
+    error: Optional[str]
+    # Worker-side timing for the perf overlay; the pool may be another process
+    decode_ms: float = 0.0
+    cache_hit: bool = False
+
+
+@lru_cache(maxsize=16)
+def _thumbnail_cache(folder_path: str, size: Tuple[int, int]) -> ThumbnailCache:
+    # One per folder and size in each worker, so a cache disabled after a failed write
+    # (read-only media) stays disabled instead of failing again for every image
+    return ThumbnailCache(folder_path, size)
+
+
+def _cached_thumbnail(
+    path: str, folder_path: str, size: Tuple[int, int], signature: Optional[str]
+) -> Tuple[Image.Image, bool]:
+    # Disk cache first, decode and store on a miss; always RGB. Also returns whether
+    # the disk cache had it.
+    store = _thumbnail_cache(folder_path, tuple(size))
+    img = store.load(path, signature)
+    if img is None:
+        img = make_thumbnail(path, size)
+        store.store(path, img, signature)
+        return img, False
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img, True
+
+
+def render_thumbnail(key: Any, path: str, folder_path: str, size: Tuple[int, int]) -> ThumbnailResult:
+    # Runs inside a pool worker: check the disk cache, decode on miss, return raw RGB bytes
+    start = time.perf_counter()
+    try:
+        img, hit = _cached_thumbnail(path, folder_path, size, file_signature(path))
+        elapsed = (time.perf_counter() - start) * 1000
+        return ThumbnailResult(key, path, img.mode, img.size, img.tobytes(), None, elapsed, hit)
+    except Exception as ex:
+        return ThumbnailResult(key, path, "", (0, 0), None, str(ex), (time.perf_counter() - start) * 1000)
+
+
+def hash_thumbnail(
+    path: str, folder_path: str, size: Tuple[int, int], signature: Optional[str]
+) -> Tuple[str, Optional[int], Optional[str]]:
+    # Runs inside a pool worker: perceptual hash of the gallery thumbnail, which also
+    # leaves the thumbnail in the disk cache for the gallery
+    try:
+        return path, dhash(_cached_thumbnail(path, folder_path, size, signature)[0]), None
+    except Exception as ex:
+        return path, None, str(ex)
+
+
+def score_focus(path: str, size: Tuple[int, int]) -> Tuple[str, Optional[float], Optional[str]]:
+    # Runs inside a pool worker: sharpness of a reduced decode (embedded preview for RAWs)
+    try:
+        return path, score_image(path, size), None
+    except Exception as ex:
+        return path, None, str(ex)
+
+
+def create_executor(kind: str = DECODE_POOL_KIND, workers: int = DECODE_WORKERS) -> Executor:
+    if kind == "process":
+        # Imported here: concurrent.futures.process pulls in multiprocessing at startup
+        from concurrent.futures import ProcessPoolExecutor
+
+        try:
+            return ProcessPoolExecutor(max_workers=workers)
+        except (OSError, NotImplementedError, ImportError) as ex:
+            # e.g. no working sem_open on this platform
+            print(f"Process pool unavailable ({ex}); decoding on threads")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode")
+
+
+class ThumbnailLoader:
+    """Feeds thumbnail jobs to a pool and collects results for the Tk thread.
+
+    Only a small window of jobs is in flight at a time so `cancel()` is cheap. The Tk
+    side polls `drain()` from `after()`, which also tops the window up, and only
+    builds `PhotoImage`s itself.
+    """
+
+    def __init__(self, executor: Executor, workers: int = DECODE_WORKERS) -> None:
+        self._executor = executor
+        self._max_in_flight = max(2, workers * 2)
+        self._lock = threading.RLock()
+        self._pending: Deque[Tuple[Any, str]] = deque()
+        self._in_flight: Dict[Future, Any] = {}
+        self._generations: Dict[Future, int] = {}
+        self._results: "queue.Queue[Tuple[int, ThumbnailResult]]" = queue.Queue()
+        self._generation = 0
+        self._folder_path = ""
+        # Per-path cache folders when the images come from several folders (a catalog query)
+        self._folders: Dict[str, str] = {}
+        self._size: Tuple[int, int] = (0, 0)
+
+    def start(
+        self, folder_path: str, size: Tuple[int, int], jobs: List[Tuple[Any, str]], folders: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.cancel()
+        with self._lock:
+            self._folder_path = folder_path
+            self._folders = folders or {}
+            self._size = size
+            self._pending.extend(jobs)
+        self._pump()
+
+    def request(self, jobs: List[Tuple[Any, str]]) -> None:
+        # Replace the queue with the jobs that matter now (e.g. the visible gallery rows);
+        # work already running is kept and still delivers its result
+        with self._lock:
+            running = {key for future, key in self._in_flight.items() if self._generations.get(future) == self._generation}
+            self._pending.clear()
+            self._pending.extend(job for job in jobs if job[0] not in running)
+        self._pump()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._pending.clear()
+            in_flight = list(self._in_flight)
+        for future in in_flight:
+            future.cancel()
+
+    def busy(self) -> bool:
+        with self._lock:
+            return bool(self._pending or self._in_flight)
+
+    def _pump(self) -> None:
+        with self._lock:
+            while self._pending and len(self._in_flight) < self._max_in_flight:
+                key, path = self._pending.popleft()
+                try:
+                    folder_path = self._folders.get(path, self._folder_path)
+                    future = self._executor.submit(render_thumbnail, key, path, folder_path, self._size)
+                except RuntimeError:
+                    # Executor shut down while closing the app
+                    self._pending.clear()
+                    return
+                self._in_flight[future] = key
+                self._generations[future] = self._generation
+                future.add_done_callback(self._on_done)
+
+    def _on_done(self, future: Future) -> None:
+        # Queue the result before leaving _in_flight so busy() never misses it
+        with self._lock:
+            generation = self._generations.get(future, -1)
+        if generation == self._generation and not future.cancelled():
+            try:
+                self._results.put((generation, future.result()))
+            except Exception as ex:
+                print(f"Thumbnail worker failed: {ex}")
+        with self._lock:
+            self._in_flight.pop(future, None)
+            self._generations.pop(future, None)
+
+    def drain(self, limit: int = 64) -> List[ThumbnailResult]:
+        self._pump()
+        results: List[ThumbnailResult] = []
+        while len(results) < limit:
+            try:
+                generation, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self._generation:
+                results.append(result)
+        return results
+
+
+class PoolIndexer(abc.ABC):
+    """Per-image values for a folder's images, computed in the shared decode pool.
+
+    A coordinator thread answers from a `SignatureCache` where it can and keeps a
+    small window of misses in the pool, so the gallery's own thumbnail jobs are never
+    stuck behind a whole folder. `results` carries lists of `(path, value)` pairs
+    (value None for unreadable files), and `None` each time the work runs out.
+    Subclasses name the cache file and submit the job.
+    """
+
+    cache_filename = ""
+    cache_version = 0
+    name = "index"
+
+    def __init__(self, executor: Executor, folder_path: str, size: Tuple[int, int], workers: int = DECODE_WORKERS) -> None:
+        self.cache = SignatureCache(folder_path, self.cache_filename, self.cache_version)
+        self.results: "queue.Queue[Optional[List[Tuple[str, Any]]]]" = queue.Queue()
+        self._executor = executor
+        self._folder_path = folder_path
+        self._size = size
+        self._window = max(1, workers)
+        self._pending: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+
+    def start(self, paths: Iterable[str]) -> "PoolIndexer":
+        self.enqueue(paths)
+        self._thread.start()
+        return self
+
+    def enqueue(self, paths: Iterable[str]) -> None:
+        with self._lock:
+            self._pending.extend(paths)
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    @abc.abstractmethod
+    def _submit(self, path: str, signature: str) -> Future:
+        ...
+
+    def _take(self) -> Optional[str]:
+        with self._lock:
+            if self._pending:
+                return self._pending.popleft()
+            self._wake.clear()
+            return None
+
+    def _run(self) -> None:
+        self.cache.load()
+        in_flight: Dict[Future, str] = {}
+        batch: List[Tuple[str, Any]] = []
+        unsaved = 0
+        while not self._stop.is_set():
+            while len(in_flight) < self._window:
+                path = self._take()
+                if path is None:
+                    break
+                signature = file_signature(path)
+                if signature is None:
+                    continue
+                cached = self.cache.get(path, signature)
+                if cached is not None:
+                    batch.append((path, None if cached == INDEX_UNREADABLE else cached))
+                    continue
+                try:
+                    future = self._submit(path, signature)
+                except RuntimeError:
+                    return
+                in_flight[future] = signature
+            if len(batch) >= INDEX_BATCH_SIZE or (batch and in_flight):
+                self.results.put(batch)
+                batch = []
+            if not in_flight:
+                if batch:
+                    self.results.put(batch)
+                    batch = []
+                self.cache.save()
+                unsaved = 0
+                self.results.put(None)
+                self._wake.wait()
+                continue
+            done, _ = wait(list(in_flight), timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                signature = in_flight.pop(future)
+                try:
+                    path, value, error = future.result()
+                except Exception as ex:
+                    print(f"{self.name} worker failed: {ex}")
+                    continue
+                if error is not None:
+                    print(f"{self.name}: could not read {path}: {error}")
+                # Broken files are cached too, so they are not retried on every open
+                self.cache.put(path, signature, value if value is not None else INDEX_UNREADABLE)
+                batch.append((path, value))
+                unsaved += 1
+            if unsaved >= INDEX_SAVE_EVERY:
+                self.cache.save()
+                unsaved = 0
+
+
+class HashIndexer(PoolIndexer):
+    """Perceptual hashes of gallery thumbnails, cached in `.photo_selector/hashes.json`."""
+
+    cache_filename = HASH_FILENAME
+    cache_version = HASH_VERSION
+    name = "hash-index"
+
+    def _submit(self, path: str, signature: str) -> Future:
+        return self._executor.submit(hash_thumbnail, path, self._folder_path, self._size, signature)
+
+
+class FocusIndexer(PoolIndexer):
+    """Sharpness scores of reduced decodes, cached in `.photo_selector/focus.json`."""
+
+    cache_filename = FOCUS_FILENAME
+    cache_version = FOCUS_VERSION
+    name = "focus-index"
+
+    def __init__(self, executor: Executor, folder_path: str, size: Tuple[int, int] = FOCUS_SIZE, workers: int = DECODE_WORKERS) -> None:
+        super().__init__(executor, folder_path, size, workers)
+
+    def _submit(self, path: str, signature: str) -> Future:
+        return self._executor.submit(score_focus, path, self._size)
+
+
+def shutdown_executor(executor: Optional[Executor]) -> None:
+    if executor is None:
+        return
+    executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,343 @@
+import os
+import queue
+import shutil
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from PIL import Image, ImageOps
+
+from .imaging import SIDE_CAR_EXTENSIONS, VIEWER_REDUCING_GAP, is_raw_path, open_image_full
+from .metadata import render_exif
+from .records import RecordStore
+from .thumbnails import SignatureCache, file_signature
+
+
+# How originals reach the target folder. Hard links cost no space or copying but need
+# the same filesystem; they fall back to a copy when the link is refused.
+EXPORT_COPY = "copy"
+EXPORT_HARDLINK = "hardlink"
+EXPORT_MODES = (EXPORT_COPY, EXPORT_HARDLINK)
+EXPORT_MODE = os.environ.get("PHOTO_SELECTOR_EXPORT_MODE", EXPORT_COPY)
+# Resized JPEGs go under <target>/jpeg, their long edge this many pixels; 0 skips them
+EXPORT_JPEG = "jpeg"
+EXPORT_JPEG_DIRNAME = "jpeg"
+EXPORT_JPEG_EDGE = int(os.environ.get("PHOTO_SELECTOR_EXPORT_JPEG", "0"))
+EXPORT_JPEG_QUALITY = 90
+# Files already written, kept in the target's own .photo_selector directory so an
+# interrupted export picks up where it stopped
+EXPORT_MANIFEST_FILENAME = "export.json"
+EXPORT_MANIFEST_VERSION = 1
+EXPORT_SAVE_EVERY = 200
+
+# (source, destination, source signature, action) for one file still to write
+ExportOutput = Tuple[str, str, str, str]
+
+
+class ExportOptions(NamedTuple):
+    mode: str = EXPORT_MODE
+    jpeg_edge: int = EXPORT_JPEG_EDGE
+    quality: int = EXPORT_JPEG_QUALITY
+
+
+class ExportJob(NamedTuple):
+    source: str
+    outputs: Tuple[ExportOutput, ...]
+    jpeg_edge: int
+    quality: int
+
+
+class ExportResult(NamedTuple):
+    source: str
+    # (destination, signature, action) of each file written; empty when all were current
+    written: Tuple[Tuple[str, str, str], ...]
+    nbytes: int
+    error: Optional[str]
+
+
+def select_for_export(store: RecordStore, min_score: Optional[int] = None, liked_only: bool = True) -> List[str]:
+    # Liked images (or, without liked_only, every image not rejected) in display order
+    indices = store.query(liked=True if liked_only else None, rejected=False, min_score=min_score)
+    return [store[index].path for index in indices]
+
+
+def export_target_error(source_folder: str, target_folder: str) -> Optional[str]:
+    # Exporting into the folder being culled would feed the copies back into its scan
+    source = os.path.realpath(source_folder)
+    target = os.path.realpath(target_folder)
+    if os.path.commonpath([source, target]) == source:
+        return "The export folder must be outside the folder being culled."
+    return None
+
+
+def _tmp_path(destination: str) -> str:
+    return f"{destination}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _copy_range(source: str, destination: str) -> bool:
+    # copy_file_range keeps the data in the kernel, and reflinks on copy-on-write
+    # filesystems (btrfs, XFS); False when this platform or filesystem pair lacks it
+    copy_range = getattr(os, "copy_file_range", None)
+    if copy_range is None:
+        return False
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        copied = 0
+        while remaining > 0:
+            try:
+                sent = copy_range(src.fileno(), dst.fileno(), remaining)
+            except OSError:
+                if copied:
+                    raise
+                return False
+            if sent == 0:
+                break
+            copied += sent
+            remaining -= sent
+    return True
+
+
+def copy_file(source: str, destination: str) -> int:
+    # Written under a temporary name and renamed, so an interrupted export never
+    # leaves a truncated file that looks finished. shutil.copyfile is the fallback; it
+    # uses sendfile/fcopyfile itself where the OS has them.
+    tmp_path = _tmp_path(destination)
+    try:
+        if not _copy_range(source, tmp_path):
+            shutil.copyfile(source, tmp_path)
+        shutil.copystat(source, tmp_path)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        _remove(tmp_path)
+        raise
+    return os.path.getsize(destination)
+
+
+def link_file(source: str, destination: str) -> int:
+    if os.path.exists(destination) and os.path.samefile(source, destination):
+        return os.path.getsize(destination)
+    tmp_path = _tmp_path(destination)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        # Another filesystem, or one without hard links (FAT, some network shares)
+        return copy_file(source, destination)
+    try:
+        os.replace(tmp_path, destination)
+    except BaseException:
+        _remove(tmp_path)
+        raise
+    return os.path.getsize(destination)
+
+
+def render_jpeg(source: str, destination: str, edge: int, quality: int = EXPORT_JPEG_QUALITY) -> int:
+    img = open_image_full(source, (edge, edge))
+    img = ImageOps.exif_transpose(img)
+    if img.width > edge or img.height > edge:
+        img.thumbnail((edge, edge), Image.LANCZOS, reducing_gap=VIEWER_REDUCING_GAP)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    extra = {key: img.info[key] for key in ("exif", "icc_profile") if img.info.get(key)}
+    if "exif" not in extra and is_raw_path(source):
+        # rawpy renders (sRGB) carry no metadata of their own
+        exif = render_exif(source)
+        if exif is not None:
+            extra["exif"] = exif
+    tmp_path = _tmp_path(destination)
+    try:
+        img.save(tmp_path, "JPEG", quality=quality, **extra)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        _remove(tmp_path)
+        raise
+    return os.path.getsize(destination)
+
+
+def export_file(job: ExportJob) -> ExportResult:
+    # Runs inside a pool worker; stops at the first failing output of the image
+    written: List[Tuple[str, str, str]] = []
+    nbytes = 0
+    try:
+        for source, destination, signature, action in job.outputs:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            if action == EXPORT_JPEG:
+                nbytes += render_jpeg(source, destination, job.jpeg_edge, job.quality)
+            elif action == EXPORT_HARDLINK:
+                nbytes += link_file(source, destination)
+            else:
+                nbytes += copy_file(source, destination)
+            written.append((destination, signature, action))
+    except Exception as ex:
+        return ExportResult(job.source, tuple(written), nbytes, str(ex))
+    return ExportResult(job.source, tuple(written), nbytes, None)
+
+
+class Exporter:
+    """Copies or links images, their `.xmp` sidecars and optional JPEG renders into a
+    target folder, mirroring their paths under the source folder.
+
+    A coordinator thread plans each image and keeps a small window of jobs in the
+    given pool, so `stop()` only waits for the files being written. `results` carries
+    one `ExportResult` per image and `None` when the export finished or was stopped.
+    Finished files are recorded in a manifest in the target; running the same export
+    again skips them, as well as copies whose size and mtime already match.
+    """
+
+    name = "export"
+
+    def __init__(
+        self,
+        executor: Executor,
+        source_folder: str,
+        target_folder: str,
+        options: ExportOptions = ExportOptions(),
+        workers: int = 1,
+    ) -> None:
+        self.source_folder = source_folder
+        self.target_folder = target_folder
+        self.options = options
+        self.manifest = SignatureCache(target_folder, EXPORT_MANIFEST_FILENAME, EXPORT_MANIFEST_VERSION)
+        self.results: "queue.Queue[Optional[ExportResult]]" = queue.Queue()
+        self.cancelled = False
+        self._executor = executor
+        self._window = max(1, workers)
+        self._paths: List[str] = []
+        # Sidecar lookups list each source directory once: {directory: {lower name: name}}
+        self._listings: Dict[str, Dict[str, str]] = {}
+        # Several selected files can share a sidecar or render name (RAW+JPEG pairs)
+        self._claimed: Set[str] = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+
+    def start(self, paths: Iterable[str]) -> "Exporter":
+        self._paths = list(paths)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.cancelled = True
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._thread.join(timeout)
+
+    def _sidecars(self, path: str) -> List[str]:
+        # IMG_1.xmp (Lightroom, Capture One) and IMG_1.NEF.xmp (darktable), any case
+        directory, name = os.path.split(path)
+        listing = self._listings.get(directory)
+        if listing is None:
+            try:
+                listing = {entry.lower(): entry for entry in os.listdir(directory)}
+            except OSError:
+                listing = {}
+            self._listings[directory] = listing
+        stem = os.path.splitext(name)[0]
+        found = []
+        for base in (stem, name):
+            for ext in SIDE_CAR_EXTENSIONS:
+                entry = listing.get((base + ext).lower())
+                if entry is not None:
+                    found.append(os.path.join(directory, entry))
+        return found
+
+    def _current(self, source: str, destination: str, signature: str, action: str) -> bool:
+        if self.manifest.get(destination, signature) == action and os.path.exists(destination):
+            return True
+        try:
+            if action == EXPORT_HARDLINK:
+                return os.path.samefile(source, destination)
+            if action == EXPORT_COPY:
+                src, dst = os.stat(source), os.stat(destination)
+                return src.st_size == dst.st_size and src.st_mtime_ns == dst.st_mtime_ns
+        except OSError:
+            pass
+        return False
+
+    def _job_for(self, path: str) -> Union[ExportJob, ExportResult]:
+        signature = file_signature(path)
+        if signature is None:
+            return ExportResult(path, (), 0, "file not found")
+        relative = os.path.relpath(path, self.source_folder)
+        planned: List[Tuple[str, str, str]] = [(path, os.path.join(self.target_folder, relative), self.options.mode)]
+        # Sidecars are always copied: a linked sidecar would carry edits made in the
+        # export back into the source folder
+        for sidecar in self._sidecars(path):
+            planned.append((sidecar, os.path.join(self.target_folder, os.path.relpath(sidecar, self.source_folder)), EXPORT_COPY))
+        if self.options.jpeg_edge > 0:
+            render = os.path.join(self.target_folder, EXPORT_JPEG_DIRNAME, os.path.splitext(relative)[0] + ".jpg")
+            planned.append((path, render, EXPORT_JPEG))
+        outputs: List[ExportOutput] = []
+        for source, destination, action in planned:
+            if destination in self._claimed:
+                continue
+            self._claimed.add(destination)
+            source_signature = signature if source == path else file_signature(source)
+            if source_signature is None or self._current(source, destination, source_signature, action):
+                continue
+            outputs.append((source, destination, source_signature, action))
+        if not outputs:
+            return ExportResult(path, (), 0, None)
+        return ExportJob(path, tuple(outputs), self.options.jpeg_edge, self.options.quality)
+
+    def _record(self, result: ExportResult) -> int:
+        for destination, signature, action in result.written:
+            self.manifest.put(destination, signature, action)
+        if result.error is not None:
+            print(f"{self.name}: could not export {result.source}: {result.error}")
+        self.results.put(result)
+        return len(result.written)
+
+    def _run(self) -> None:
+        self.manifest.load()
+        paths = iter(self._paths)
+        in_flight: Dict[Future, str] = {}
+        unsaved = 0
+        try:
+            while not self._stop.is_set():
+                while len(in_flight) < self._window:
+                    path = next(paths, None)
+                    if path is None:
+                        break
+                    job = self._job_for(path)
+                    if isinstance(job, ExportResult):
+                        self.results.put(job)
+                        continue
+                    try:
+                        future = self._executor.submit(export_file, job)
+                    except RuntimeError:
+                        # Pool shut down while closing the app
+                        self._stop.set()
+                        break
+                    in_flight[future] = path
+                if not in_flight:
+                    break
+                done, _ = wait(list(in_flight), timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    try:
+                        unsaved += self._record(future.result())
+                    except Exception as ex:
+                        self._record(ExportResult(path, (), 0, str(ex)))
+                if unsaved >= EXPORT_SAVE_EVERY:
+                    self.manifest.save()
+                    unsaved = 0
+            # Stopped: drop what has not started, let the files being written finish
+            for future in list(in_flight):
+                if future.cancel():
+                    in_flight.pop(future)
+            for future in list(in_flight):
+                path = in_flight.pop(future)
+                try:
+                    self._record(future.result())
+                except Exception as ex:
+                    self._record(ExportResult(path, (), 0, str(ex)))
+        finally:
+            self.manifest.save()
+            self.results.put(None)
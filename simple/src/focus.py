@@ -0,0 +1,46 @@
+import os
+from typing import Dict, List, Tuple
+
+from PIL import Image
+
+from .imaging import THUMBNAIL_REDUCING_GAP, open_image_for_thumbnail
+from .lazy import LazyModule, module_available
+
+HAS_NUMPY = module_available("numpy")
+np = LazyModule("numpy")
+
+
+FOCUS_FILENAME = "focus.json"
+FOCUS_VERSION = 1
+# Scores are measured on a decode this size, so they compare across cameras and
+# resolutions; JPEGs and RAW previews decode at a reduced DCT scale to reach it
+FOCUS_SIZE = (1024, 1024)
+# Frames scoring below this fraction of the folder's median count as soft
+SOFT_FOCUS_RATIO = float(os.environ.get("PHOTO_SELECTOR_SOFT_FOCUS", "0.25"))
+
+
+def focus_score(img: Image.Image) -> float:
+    # Variance of the 4-neighbour Laplacian of the luma: high for crisp edges, low
+    # for blur and missed focus
+    grey = np.asarray(img.convert("L"), dtype=np.float32)
+    if grey.shape[0] < 3 or grey.shape[1] < 3:
+        return 0.0
+    laplacian = (
+        grey[:-2, 1:-1] + grey[2:, 1:-1] + grey[1:-1, :-2] + grey[1:-1, 2:] - 4.0 * grey[1:-1, 1:-1]
+    )
+    return float(laplacian.var())
+
+
+def score_image(path: str, size: Tuple[int, int] = FOCUS_SIZE) -> float:
+    img = open_image_for_thumbnail(path, size)
+    img.thumbnail(size, Image.BILINEAR, reducing_gap=THUMBNAIL_REDUCING_GAP)
+    return focus_score(img)
+
+
+def soft_frames(scores: Dict[str, float], ratio: float = SOFT_FOCUS_RATIO) -> List[str]:
+    # Paths scoring well below the folder's typical sharpness
+    if not scores:
+        return []
+    values = np.fromiter(scores.values(), dtype=np.float64, count=len(scores))
+    threshold = float(np.median(values)) * ratio
+    return [path for path, value in scores.items() if value < threshold]
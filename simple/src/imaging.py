@@ -0,0 +1,149 @@
+import io
+import os
+from typing import BinaryIO, Optional, Tuple, Union
+
+from PIL import Image
+
+from .lazy import LazyModule, module_available
+
+# rawpy's native library is slow to load; it is only imported on the first RAW decode
+HAS_RAWPY = module_available("rawpy")
+rawpy = LazyModule("rawpy")
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tiff", ".webp"}
+RAW_EXTENSIONS = {".nef", ".arw", ".cr2", ".cr3", ".dng", ".rw2", ".orf", ".raf", ".srw", ".pef", ".erf", ".3fr", ".iiq", ".mos", ".mef", ".nrw"}
+SIDE_CAR_EXTENSIONS = {".xmp"}
+IMAGE_EXTENSIONS = IMAGE_EXTENSIONS.union(RAW_EXTENSIONS)
+
+# How the viewer shows RAW files: the embedded camera preview when it is big enough,
+# that preview followed by a demosaiced render, or always the demosaiced render
+RAW_MODE_PREVIEW = "preview"
+RAW_MODE_REFINE = "refine"
+RAW_MODE_FULL = "full"
+RAW_MODES = (RAW_MODE_PREVIEW, RAW_MODE_REFINE, RAW_MODE_FULL)
+# Set in Image.info on viewer images that came from the embedded preview
+EMBEDDED_PREVIEW_KEY = "photo_selector.embedded_preview"
+# Resizes first box-reduce by whole factors while staying this many times above the
+# target, then finish with LANCZOS; larger is closer to a plain LANCZOS resize
+THUMBNAIL_REDUCING_GAP = 2.0
+VIEWER_REDUCING_GAP = 3.0
+
+
+def is_raw_path(path: str) -> bool:
+    _, ext = os.path.splitext(path)
+    return ext.lower() in RAW_EXTENSIONS
+
+
+def fit_size(size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    # Largest size with the same aspect ratio as `size` that fits inside `box`
+    scale = min(box[0] / size[0], box[1] / size[1])
+    return max(1, int(size[0] * scale)), max(1, int(size[1] * scale))
+
+
+def open_scaled(source: Union[str, BinaryIO], target: Optional[Tuple[int, int]] = None) -> Image.Image:
+    # Lazily open an image that will be shown no larger than `target`. For JPEG this
+    # lets libjpeg's DCT scaling decode at 1/2, 1/4 or 1/8 resolution (never below
+    # the fitted target); other formats ignore draft() and rely on reducing_gap resizes.
+    img = Image.open(source)
+    if target is not None:
+        img.draft(None, fit_size(img.size, target))
+    return img
+
+
+def open_image_for_thumbnail(path: str, size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    if is_raw_path(path) and HAS_RAWPY:
+        try:
+            with rawpy.imread(path) as raw:  # type: ignore
+                try:
+                    thumb = raw.extract_thumb()  # type: ignore
+                    if thumb.format == rawpy.ThumbFormat.JPEG:  # type: ignore
+                        return open_scaled(io.BytesIO(thumb.data), size)
+                    else:
+                        # BITMAP returns RGB numpy array
+                        return Image.fromarray(thumb.data)
+                except Exception:
+                    # No thumb -> quick postprocess (half size for speed)
+                    rgb = raw.postprocess(use_auto_wb=True, no_auto_bright=True, output_bps=8, half_size=True)  # type: ignore
+                    return Image.fromarray(rgb)
+        except Exception as ex:
+            print(f"RAW thumb fallback failed for {path}: {ex}")
+    # Non-RAW or rawpy missing -> standard open
+    return open_scaled(path, size)
+
+
+def open_image_full(path: str, size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    if is_raw_path(path) and HAS_RAWPY:
+        try:
+            with rawpy.imread(path) as raw:  # type: ignore
+                # Full decode; half_size speeds up and is enough for screen viewing
+                rgb = raw.postprocess(use_auto_wb=True, no_auto_bright=True, output_bps=8, half_size=True)  # type: ignore
+                return Image.fromarray(rgb)
+        except Exception as ex:
+            print(f"RAW full decode failed for {path}: {ex}")
+    return open_scaled(path, size)
+
+
+def make_thumbnail(path: str, size: Tuple[int, int]) -> Image.Image:
+    img = open_image_for_thumbnail(path, size)
+    img.thumbnail(size, Image.LANCZOS, reducing_gap=THUMBNAIL_REDUCING_GAP)
+    # Normalise for caching and for shipping raw buffers between processes
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def _apply_raw_flip(img: Image.Image, flip: int) -> Image.Image:
+    # LibRaw flip codes; postprocess() applies these itself, embedded previews do not
+    if flip == 3:
+        return img.transpose(Image.ROTATE_180)
+    if flip == 5:
+        return img.transpose(Image.ROTATE_90)
+    if flip == 6:
+        return img.transpose(Image.ROTATE_270)
+    return img
+
+
+def extract_raw_preview(path: str, size: Optional[Tuple[int, int]] = None) -> Optional[Image.Image]:
+    # Embedded camera JPEG (or bitmap) without demosaicing; None if there is none
+    if not HAS_RAWPY:
+        return None
+    try:
+        with rawpy.imread(path) as raw:  # type: ignore
+            flip = getattr(raw.sizes, "flip", 0)  # type: ignore
+            thumb = raw.extract_thumb()  # type: ignore
+            if thumb.format == rawpy.ThumbFormat.JPEG:  # type: ignore
+                img = open_scaled(io.BytesIO(thumb.data), size)
+                img.load()
+            else:
+                img = Image.fromarray(thumb.data)
+    except Exception:
+        return None
+    return _apply_raw_flip(img, flip)
+
+
+def covers_size(img: Image.Image, size: Tuple[int, int]) -> bool:
+    # True if fitting img into size would not need upscaling
+    return img.width >= size[0] or img.height >= size[1]
+
+
+def open_image_for_screen(
+    path: str,
+    max_size: Tuple[int, int],
+    raw_mode: str = RAW_MODE_FULL,
+    min_preview_size: Optional[Tuple[int, int]] = None,
+) -> Image.Image:
+    # Decode for the viewer and drop pixels the screen can never show
+    img = None
+    if raw_mode != RAW_MODE_FULL and is_raw_path(path):
+        preview = extract_raw_preview(path, max_size)
+        if preview is not None and covers_size(preview, min_preview_size or max_size):
+            preview.info[EMBEDDED_PREVIEW_KEY] = True
+            img = preview
+    if img is None:
+        img = open_image_full(path, max_size)
+    if img.width > max_size[0] or img.height > max_size[1]:
+        img.thumbnail(max_size, Image.LANCZOS, reducing_gap=VIEWER_REDUCING_GAP)
+    else:
+        img.load()
+    return img
@@ -0,0 +1,27 @@
+import importlib
+import importlib.util
+from types import ModuleType
+from typing import Any, Optional
+
+
+def module_available(name: str) -> bool:
+    # Finds an installed module without importing it, so no native library is loaded
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """Stand-in for an optional heavy module (rawpy, numpy) that imports it on first
+    attribute access, so startup never pays for a decoder it may not use."""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
@@ -0,0 +1,412 @@
+import os
+import queue
+import struct
+import threading
+import time
+from collections import deque
+from typing import BinaryIO, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from PIL import Image
+
+from .thumbnails import SignatureCache, file_signature
+
+
+METADATA_FILENAME = "metadata.json"
+METADATA_VERSION = 1
+# Results reach the Tk thread in batches; the cache file is rewritten this often
+METADATA_BATCH_SIZE = 200
+METADATA_SAVE_EVERY = 2000
+
+# EXIF/TIFF tags we keep, by the key they are stored under
+EXIF_TAGS = {
+    0x010F: "make",
+    0x0110: "model",
+    0x0112: "orientation",
+    0x0132: "datetime",
+    0x829A: "exposure",
+    0x829D: "fnumber",
+    0x8827: "iso",
+    0x9003: "datetime_original",
+    0x9291: "subsec_original",
+    0x920A: "focal",
+    0xA434: "lens",
+}
+EXIF_IFD_POINTER = 0x8769
+# Of those, the tags that belong in IFD0 rather than the Exif sub-IFD
+IFD0_TAGS = {0x010F, 0x0110, 0x0112, 0x0132}
+ORIENTATION_TAG = 0x0112
+# Bytes per value for the TIFF field types we can decode
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8, 11: 4, 12: 8}
+# Defensive limits against corrupt headers
+_MAX_IFD_ENTRIES = 1024
+_MAX_VALUE_BYTES = 256
+_MAX_BOXES = 256
+# TIFF-based RAWs: plain TIFF, Olympus ORF ("IIRO"/"IIRS"), Panasonic RW2 ("IIU\0")
+_TIFF_MAGICS = (b"II*\x00", b"MM\x00*", b"IIRO", b"IIRS", b"IIU\x00")
+# Canon CR3 keeps TIFF-structured metadata (CMT1 = IFD0, CMT2 = Exif IFD) in this box
+_CANON_UUID = bytes.fromhex("85c0b687820f11e08111f4ce462b6a48")
+
+
+def _read_value(f: BinaryIO, base: int, endian: str, field_type: int, count: int, raw: bytes) -> object:
+    size = _TYPE_SIZES[field_type] * count
+    if size > 4:
+        if size > _MAX_VALUE_BYTES:
+            size = _MAX_VALUE_BYTES
+        (offset,) = struct.unpack(endian + "I", raw)
+        f.seek(base + offset)
+        raw = f.read(size)
+    if field_type == 2:
+        return raw[:size].split(b"\x00", 1)[0].decode("utf-8", "replace").strip()
+    if field_type == 3:
+        return struct.unpack(endian + "H", raw[:2])[0]
+    if field_type == 4:
+        return struct.unpack(endian + "I", raw[:4])[0]
+    if field_type == 9:
+        return struct.unpack(endian + "i", raw[:4])[0]
+    if field_type == 11:
+        return struct.unpack(endian + "f", raw[:4])[0]
+    if field_type == 12:
+        return struct.unpack(endian + "d", raw[:8])[0]
+    if field_type in (5, 10):
+        num, den = struct.unpack(endian + ("II" if field_type == 5 else "ii"), raw[:8])
+        return num / den if den else None
+    return raw[:size]
+
+
+def _read_ifd(f: BinaryIO, base: int, offset: int, endian: str) -> Dict[int, object]:
+    f.seek(base + offset)
+    data = f.read(2)
+    if len(data) < 2:
+        return {}
+    (count,) = struct.unpack(endian + "H", data)
+    entries = f.read(12 * min(count, _MAX_IFD_ENTRIES))
+    values: Dict[int, object] = {}
+    for i in range(0, len(entries) - 11, 12):
+        tag, field_type, n = struct.unpack(endian + "HHI", entries[i:i + 8])
+        if (tag in EXIF_TAGS or tag == EXIF_IFD_POINTER) and field_type in _TYPE_SIZES and n:
+            values[tag] = _read_value(f, base, endian, field_type, n, entries[i + 8:i + 12])
+    return values
+
+
+def _parse_tiff(f: BinaryIO, base: int) -> Dict[str, object]:
+    # IFD0 plus the Exif sub-IFD of the TIFF structure starting at `base`
+    f.seek(base)
+    header = f.read(8)
+    if header[:2] == b"II":
+        endian = "<"
+    elif header[:2] == b"MM":
+        endian = ">"
+    else:
+        return {}
+    (ifd0,) = struct.unpack(endian + "I", header[4:8])
+    values = _read_ifd(f, base, ifd0, endian)
+    exif_offset = values.pop(EXIF_IFD_POINTER, None)
+    if isinstance(exif_offset, int):
+        values.update(_read_ifd(f, base, exif_offset, endian))
+    return {EXIF_TAGS[tag]: value for tag, value in values.items()}
+
+
+def _find_jpeg_exif(f: BinaryIO, start: int) -> Optional[int]:
+    # Offset of the TIFF header inside the APP1 "Exif" segment; stops at the image data
+    f.seek(start)
+    if f.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            # Fill byte before the real marker
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if code in (0x01, 0xD8) or 0xD0 <= code <= 0xD7:
+            continue
+        if code in (0xD9, 0xDA):
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        (length,) = struct.unpack(">H", length_bytes)
+        if code == 0xE1 and length >= 8:
+            if f.read(6) == b"Exif\x00\x00":
+                return f.tell()
+            f.seek(length - 8, os.SEEK_CUR)
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def _find_cr3_tiffs(f: BinaryIO) -> List[int]:
+    # Walk ISO base media boxes: moov -> Canon uuid -> CMT1/CMT2 payloads
+    offsets: List[int] = []
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    stack = [(0, end)]
+    seen = 0
+    while stack and seen < _MAX_BOXES:
+        pos, stop = stack.pop()
+        while pos + 8 <= stop and seen < _MAX_BOXES:
+            seen += 1
+            f.seek(pos)
+            size, box_type = struct.unpack(">I4s", f.read(8))
+            header = 8
+            if size == 1:
+                (size,) = struct.unpack(">Q", f.read(8))
+                header = 16
+            elif size == 0:
+                size = stop - pos
+            if size < header:
+                break
+            if box_type == b"moov":
+                stack.append((pos + header, pos + size))
+            elif box_type == b"uuid" and f.read(16) == _CANON_UUID:
+                stack.append((pos + header + 16, pos + size))
+            elif box_type in (b"CMT1", b"CMT2"):
+                offsets.append(pos + header)
+            pos += size
+    return offsets
+
+
+def _tags_from_pil(path: str) -> Dict[str, object]:
+    # Other formats (PNG, WebP, ...): Image.open only parses headers until load()
+    tags: Dict[str, object] = {}
+    with Image.open(path) as img:
+        exif = img.getexif()
+        values = dict(exif)
+        values.update(exif.get_ifd(EXIF_IFD_POINTER))
+    for tag, value in values.items():
+        key = EXIF_TAGS.get(tag)
+        if key is None:
+            continue
+        if isinstance(value, bytes):
+            continue
+        if isinstance(value, tuple):
+            value = value[0] if value else None
+        if not isinstance(value, (str, int)):
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+        tags[key] = value.strip() if isinstance(value, str) else value
+    return tags
+
+
+def _read_tags(path: str) -> Dict[str, object]:
+    with open(path, "rb") as f:
+        head = f.read(16)
+        if head[:2] == b"\xff\xd8":
+            offset = _find_jpeg_exif(f, 0)
+            return _parse_tiff(f, offset) if offset is not None else {}
+        if head[:4] in _TIFF_MAGICS:
+            return _parse_tiff(f, 0)
+        if head[4:8] == b"ftyp":
+            tags: Dict[str, object] = {}
+            for offset in _find_cr3_tiffs(f):
+                tags.update(_parse_tiff(f, offset))
+            return tags
+        if head.startswith(b"FUJIFILMCCD-RAW"):
+            # RAF: metadata lives in the embedded JPEG whose offset is at byte 84
+            f.seek(84)
+            (jpeg_offset,) = struct.unpack(">I", f.read(4))
+            offset = _find_jpeg_exif(f, jpeg_offset)
+            return _parse_tiff(f, offset) if offset is not None else {}
+    return _tags_from_pil(path)
+
+
+def _exif_timestamp(text: object, subsec: object) -> Optional[float]:
+    # EXIF times are local wall-clock "YYYY:MM:DD HH:MM:SS"
+    if not isinstance(text, str):
+        return None
+    try:
+        stamp = time.mktime(time.strptime(text[:19], "%Y:%m:%d %H:%M:%S"))
+    except (ValueError, OverflowError):
+        return None
+    if isinstance(subsec, str) and subsec.strip().isdigit():
+        stamp += float("0." + subsec.strip())
+    return stamp
+
+
+def read_metadata(path: str) -> Dict[str, object]:
+    """Capture time and camera settings from the file's EXIF header.
+
+    Only header bytes are read: JPEG APP1 segments, TIFF IFDs (most RAW formats),
+    CR3 metadata boxes and the RAF embedded JPEG's header. Unreadable or missing
+    metadata gives an empty dict.
+    """
+    try:
+        tags = _read_tags(path)
+    except (OSError, struct.error, ValueError, SyntaxError) as ex:
+        print(f"Could not read metadata from {path}: {ex}")
+        return {}
+    meta: Dict[str, object] = {}
+    stamp = _exif_timestamp(tags.get("datetime_original") or tags.get("datetime"), tags.get("subsec_original"))
+    if stamp is not None:
+        meta["time"] = stamp
+    for key in ("make", "model", "lens", "exposure", "fnumber", "iso", "focal", "orientation"):
+        value = tags.get(key)
+        # Kept JSON-friendly for the cache; odd field types from broken files are dropped
+        if isinstance(value, (str, int, float)) and value != "":
+            meta[key] = value
+    return meta
+
+
+def render_exif(path: str) -> Optional[bytes]:
+    """EXIF block for a render of `path`, rebuilt from the tags in its header.
+
+    RAW decoders return bare pixels, so this is how a JPEG rendered from a RAW
+    keeps its capture time and camera settings. Orientation is left out because the
+    rendered pixels are already upright. None when no tags could be read.
+    """
+    try:
+        tags = _read_tags(path)
+    except (OSError, struct.error, ValueError, SyntaxError):
+        return None
+    exif = Image.Exif()
+    exif_ifd = exif.get_ifd(EXIF_IFD_POINTER)
+    for tag, key in EXIF_TAGS.items():
+        value = tags.get(key)
+        if tag == ORIENTATION_TAG or not isinstance(value, (str, int, float)) or value == "":
+            continue
+        if tag in IFD0_TAGS:
+            exif[tag] = value
+        else:
+            exif_ifd[tag] = value
+    if not len(exif) and not exif_ifd:
+        return None
+    return exif.tobytes()
+
+
+def camera_name(meta: Dict[str, object]) -> str:
+    # "Nikon Z 6" rather than "NIKON CORPORATION NIKON Z 6" or a bare "Z 6"
+    make = str(meta.get("make", "")).strip()
+    model = str(meta.get("model", "")).strip()
+    if make and model and not model.lower().startswith(make.split()[0].lower()):
+        model = f"{make.split()[0]} {model}"
+    return model or make
+
+
+def format_exif_summary(meta: Dict[str, object]) -> str:
+    parts: List[str] = []
+    camera = camera_name(meta)
+    if camera:
+        parts.append(camera)
+    if meta.get("lens"):
+        parts.append(str(meta["lens"]))
+    focal = meta.get("focal")
+    if isinstance(focal, (int, float)) and focal:
+        parts.append(f"{focal:g}mm")
+    fnumber = meta.get("fnumber")
+    if isinstance(fnumber, (int, float)) and fnumber:
+        parts.append(f"f/{fnumber:g}")
+    exposure = meta.get("exposure")
+    if isinstance(exposure, (int, float)) and exposure > 0:
+        parts.append(f"1/{round(1 / exposure)}s" if exposure < 1 else f"{exposure:g}s")
+    if meta.get("iso"):
+        parts.append(f"ISO {meta['iso']}")
+    stamp = meta.get("time")
+    if isinstance(stamp, (int, float)):
+        parts.append(time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stamp)))
+    return "  •  ".join(parts)
+
+
+class MetadataCache(SignatureCache):
+    """Per-folder `.photo_selector/metadata.json` of `read_metadata()` results."""
+
+    def __init__(self, folder_path: str) -> None:
+        super().__init__(folder_path, METADATA_FILENAME, METADATA_VERSION)
+
+
+class MetadataLoader:
+    """Reads metadata for a folder's images on a background thread.
+
+    Paths are handled in the order given, except that `prioritize()` moves one to
+    the front (e.g. the image in the viewer). Each result is a `(path, metadata)`
+    pair; `results` carries lists of them, and `None` each time the queue of work
+    runs dry.
+    """
+
+    def __init__(self, folder_path: str) -> None:
+        self.cache = MetadataCache(folder_path)
+        self.results: "queue.Queue[Optional[List[Tuple[str, Dict[str, object]]]]]" = queue.Queue()
+        self._pending: Deque[str] = deque()
+        self._done: Set[str] = set()
+        self._urgent: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metadata", daemon=True)
+
+    def start(self, paths: Iterable[str]) -> "MetadataLoader":
+        self.enqueue(paths)
+        self._thread.start()
+        return self
+
+    def enqueue(self, paths: Iterable[str], refresh: bool = False) -> None:
+        with self._lock:
+            for path in paths:
+                if refresh:
+                    self._done.discard(path)
+                self._pending.append(path)
+        self._wake.set()
+
+    def prioritize(self, path: str) -> None:
+        with self._lock:
+            if path in self._done:
+                return
+            self._urgent.add(path)
+            self._pending.appendleft(path)
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _next_path(self) -> Tuple[Optional[str], bool]:
+        # The path to read next, and whether someone is waiting on it
+        with self._lock:
+            while self._pending:
+                path = self._pending.popleft()
+                if path not in self._done:
+                    self._done.add(path)
+                    urgent = path in self._urgent
+                    self._urgent.discard(path)
+                    return path, urgent
+            self._wake.clear()
+            return None, False
+
+    def _run(self) -> None:
+        self.cache.load()
+        batch: List[Tuple[str, Dict[str, object]]] = []
+        unsaved = 0
+        while not self._stop.is_set():
+            path, urgent = self._next_path()
+            if path is None:
+                if batch:
+                    self.results.put(batch)
+                    batch = []
+                self.cache.save()
+                unsaved = 0
+                self.results.put(None)
+                self._wake.wait()
+                continue
+            signature = file_signature(path)
+            if signature is None:
+                continue
+            meta = self.cache.get(path, signature)
+            if meta is None:
+                meta = read_metadata(path)
+                if "time" not in meta:
+                    # Files without EXIF (screenshots, exports) sort by modification time
+                    try:
+                        meta["file_time"] = os.stat(path).st_mtime
+                    except OSError:
+                        pass
+                self.cache.put(path, signature, meta)
+                unsaved += 1
+            batch.append((path, meta))
+            if urgent or len(batch) >= METADATA_BATCH_SIZE:
+                self.results.put(batch)
+                batch = []
+            if unsaved >= METADATA_SAVE_EVERY:
+                self.cache.save()
+                unsaved = 0
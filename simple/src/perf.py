@@ -0,0 +1,164 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+# Timing is off unless the overlay is turned on or PHOTO_SELECTOR_PERF=1; a disabled
+# span is one attribute check and a shared no-op context manager
+PERF_ENABLED = os.environ.get("PHOTO_SELECTOR_PERF", "0") == "1"
+# Recent durations kept per span name for percentiles, and trace events kept for export
+PERF_SAMPLES = 1024
+PERF_TRACE_EVENTS = 200_000
+# Process start to window on screen; startup past this is reported on stdout, and
+# benchmarks/bench_startup.py holds `import src.app` to the same budget
+STARTUP_BUDGET_MS = float(os.environ.get("PHOTO_SELECTOR_STARTUP_BUDGET_MS", "500"))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_recorder", "_name", "_start")
+
+    def __init__(self, recorder: "PerfRecorder", name: str) -> None:
+        self._recorder = recorder
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter()
+        self._recorder.add(self._name, end - self._start, end)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class PerfRecorder:
+    """Process-wide timing spans and hit/miss counters for the hot paths.
+
+    `span(name)` times a block on any thread. Durations measured elsewhere (e.g. in
+    a pool worker process) are added with `add()`. `summary()` gives count, p50 and
+    p95 per span from a bounded window of recent samples; `export_trace()` writes
+    every kept span in Chrome's trace event format (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self, enabled: bool = PERF_ENABLED) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, int] = {}
+        self._counters: Dict[str, List[int]] = {}
+        self._events: Deque[Tuple[str, float, float, int]] = deque(maxlen=PERF_TRACE_EVENTS)
+        self._origin = time.perf_counter()
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def add(self, name: str, seconds: float, end: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        if end is None:
+            end = time.perf_counter()
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=PERF_SAMPLES)
+            samples.append(seconds)
+            self._totals[name] = self._totals.get(name, 0) + 1
+            self._events.append((name, end - seconds, seconds, threading.get_ident()))
+
+    def count(self, name: str, hit: bool) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                counter = self._counters[name] = [0, 0]
+            counter[0 if hit else 1] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+            self._events.clear()
+
+    def summary(self) -> Dict[str, Tuple[int, float, float]]:
+        # {span: (total count, p50 ms, p95 ms)}
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            totals = dict(self._totals)
+        return {
+            name: (totals[name], percentile(values, 0.5) * 1000, percentile(values, 0.95) * 1000)
+            for name, values in snapshot.items()
+        }
+
+    def hit_rates(self) -> Dict[str, Tuple[int, int]]:
+        # {counter: (hits, misses)}
+        with self._lock:
+            return {name: (hits, misses) for name, (hits, misses) in self._counters.items()}
+
+    def readout(self) -> str:
+        parts = [f"{name} {p50:.1f}/{p95:.1f}ms" for name, (_, p50, p95) in sorted(self.summary().items())]
+        for name, (hits, misses) in sorted(self.hit_rates().items()):
+            if hits + misses:
+                parts.append(f"{name} {hits / (hits + misses):.0%} hit")
+        return "  •  ".join(parts) if parts else "No timings yet"
+
+    def export_trace(self, path: str) -> int:
+        # Complete ("X") events, microseconds since the recorder started; returns the count
+        with self._lock:
+            events = list(self._events)
+            counters = {name: tuple(counter) for name, counter in self._counters.items()}
+        pid = os.getpid()
+        trace = [
+            {
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round(seconds * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, start, seconds, tid in events
+        ]
+        tmp_path = f"{path}.{pid}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": trace, "displayTimeUnit": "ms", "otherData": {"hit_miss": counters}},
+                f,
+                separators=(",", ":"),
+            )
+        os.replace(tmp_path, path)
+        return len(trace)
+
+
+PERF = PerfRecorder()
+
+
+def span(name: str):
+    return PERF.span(name)
@@ -0,0 +1,124 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+from .imaging import fit_size
+
+
+# Cap on the reduced levels held across all pyramids; bases are owned by the viewer cache
+PYRAMID_BUDGET_MB = int(os.environ.get("PHOTO_SELECTOR_PYRAMID_MB", "128"))
+# Modes Image.reduce() handles directly; anything else is converted once for level 1
+REDUCIBLE_MODES = {"L", "LA", "RGB", "RGBA", "RGBX", "CMYK", "I", "F"}
+
+
+def _nbytes(img: Image.Image) -> int:
+    return img.width * img.height * len(img.getbands())
+
+
+class PyramidBudget:
+    """Shared byte budget for pyramid levels; the least recently charged pyramids
+    lose their reduced levels first."""
+
+    def __init__(self, budget_bytes: int) -> None:
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[weakref.ref, int]]" = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def charge(self, pyramid: "ImagePyramid", nbytes: int) -> None:
+        victims: List[ImagePyramid] = []
+        with self._lock:
+            key = id(pyramid)
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                entry = (weakref.ref(pyramid), 0)
+                weakref.finalize(pyramid, self._forget, key)
+            self._entries[key] = (entry[0], entry[1] + nbytes)
+            self._bytes += nbytes
+            for other_key in list(self._entries):
+                if self._bytes <= self.budget_bytes:
+                    break
+                if other_key == key:
+                    continue
+                ref, used = self._entries.pop(other_key)
+                self._bytes -= used
+                victim = ref()
+                if victim is not None:
+                    victims.append(victim)
+        # Outside our lock: dropping takes the victim's own lock
+        for victim in victims:
+            victim.drop_levels()
+
+    def touch(self, pyramid: "ImagePyramid") -> None:
+        with self._lock:
+            key = id(pyramid)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def _forget(self, key: int) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+
+class ImagePyramid:
+    """Lazily built mip levels (1/2, 1/4, ...) of a decoded image.
+
+    `level_for(size)` returns the smallest level that is still at least `size`, so
+    resize cost follows the window size rather than the source resolution.
+    """
+
+    def __init__(self, base: Image.Image, budget: Optional[PyramidBudget] = None) -> None:
+        self.base = base
+        self._levels: List[Image.Image] = [base]
+        self._budget = budget
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(_nbytes(level) for level in self._levels[1:])
+
+    def level_for(self, size: Tuple[int, int]) -> Image.Image:
+        added = 0
+        with self._lock:
+            index = 0
+            level = self._levels[0]
+            while level.width // 2 >= size[0] and level.height // 2 >= size[1] and min(level.size) >= 2:
+                index += 1
+                if index < len(self._levels):
+                    level = self._levels[index]
+                    continue
+                source = level
+                if source.mode not in REDUCIBLE_MODES:
+                    source = source.convert("RGBA" if source.mode in ("P", "PA") else "RGB")
+                level = source.reduce(2)
+                self._levels.append(level)
+                added += _nbytes(level)
+        if self._budget is not None:
+            if added:
+                self._budget.charge(self, added)
+            else:
+                self._budget.touch(self)
+        return level
+
+    def resize_to_fit(self, frame_width: int, frame_height: int, resample: int, gap: float = 1.0) -> Image.Image:
+        # Fit the base into the frame, sampling from the level nearest above `gap` x target
+        size = fit_size(self.base.size, (frame_width, frame_height))
+        source = self.level_for((int(size[0] * gap), int(size[1] * gap)))
+        if source.size == size:
+            return source
+        return source.resize(size, resample)
+
+    def drop_levels(self) -> None:
+        with self._lock:
+            del self._levels[1:]
@@ -0,0 +1,259 @@
+import os
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .lazy import LazyModule, module_available
+
+# Imported on the first query, not at startup
+HAS_NUMPY = module_available("numpy")
+np = LazyModule("numpy")
+
+
+DEFAULT_SCORE = 5
+# Bits in RecordStore.flags
+FLAG_LIKED = 1
+FLAG_REJECTED = 2
+
+Selection = Tuple[bool, bool, int]
+
+
+class ImageRecord:
+    """View of one row of a `RecordStore`.
+
+    Views are created on access and hold no data of their own; reads and writes go
+    straight to the store's columns. Rows never move, so a view stays valid while
+    records are inserted or removed around it.
+    """
+
+    __slots__ = ("_store", "row")
+
+    def __init__(self, store: "RecordStore", row: int) -> None:
+        self._store = store
+        self.row = row
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ImageRecord) and other._store is self._store and other.row == self.row
+
+    def __hash__(self) -> int:
+        return hash((id(self._store), self.row))
+
+    def __repr__(self) -> str:
+        return f"ImageRecord({self.path!r})"
+
+    @property
+    def path(self) -> str:
+        return self._store.path_of(self.row)
+
+    @property
+    def filename(self) -> str:
+        return self._store.names[self.row]
+
+    @property
+    def liked(self) -> bool:
+        return bool(self._store.flags[self.row] & FLAG_LIKED)
+
+    @liked.setter
+    def liked(self, value: bool) -> None:
+        self._store.set_flag(self.row, FLAG_LIKED, value)
+
+    @property
+    def rejected(self) -> bool:
+        return bool(self._store.flags[self.row] & FLAG_REJECTED)
+
+    @rejected.setter
+    def rejected(self, value: bool) -> None:
+        self._store.set_flag(self.row, FLAG_REJECTED, value)
+
+    @property
+    def score(self) -> int:
+        return self._store.scores[self.row]
+
+    @score.setter
+    def score(self, value: int) -> None:
+        self._store.scores[self.row] = value
+
+    @property
+    def sharpness(self) -> Optional[float]:
+        value = self._store.sharpness[self.row]
+        return None if value != value else value
+
+    def to_csv_row(self) -> List[str]:
+        return self._store.csv_row(self.row)
+
+
+class RecordStore:
+    """Columnar, list-like store of the images in a folder.
+
+    Each record costs a filename string plus 14 bytes of typed arrays (directory id,
+    flags, score, sharpness and its display position), instead of a Python object
+    with its own `__dict__` and full path string. Indexing returns `ImageRecord` views in display order;
+    `query()` and `counts()` scan the arrays (with numpy when it is installed).
+    """
+
+    def __init__(self) -> None:
+        self._dir_paths: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        # Columns, indexed by row; rows are append-only
+        self.dirs = array("I")
+        self.names: List[str] = []
+        self.flags = array("B")
+        self.scores = array("B")
+        # Focus score from the background sharpness pass; NaN until measured
+        self.sharpness = array("f")
+        # Rows in display order; removing a record only drops it from here
+        self.order = array("I")
+        self._rows_by_path: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __getitem__(self, index: int) -> ImageRecord:
+        return ImageRecord(self, self.order[index])
+
+    def __iter__(self) -> Iterator[ImageRecord]:
+        for row in self.order:
+            yield ImageRecord(self, row)
+
+    def path_of(self, row: int) -> str:
+        return os.path.join(self._dir_paths[self.dirs[row]], self.names[row])
+
+    def paths(self) -> Iterator[str]:
+        dir_paths, dirs, names = self._dir_paths, self.dirs, self.names
+        for row in self.order:
+            yield os.path.join(dir_paths[dirs[row]], names[row])
+
+    def set_flag(self, row: int, flag: int, value: bool) -> None:
+        if value:
+            self.flags[row] |= flag
+        else:
+            self.flags[row] &= ~flag & 0xFF
+
+    def set_selection(self, index: int, liked: bool, rejected: bool, score: int) -> None:
+        row = self.order[index]
+        self.flags[row] = (FLAG_LIKED if liked else 0) | (FLAG_REJECTED if rejected else 0)
+        self.scores[row] = score
+
+    def row_of(self, path: str) -> Optional[int]:
+        # Path lookup, built on first use after the records change
+        if self._rows_by_path is None:
+            self._rows_by_path = {self.path_of(row): row for row in self.order}
+        return self._rows_by_path.get(path)
+
+    def set_sharpness(self, path: str, value: Optional[float]) -> bool:
+        row = self.row_of(path)
+        if row is None:
+            return False
+        self.sharpness[row] = float("nan") if value is None else value
+        return True
+
+    def csv_row(self, row: int) -> List[str]:
+        flags = self.flags[row]
+        sharpness = self.sharpness[row]
+        return [
+            self.names[row],
+            self.path_of(row),
+            "1" if flags & FLAG_LIKED else "0",
+            "1" if flags & FLAG_REJECTED else "0",
+            str(self.scores[row]),
+            f"{sharpness:.1f}" if sharpness == sharpness else "",
+        ]
+
+    def csv_rows(self) -> List[List[str]]:
+        return [self.csv_row(row) for row in self.order]
+
+    def _add_row(self, path: str, selection: Optional[Selection]) -> int:
+        self._rows_by_path = None
+        directory, name = os.path.split(path)
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = self._dir_ids[directory] = len(self._dir_paths)
+            self._dir_paths.append(directory)
+        liked, rejected, score = selection if selection is not None else (False, False, DEFAULT_SCORE)
+        self.dirs.append(dir_id)
+        self.names.append(name)
+        self.flags.append((FLAG_LIKED if liked else 0) | (FLAG_REJECTED if rejected else 0))
+        self.scores.append(score)
+        self.sharpness.append(float("nan"))
+        return len(self.names) - 1
+
+    def append(self, path: str, selection: Optional[Selection] = None) -> ImageRecord:
+        row = self._add_row(path, selection)
+        self.order.append(row)
+        return ImageRecord(self, row)
+
+    def extend(self, paths: Iterable[str], selections: Optional[Sequence[Optional[Selection]]] = None) -> None:
+        for i, path in enumerate(paths):
+            self.order.append(self._add_row(path, selections[i] if selections is not None else None))
+
+    def insert(self, index: int, path: str, selection: Optional[Selection] = None) -> ImageRecord:
+        row = self._add_row(path, selection)
+        self.order.insert(index, row)
+        return ImageRecord(self, row)
+
+    def index(self, record: ImageRecord) -> int:
+        # Raises ValueError like list.index when the record was removed
+        return self.order.index(record.row)
+
+    def remove_paths(self, paths: Iterable[str]) -> int:
+        gone = set(paths)
+        keep = array("I", (row for row in self.order if self.path_of(row) not in gone))
+        removed = len(self.order) - len(keep)
+        self.order = keep
+        self._rows_by_path = None
+        return removed
+
+    def _column(self, column: array) -> "np.ndarray":
+        # Column values in display order, without copying the column itself
+        return np.frombuffer(column, dtype=np.uint8)[np.frombuffer(self.order, dtype=np.uint32)]
+
+    def query(
+        self,
+        liked: Optional[bool] = None,
+        rejected: Optional[bool] = None,
+        min_score: Optional[int] = None,
+        max_score: Optional[int] = None,
+    ) -> List[int]:
+        """Display indices of the records matching every given condition."""
+        if HAS_NUMPY and len(self.order):
+            flags = self._column(self.flags)
+            scores = self._column(self.scores)
+            mask = np.ones(len(self.order), dtype=bool)
+            if liked is not None:
+                mask &= ((flags & FLAG_LIKED) != 0) == liked
+            if rejected is not None:
+                mask &= ((flags & FLAG_REJECTED) != 0) == rejected
+            if min_score is not None:
+                mask &= scores >= min_score
+            if max_score is not None:
+                mask &= scores <= max_score
+            return np.flatnonzero(mask).tolist()
+        matches = []
+        for index, row in enumerate(self.order):
+            flags = self.flags[row]
+            score = self.scores[row]
+            if liked is not None and bool(flags & FLAG_LIKED) != liked:
+                continue
+            if rejected is not None and bool(flags & FLAG_REJECTED) != rejected:
+                continue
+            if min_score is not None and score < min_score:
+                continue
+            if max_score is not None and score > max_score:
+                continue
+            matches.append(index)
+        return matches
+
+    def counts(self) -> Dict[str, int]:
+        # Liked and rejected are exclusive in the UI; "unmarked" is neither
+        if HAS_NUMPY and len(self.order):
+            flags = self._column(self.flags)
+            liked = int(np.count_nonzero(flags & FLAG_LIKED))
+            rejected = int(np.count_nonzero(flags & FLAG_REJECTED))
+            unmarked = int(np.count_nonzero(flags == 0))
+        else:
+            liked = rejected = unmarked = 0
+            for row in self.order:
+                flags = self.flags[row]
+                liked += bool(flags & FLAG_LIKED)
+                rejected += bool(flags & FLAG_REJECTED)
+                unmarked += flags == 0
+        return {"total": len(self.order), "liked": liked, "rejected": rejected, "unmarked": unmarked}
@@ -0,0 +1,78 @@
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from .imaging import VIEWER_REDUCING_GAP
+from .perf import span
+from .pyramid import ImagePyramid
+
+
+# Quiet period after the last resize/navigation before the LANCZOS pass starts
+VIEWER_REFINE_DELAY_MS = 120
+VIEWER_FAST_RESAMPLE = Image.BILINEAR
+
+
+class ProgressiveRenderer:
+    """Background high-quality resizes for the viewer.
+
+    The Tk thread draws a cheap resize itself and calls `submit()` for the LANCZOS
+    version. Every submit (or `invalidate()`) bumps a token, so a refine for an
+    image or window size that is no longer current is dropped instead of shown.
+    """
+
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refine")
+        self._lock = threading.Lock()
+        self._token = 0
+        self._future: Optional[Future] = None
+        self._results: "queue.Queue[Tuple[int, Image.Image]]" = queue.Queue()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._token += 1
+            future, self._future = self._future, None
+        if future is not None:
+            future.cancel()
+
+    def submit(self, pyramid: ImagePyramid, size: Tuple[int, int]) -> None:
+        self.invalidate()
+        with self._lock:
+            token = self._token
+            try:
+                self._future = self._executor.submit(self._run, token, pyramid, size)
+            except RuntimeError:
+                self._future = None
+
+    def busy(self) -> bool:
+        with self._lock:
+            return (self._future is not None and not self._future.done()) or not self._results.empty()
+
+    def take(self) -> Optional[Image.Image]:
+        # Latest refined image for the current token, if it has arrived
+        latest = None
+        while True:
+            try:
+                token, img = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if token == self._token:
+                latest = img
+        return latest
+
+    def shutdown(self) -> None:
+        self.invalidate()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, token: int, pyramid: ImagePyramid, size: Tuple[int, int]) -> None:
+        if token != self._token:
+            return
+        try:
+            with span("viewer.refine"):
+                refined = pyramid.resize_to_fit(size[0], size[1], Image.LANCZOS, VIEWER_REDUCING_GAP)
+        except Exception as ex:
+            print(f"Refine resize failed: {ex}")
+            return
+        self._results.put((token, refined))
@@ -0,0 +1,158 @@
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .imaging import IMAGE_EXTENSIONS, SIDE_CAR_EXTENSIONS
+from .thumbnails import cache_dir_for
+
+
+SCAN_INDEX_FILENAME = "scan_index.json"
+SCAN_INDEX_VERSION = 1
+SCAN_BATCH_SIZE = 500
+
+
+def is_hidden_name(name: str) -> bool:
+    # Hidden entries, including macOS resource forks ("._*")
+    return name.startswith(".")
+
+
+def is_image_filename(name: str) -> bool:
+    # Supported image that is not hidden; sidecars (.xmp) are never images
+    if is_hidden_name(name):
+        return False
+    _, ext = os.path.splitext(name)
+    ext = ext.lower()
+    return ext in IMAGE_EXTENSIONS and ext not in SIDE_CAR_EXTENSIONS
+
+
+class ScanIndex:
+    """Per-folder record of each directory's mtime and listing.
+
+    A directory whose mtime is unchanged has the same entries as last time, so a
+    rescan only stats directories and reads the listings of the ones that changed.
+    """
+
+    def __init__(self, folder_path: str) -> None:
+        self.path = os.path.join(cache_dir_for(folder_path), SCAN_INDEX_FILENAME)
+        self.dirs: Dict[str, dict] = {}
+        self._next: Dict[str, dict] = {}
+        self.reused = 0
+        # Directories whose listing was read again during the current scan
+        self.listed: List[str] = []
+
+    def load(self) -> "ScanIndex":
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == SCAN_INDEX_VERSION:
+                self.dirs = data.get("dirs", {})
+        except (OSError, ValueError):
+            self.dirs = {}
+        return self
+
+    def lookup(self, rel_dir: str, mtime_ns: int) -> Optional[dict]:
+        entry = self.dirs.get(rel_dir)
+        if entry is not None and entry.get("mtime_ns") == mtime_ns:
+            self.reused += 1
+            self._next[rel_dir] = entry
+            return entry
+        return None
+
+    def record(self, rel_dir: str, mtime_ns: int, files: List[str], dirs: List[str], skipped: int) -> None:
+        self._next[rel_dir] = {"mtime_ns": mtime_ns, "files": files, "dirs": dirs, "skipped": skipped}
+        self.listed.append(rel_dir)
+
+    def save(self) -> None:
+        # Only directories seen in this scan are kept, so deleted ones drop out
+        unchanged = not self.listed and self._next.keys() == self.dirs.keys()
+        self.dirs, self._next = self._next, {}
+        self.listed = []
+        self.reused = 0
+        if unchanged:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": SCAN_INDEX_VERSION, "dirs": self.dirs}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as ex:
+            print(f"Could not save scan index {self.path}: {ex}")
+
+
+def _list_directory(path: str) -> Tuple[List[str], List[str], int]:
+    # One scandir pass; DirEntry type info comes from the directory listing itself,
+    # so regular files and directories cost no extra stat
+    files: List[str] = []
+    dirs: List[str] = []
+    skipped = 0
+    with os.scandir(path) as it:
+        for entry in it:
+            name = entry.name
+            if is_hidden_name(name):
+                if not entry.is_dir(follow_symlinks=False):
+                    skipped += 1
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(name)
+                    continue
+                if not entry.is_file():
+                    skipped += 1
+                    continue
+            except OSError:
+                skipped += 1
+                continue
+            if is_image_filename(name):
+                files.append(name)
+            else:
+                skipped += 1
+    files.sort()
+    dirs.sort()
+    return files, dirs, skipped
+
+
+def iter_image_batches(
+    root_folder: str,
+    index: Optional[ScanIndex] = None,
+    batch_size: int = SCAN_BATCH_SIZE,
+) -> Iterator[Tuple[List[str], int]]:
+    """Walk `root_folder` depth-first and yield (image paths, skipped count) batches.
+
+    Order matches `scan_sort_key`: a directory's files (sorted) come before its
+    subdirectories (sorted). Hidden files and directories are not visited.
+    """
+    batch: List[str] = []
+    skipped = 0
+    stack: List[Tuple[str, str]] = [("", root_folder)]
+    while stack:
+        rel_dir, abs_dir = stack.pop()
+        try:
+            mtime_ns = os.stat(abs_dir).st_mtime_ns
+            entry = index.lookup(rel_dir, mtime_ns) if index is not None else None
+            if entry is not None:
+                files, dirs, dir_skipped = entry["files"], entry["dirs"], entry["skipped"]
+            else:
+                files, dirs, dir_skipped = _list_directory(abs_dir)
+                if index is not None:
+                    index.record(rel_dir, mtime_ns, files, dirs, dir_skipped)
+        except OSError as ex:
+            print(f"Could not scan {abs_dir}: {ex}")
+            continue
+        skipped += dir_skipped
+        for name in files:
+            batch.append(os.path.join(abs_dir, name))
+            if len(batch) >= batch_size:
+                yield batch, skipped
+                batch, skipped = [], 0
+        # Reverse so the stack pops subdirectories in sorted order
+        for name in reversed(dirs):
+            stack.append((os.path.join(rel_dir, name) if rel_dir else name, os.path.join(abs_dir, name)))
+    if batch or skipped:
+        yield batch, skipped
+
+
+def scan_sort_key(root_folder: str, path: str) -> Tuple[Tuple[int, str], ...]:
+    # Directories sort after the files beside them, matching iter_image_batches()
+    parts = os.path.relpath(path, root_folder).split(os.sep)
+    return tuple((1, part) for part in parts[:-1]) + ((0, parts[-1]),)
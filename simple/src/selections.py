@@ -0,0 +1,216 @@
+import csv
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+CSV_FILENAME = "image_selections.csv"
+CSV_HEADER = ["filename", "path", "liked", "rejected", "score", "sharpness"]
+# Write-ahead log of selection changes not yet compacted into the CSV. Hidden, so
+# the folder scanner skips it; `.compacting` holds a log whose compaction is in flight.
+JOURNAL_FILENAME = ".image_selections.journal"
+COMPACTING_SUFFIX = ".compacting"
+# The scores the app can set (keys 1-5); others (hand-edited or foreign files) are
+# ignored on load, as the views' "Any score" range would hide them
+MIN_SCORE = 1
+MAX_SCORE = 5
+
+
+def valid_score(score: int) -> bool:
+    return MIN_SCORE <= score <= MAX_SCORE
+
+
+def selection_key(path: str) -> str:
+    # Paths compare equal regardless of separators, `..` segments or (on Windows) case
+    return os.path.normcase(os.path.normpath(path))
+
+
+def iter_selection_rows(csv_path: str) -> Iterator[Tuple[str, Tuple[bool, bool, int], Optional[float]]]:
+    # Stream (path, (liked, rejected, score), sharpness) rows from a selections CSV.
+    # Columns are found by header name so files with extra or reordered columns still
+    # load; sharpness is None when the column is missing or empty.
+    try:
+        f = open(csv_path, "r", newline="", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = {name.strip(): i for i, name in enumerate(header)}
+        try:
+            path_col = columns["path"]
+            liked_col = columns["liked"]
+            rejected_col = columns["rejected"]
+            score_col = columns["score"]
+        except KeyError as ex:
+            raise ValueError(f"{csv_path} is missing the {ex} column")
+        sharpness_col = columns.get("sharpness")
+        for row in reader:
+            try:
+                path, score = row[path_col], int(row[score_col])
+                liked, rejected = row[liked_col] == "1", row[rejected_col] == "1"
+            except (IndexError, ValueError):
+                continue
+            if not valid_score(score):
+                continue
+            sharpness: Optional[float] = None
+            if sharpness_col is not None and sharpness_col < len(row) and row[sharpness_col]:
+                try:
+                    sharpness = float(row[sharpness_col])
+                except ValueError:
+                    pass
+            yield path, (liked, rejected, score), sharpness
+
+
+def iter_selections_csv(csv_path: str) -> Iterator[Tuple[str, Tuple[bool, bool, int]]]:
+    # (path, (liked, rejected, score)) rows; see iter_selection_rows()
+    for path, selection, _ in iter_selection_rows(csv_path):
+        yield path, selection
+
+
+def read_selections_csv(csv_path: str) -> Dict[str, Tuple[bool, bool, int]]:
+    # {selection_key(path): (liked, rejected, score)} for a saved CSV
+    return {selection_key(path): selection for path, selection in iter_selections_csv(csv_path)}
+
+
+def write_selections_csv(out_path: str, rows: List[List[str]]) -> None:
+    # Write beside the target and rename over it, so readers never see a partial CSV
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SelectionJournal:
+    """Append-only log of like/reject/score changes for one folder.
+
+    Each change is one JSON line (relative path, liked, rejected, score), so a
+    keystroke costs a single small write. `compact()` moves the log aside and writes
+    a full CSV snapshot on a background thread; `recover()` replays whatever logs are
+    left after a crash on top of the CSV.
+    """
+
+    def __init__(self, folder_path: str) -> None:
+        self.folder_path = folder_path
+        self.csv_path = os.path.join(folder_path, CSV_FILENAME)
+        self.journal_path = os.path.join(folder_path, JOURNAL_FILENAME)
+        self.compacting_path = self.journal_path + COMPACTING_SUFFIX
+        self.pending_changes = 0
+        self.last_error: Optional[str] = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+
+    def recover(self, apply: Callable[[str, bool, bool, int], bool]) -> int:
+        # Older log first so later changes win; returns the number of entries applied
+        applied = 0
+        for path in (self.compacting_path, self.journal_path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            rel_path, liked, rejected, score = json.loads(line)
+                            full_path = os.path.join(self.folder_path, rel_path)
+                            score = int(score)
+                        except (ValueError, TypeError):
+                            # Torn final line from a crash mid-write, or an entry of the wrong shape
+                            continue
+                        if valid_score(score) and apply(full_path, bool(liked), bool(rejected), score):
+                            applied += 1
+            except FileNotFoundError:
+                continue
+            except OSError as ex:
+                print(f"Could not read selection journal {path}: {ex}")
+        self.pending_changes = applied
+        return applied
+
+    def append(self, path: str, liked: bool, rejected: bool, score: int) -> None:
+        entry = json.dumps([os.path.relpath(path, self.folder_path), int(liked), int(rejected), score])
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.journal_path, "a", encoding="utf-8")
+                self._file.write(entry + "\n")
+                # Reaches the OS immediately; survives an app crash without an fsync per key
+                self._file.flush()
+            except OSError as ex:
+                self.last_error = str(ex)
+                print(f"Could not append to selection journal: {ex}")
+                return
+            self.pending_changes += 1
+
+    def compacting(self) -> bool:
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def compact(self, rows: List[List[str]], wait: bool = False) -> bool:
+        # `rows` must be a snapshot taken after every change logged so far
+        if self.compacting():
+            # One writer at a time; the previous snapshot is older than ours anyway
+            self._compactor.join()  # type: ignore[union-attr]
+        with self._lock:
+            try:
+                self._rotate()
+            except OSError as ex:
+                self.last_error = str(ex)
+                print(f"Could not rotate selection journal: {ex}")
+                return False
+            self.pending_changes = 0
+            self.last_error = None
+        self._compactor = threading.Thread(target=self._write_snapshot, args=(rows,), name="csv-compact", daemon=True)
+        self._compactor.start()
+        if wait:
+            self._compactor.join()
+        return True
+
+    def wait(self) -> None:
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if not os.path.exists(self.journal_path):
+            return
+        if os.path.exists(self.compacting_path):
+            # A previous compaction never finished; keep its entries ahead of ours
+            with open(self.journal_path, "rb") as src, open(self.compacting_path, "ab") as dst:
+                dst.write(src.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.compacting_path)
+
+    def _write_snapshot(self, rows: List[List[str]]) -> None:
+        try:
+            write_selections_csv(self.csv_path, rows)
+        except Exception as ex:
+            # Logs stay on disk, so nothing is lost; the next compaction retries
+            self.last_error = str(ex)
+            print(f"Could not write {self.csv_path}: {ex}")
+            return
+        try:
+            os.remove(self.compacting_path)
+        except FileNotFoundError:
+            pass
+        except OSError as ex:
+            print(f"Could not remove {self.compacting_path}: {ex}")
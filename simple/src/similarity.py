@@ -0,0 +1,142 @@
+import os
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+
+HASH_FILENAME = "hashes.json"
+HASH_VERSION = 1
+HASH_BITS = 64
+# Hamming distances between 64-bit dHashes. Consecutive frames closer than
+# BURST_DISTANCE and BURST_GAP_SECONDS apart form a burst; any two frames within
+# NEAR_DUPLICATE_DISTANCE are stacked wherever they sit in the folder.
+BURST_DISTANCE = int(os.environ.get("PHOTO_SELECTOR_BURST_DISTANCE", "12"))
+BURST_GAP_SECONDS = float(os.environ.get("PHOTO_SELECTOR_BURST_GAP", "2.0"))
+NEAR_DUPLICATE_DISTANCE = 3
+
+
+def dhash(img: Image.Image) -> int:
+    # Difference hash: 9x8 greyscale, one bit per horizontal neighbour comparison.
+    # Run on thumbnails, so the resize touches a few thousand pixels, not megapixels.
+    small = img.convert("L").resize((9, 8), Image.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class MultiIndexHash:
+    """Exact Hamming-radius search over 64-bit hashes.
+
+    Hashes are split into `radius + 1` chunks, each indexed in its own table. Two
+    hashes within `radius` bits must agree exactly on at least one chunk
+    (pigeonhole), so a query only checks the hashes sharing a chunk with it.
+    """
+
+    def __init__(self, radius: int = NEAR_DUPLICATE_DISTANCE) -> None:
+        self.radius = radius
+        chunks = radius + 1
+        widths = [HASH_BITS // chunks + (1 if i < HASH_BITS % chunks else 0) for i in range(chunks)]
+        self._chunks: List[Tuple[int, int]] = []
+        shift = HASH_BITS
+        for width in widths:
+            shift -= width
+            self._chunks.append((shift, (1 << width) - 1))
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in widths]
+        self._hashes: List[int] = []
+
+    def add(self, value: int) -> int:
+        ident = len(self._hashes)
+        self._hashes.append(value)
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            table.setdefault((value >> shift) & mask, []).append(ident)
+        return ident
+
+    def search(self, value: int) -> List[int]:
+        # Ids of every added hash within `radius` of `value`
+        found = set()
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            for ident in table.get((value >> shift) & mask, ()):
+                if ident not in found and hamming(value, self._hashes[ident]) <= self.radius:
+                    found.add(ident)
+        return sorted(found)
+
+
+class DisjointSet:
+    def __init__(self, size: int) -> None:
+        self._parent = array("i", range(size))
+
+    def find(self, item: int) -> int:
+        parent = self._parent
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # Lower index as root keeps a stack's id stable as frames are added
+            if rb < ra:
+                ra, rb = rb, ra
+            self._parent[rb] = ra
+
+
+def group_bursts(
+    hashes: Sequence[Optional[int]],
+    times: Sequence[float],
+    burst_distance: int = BURST_DISTANCE,
+    burst_gap: float = BURST_GAP_SECONDS,
+) -> Dict[int, int]:
+    """Stack ids for images in capture order; images not in any stack are left out.
+
+    Neighbours in capture order are joined when they look alike and were taken
+    close together (O(n)); near-identical frames anywhere are joined through a
+    multi-index hash. A stack's id is the position of its first frame.
+    """
+    count = len(hashes)
+    groups = DisjointSet(count)
+    previous: Optional[int] = None
+    for i, value in enumerate(hashes):
+        if value is None:
+            previous = None
+            continue
+        if previous is not None and hamming(value, hashes[previous]) <= burst_distance:  # type: ignore[arg-type]
+            gap = abs(times[i] - times[previous])
+            # Unknown capture times (inf) only rely on the image comparison
+            if gap <= burst_gap or gap != gap:
+                groups.union(previous, i)
+        previous = i
+
+    # Identical hashes join directly, so flat or black frames cannot blow up a bucket
+    index = MultiIndexHash(NEAR_DUPLICATE_DISTANCE)
+    first_with: Dict[int, int] = {}
+    ids: List[int] = []
+    for i, value in enumerate(hashes):
+        if value is None:
+            continue
+        if value in first_with:
+            groups.union(first_with[value], i)
+            continue
+        first_with[value] = i
+        for match in index.search(value):
+            groups.union(ids[match], i)
+        ids.append(i)
+        index.add(value)
+
+    roots = [groups.find(i) for i in range(count)]
+    sizes: Dict[int, int] = {}
+    for root in roots:
+        sizes[root] = sizes.get(root, 0) + 1
+    return {i: root for i, root in enumerate(roots) if sizes[root] > 1}
+
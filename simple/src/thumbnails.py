@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+
+# Per-folder cache directory. Hidden so the folder scanner skips it, and distinct
+# from the Electron app's `.thumbnails` directory which uses a different format.
+CACHE_DIRNAME = ".photo_selector"
+THUMBNAIL_SUBDIR = "thumbnails"
+THUMBNAIL_QUALITY = 85
+# Gallery thumbnail box; the disk cache is keyed by it, so the GUI and CLI share one
+THUMBNAIL_SIZE = (200, 200)
+
+
+def cache_dir_for(folder_path: str) -> str:
+    return os.path.join(folder_path, CACHE_DIRNAME)
+
+
+def file_signature(path: str) -> Optional[str]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+class ThumbnailCache:
+    """Small JPEG thumbnails stored under `<folder>/.photo_selector/thumbnails`.
+
+    Entries are named after the source path and thumbnail size; the source file's
+    size and mtime are stored in the JPEG comment and checked on load, so an edited
+    or replaced original simply misses and gets overwritten in place.
+    """
+
+    def __init__(self, folder_path: str, size: Tuple[int, int]) -> None:
+        self.directory = os.path.join(cache_dir_for(folder_path), THUMBNAIL_SUBDIR)
+        self.size = size
+        self.enabled = True
+
+    def _entry_path(self, path: str) -> str:
+        raw = f"{os.path.abspath(path)}|{self.size[0]}x{self.size[1]}"
+        key = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key + ".jpg")
+
+    def load(self, path: str, signature: Optional[str] = None) -> Optional[Image.Image]:
+        if signature is None:
+            signature = file_signature(path)
+        if signature is None:
+            return None
+        entry = self._entry_path(path)
+        try:
+            img = Image.open(entry)
+        except (OSError, ValueError):
+            return None
+        try:
+            comment = img.info.get("comment", b"")
+            if isinstance(comment, bytes):
+                comment = comment.decode("ascii", "replace")
+            if comment != signature:
+                img.close()
+                return None
+            img.load()
+            return img
+        except (OSError, ValueError):
+            img.close()
+            return None
+
+    def store(self, path: str, img: Image.Image, signature: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        if signature is None:
+            signature = file_signature(path)
+        if signature is None:
+            return
+        entry = self._entry_path(path)
+        tmp_path = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.save(tmp_path, "JPEG", quality=THUMBNAIL_QUALITY, comment=signature.encode("ascii"))
+            os.replace(tmp_path, entry)
+        except OSError as ex:
+            # Read-only media: keep working without a disk cache
+            print(f"Disabling thumbnail cache for {self.directory}: {ex}")
+            self.enabled = False
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+class SignatureCache:
+    """Per-folder JSON file of values derived from images (metadata, hashes, ...).
+
+    Entries are keyed by path relative to the folder and hold the file signature
+    they were computed from, so a changed file misses instead of returning stale data.
+    """
+
+    def __init__(self, folder_path: str, filename: str, version: int) -> None:
+        self.folder_path = folder_path
+        self.path = os.path.join(cache_dir_for(folder_path), filename)
+        self.version = version
+        self.entries: Dict[str, Tuple[str, Any]] = {}
+        self.dirty = False
+
+    def load(self) -> "SignatureCache":
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.version:
+                self.entries = {key: (sig, value) for key, (sig, value) in data.get("entries", {}).items()}
+        except (OSError, ValueError, TypeError):
+            self.entries = {}
+        return self
+
+    def get(self, path: str, signature: str) -> Optional[Any]:
+        entry = self.entries.get(os.path.relpath(path, self.folder_path))
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        return None
+
+    def put(self, path: str, signature: str, value: Any) -> None:
+        self.entries[os.path.relpath(path, self.folder_path)] = (signature, value)
+        self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "entries": self.entries}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as ex:
+            print(f"Could not save {self.path}: {ex}")
@@ -0,0 +1,209 @@
+import os
+import queue
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from PIL import Image
+
+
+# Memory budget for decoded viewer images, and how far around the cursor to decode
+VIEWER_CACHE_MB = int(os.environ.get("PHOTO_SELECTOR_VIEWER_CACHE_MB", "512"))
+VIEWER_PREFETCH_AHEAD = int(os.environ.get("PHOTO_SELECTOR_PREFETCH_AHEAD", "4"))
+VIEWER_PREFETCH_BEHIND = int(os.environ.get("PHOTO_SELECTOR_PREFETCH_BEHIND", "1"))
+# rawpy and Pillow release the GIL while decoding, so threads avoid copying
+# screen-sized buffers between processes
+VIEWER_DECODE_WORKERS = 2
+
+
+def image_nbytes(img: Image.Image) -> int:
+    return img.width * img.height * len(img.getbands())
+
+
+class DecodedImageCache:
+    """Thread-safe LRU of decoded images bounded by an approximate byte budget."""
+
+    def __init__(self, budget_bytes: int) -> None:
+        self.budget_bytes = budget_bytes
+        self._items: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[Image.Image]:
+        with self._lock:
+            img = self._items.get(key)
+            if img is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items.move_to_end(key)
+            return img
+
+    def peek(self, key: str) -> Optional[Image.Image]:
+        # Like get() but without touching LRU order or hit statistics
+        with self._lock:
+            return self._items.get(key)
+
+    def put(self, key: str, img: Image.Image) -> None:
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= image_nbytes(old)
+            self._items[key] = img
+            self._bytes += image_nbytes(img)
+            # Always keep the newest entry, even if it alone exceeds the budget
+            while self._bytes > self.budget_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= image_nbytes(evicted)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= image_nbytes(old)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+class ViewerPrefetcher:
+    """Decodes viewer images on background threads into a `DecodedImageCache`.
+
+    `request()` takes paths in priority order (current image first) and replaces
+    whatever was still queued, so holding an arrow key never builds a backlog. The
+    Tk thread polls `drain()` for finished paths.
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[str], Image.Image],
+        budget_bytes: int,
+        workers: int = VIEWER_DECODE_WORKERS,
+        refine: Optional[Callable[[str], Image.Image]] = None,
+    ) -> None:
+        self.cache = DecodedImageCache(budget_bytes)
+        self._decode = decode
+        self._refine = refine
+        self._workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="viewer")
+        self._lock = threading.RLock()
+        self._pending: Deque[Tuple[str, bool]] = deque()
+        # (path, generation) of running decodes; a decode from before clear() does not
+        # stand in for the same path in the current generation
+        self._in_flight: Set[Tuple[str, int]] = set()
+        self._failed: Dict[str, str] = {}
+        self._done: "queue.Queue[Tuple[int, str]]" = queue.Queue()
+        self._generation = 0
+
+    def request(self, paths: List[str]) -> None:
+        with self._lock:
+            self._pending.clear()
+            for path in dict.fromkeys(paths):
+                if (path, self._generation) in self._in_flight or path in self._failed or path in self.cache:
+                    continue
+                self._pending.append((path, False))
+        self._pump()
+
+    def refine(self, path: str) -> None:
+        # Replace a cached quick decode (e.g. an embedded RAW preview) with the full one;
+        # jumps the queue but is dropped again by the next request()
+        if self._refine is None:
+            return
+        with self._lock:
+            if (path, self._generation) in self._in_flight:
+                return
+            self._pending.appendleft((path, True))
+        self._pump()
+
+    def failure(self, path: str) -> Optional[str]:
+        with self._lock:
+            return self._failed.get(path)
+
+    def busy(self) -> bool:
+        with self._lock:
+            return bool(self._pending or self._in_flight) or not self._done.empty()
+
+    def drain(self) -> List[str]:
+        finished: List[str] = []
+        while True:
+            try:
+                generation, path = self._done.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self._generation:
+                finished.append(path)
+        return finished
+
+    def forget(self, paths: List[str]) -> None:
+        # Files changed or vanished on disk; the next request() decodes them again
+        with self._lock:
+            for path in paths:
+                self._failed.pop(path, None)
+                self.cache.discard(path)
+
+    def clear(self) -> None:
+        # Forget everything from the previous folder; running decodes finish unobserved
+        with self._lock:
+            self._generation += 1
+            self._pending.clear()
+            self._failed.clear()
+        self.cache.clear()
+
+    def shutdown(self) -> None:
+        self.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _pump(self) -> None:
+        with self._lock:
+            while self._pending and len(self._in_flight) < self._workers:
+                path, refine = self._pending.popleft()
+                job = (path, self._generation)
+                self._in_flight.add(job)
+                try:
+                    future = self._executor.submit(self._run, path, self._generation, refine)
+                except RuntimeError:
+                    self._in_flight.discard(job)
+                    self._pending.clear()
+                    return
+                future.add_done_callback(self._on_done)
+
+    def _run(self, path: str, generation: int, refine: bool) -> Tuple[str, int, Optional[str]]:
+        try:
+            img = self._refine(path) if refine and self._refine is not None else self._decode(path)
+        except Exception as ex:
+            if refine:
+                # Keep showing the quick decode
+                print(f"Full render failed for {path}: {ex}")
+                return path, generation, None
+            return path, generation, str(ex)
+        if generation == self._generation:
+            self.cache.put(path, img)
+        return path, generation, None
+
+    def _on_done(self, future: Future) -> None:
+        if future.cancelled():
+            return
+        path, generation, error = future.result()
+        with self._lock:
+            self._in_flight.discard((path, generation))
+            if generation == self._generation and error is not None:
+                self._failed[path] = error
+        self._done.put((generation, path))
+        self._pump()
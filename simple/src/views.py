@@ -0,0 +1,290 @@
+import os
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .records import FLAG_LIKED, FLAG_REJECTED, RecordStore
+
+
+# Which records a view shows, by like/reject state
+STATE_ALL = "all"
+STATE_LIKED = "liked"
+STATE_REJECTED = "rejected"
+STATE_UNMARKED = "unmarked"
+STATE_NOT_REJECTED = "not_rejected"
+STATES = (STATE_ALL, STATE_LIKED, STATE_REJECTED, STATE_UNMARKED, STATE_NOT_REJECTED)
+# Sort orders; scan order is the folder order records are loaded in
+SORT_SCAN = "scan"
+SORT_FILENAME = "filename"
+SORT_CAPTURE_TIME = "capture_time"
+SORT_SHARPNESS = "sharpness"
+SORTS = (SORT_SCAN, SORT_FILENAME, SORT_CAPTURE_TIME, SORT_SHARPNESS)
+
+
+def file_mtime(path: str) -> float:
+    # Stand-in capture time when nothing better is known
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+class FenwickTree:
+    """Prefix counts over 0/1 membership bits with O(log n) update, rank and select."""
+
+    def __init__(self, bits: List[int]) -> None:
+        tree = array("i", [0]) * (len(bits) + 1)
+        for i, bit in enumerate(bits, 1):
+            tree[i] += bit
+            parent = i + (i & -i)
+            if parent <= len(bits):
+                tree[parent] += tree[i]
+        self._tree = tree
+        self.total = sum(bits)
+
+    def __len__(self) -> int:
+        return len(self._tree) - 1
+
+    def add(self, index: int, delta: int) -> None:
+        self.total += delta
+        i = index + 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index: int) -> int:
+        # Members among positions [0, index)
+        total = 0
+        i = index
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, k: int) -> int:
+        # Position of the k-th member (0-based); k must be < total
+        pos = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        tree = self._tree
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= k:
+                pos = nxt
+                k -= tree[nxt]
+            step >>= 1
+        return pos
+
+    def append(self, bit: int) -> None:
+        # Node i covers (i - lowbit(i), i]: the new bit plus the subtrees below it
+        i = len(self._tree)
+        value = bit + self.prefix(i - 1) - self.prefix(i - (i & -i))
+        self._tree.append(value)
+        self.total += bit
+
+
+class RecordView:
+    """A filtered, sorted window onto a `RecordStore`.
+
+    `order` maps sort positions to store indices and `rank` is its inverse; a
+    Fenwick tree over sort positions counts which records pass the filter (what the
+    viewer steps through). With `collapse` on, a second tree counts only the first
+    passing frame of each burst stack (what the gallery shows). A like, reject or
+    score change touches one bit per tree plus the rest of that record's stack, so
+    `update()`, `__getitem__`, `position_of()` and `step()` stay O(log n).
+    Inserting or removing records shifts store indices and needs `rebuild()`.
+    """
+
+    def __init__(
+        self,
+        store: RecordStore,
+        state: str = STATE_ALL,
+        score_range: Tuple[int, int] = (1, 5),
+        sort: str = SORT_SCAN,
+        capture_time: Callable[[str], float] = file_mtime,
+        stack_of: Optional[Callable[[str], Optional[int]]] = None,
+        collapse: bool = False,
+    ) -> None:
+        self.store = store
+        self.state = state
+        self.score_range = score_range
+        self.sort = sort
+        self.capture_time = capture_time
+        self.stack_of = stack_of
+        self.collapse = collapse
+        self.order = array("I")
+        self.rank = array("I")
+        self._members = FenwickTree([])
+        self._bits = bytearray()
+        self._shown = FenwickTree([])
+        self._shown_bits = bytearray()
+        # Burst stacks: store index -> stack id (-1 for none), stack id -> members by rank
+        self._stack_ids = array("i")
+        self._stacks: Dict[int, List[int]] = {}
+        self.rebuild()
+
+    def configure(
+        self,
+        state: Optional[str] = None,
+        score_range: Optional[Tuple[int, int]] = None,
+        sort: Optional[str] = None,
+        collapse: Optional[bool] = None,
+    ) -> None:
+        if state is not None:
+            self.state = state
+        if score_range is not None:
+            self.score_range = score_range
+        if sort is not None:
+            self.sort = sort
+        if collapse is not None:
+            self.collapse = collapse
+        self.rebuild()
+
+    @property
+    def filtered(self) -> bool:
+        return self.state != STATE_ALL or self.score_range != (1, 5)
+
+    @property
+    def count(self) -> int:
+        # Records passing the filter, stacked or not
+        return self._members.total
+
+    def __len__(self) -> int:
+        # Gallery cells: one per unstacked record or stack
+        return self._shown.total
+
+    def __getitem__(self, position: int) -> int:
+        # Store index of the record shown in gallery cell `position`
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self.order[self._shown.find(position)]
+
+    def _passes(self, index: int) -> bool:
+        row = self.store.order[index]
+        flags = self.store.flags[row]
+        if self.state == STATE_LIKED and not flags & FLAG_LIKED:
+            return False
+        if self.state == STATE_REJECTED and not flags & FLAG_REJECTED:
+            return False
+        if self.state == STATE_UNMARKED and flags:
+            return False
+        if self.state == STATE_NOT_REJECTED and flags & FLAG_REJECTED:
+            return False
+        low, high = self.score_range
+        return low <= self.store.scores[row] <= high
+
+    def _is_shown(self, index: int) -> int:
+        # Passing records are shown unless an earlier frame of their stack already is
+        if not self._bits[self.rank[index]]:
+            return 0
+        stack = self._stack_ids[index] if self.collapse else -1
+        if stack < 0:
+            return 1
+        for other in self._stacks[stack]:
+            if self._bits[self.rank[other]]:
+                return 1 if other == index else 0
+        return 0
+
+    def _sorted_indices(self) -> List[int]:
+        count = len(self.store)
+        if self.sort == SORT_FILENAME:
+            names, rows = self.store.names, self.store.order
+            keys = [(names[rows[index]].casefold(), names[rows[index]]) for index in range(count)]
+            return sorted(range(count), key=keys.__getitem__)
+        if self.sort == SORT_CAPTURE_TIME:
+            times = [self.capture_time(path) for path in self.store.paths()]
+            # Ties (bursts within a second, unknown times) keep scan order
+            return sorted(range(count), key=times.__getitem__)
+        if self.sort == SORT_SHARPNESS:
+            sharpness, rows = self.store.sharpness, self.store.order
+            # Sharpest first; unmeasured records (NaN) last
+            keys = [-value if value == value else float("inf") for value in (sharpness[rows[i]] for i in range(count))]
+            return sorted(range(count), key=keys.__getitem__)
+        return list(range(count))
+
+    def rebuild(self) -> None:
+        self.order = array("I", self._sorted_indices())
+        self.rank = array("I", [0]) * len(self.order)
+        for position, index in enumerate(self.order):
+            self.rank[index] = position
+        self._bits = bytearray(1 if self._passes(index) else 0 for index in self.order)
+        self._members = FenwickTree(list(self._bits))
+
+        self._stack_ids = array("i", [-1]) * len(self.order)
+        self._stacks = {}
+        if self.stack_of is not None:
+            for index in self.order:
+                stack = self.stack_of(self.store[index].path)
+                if stack is not None:
+                    self._stack_ids[index] = stack
+                    self._stacks.setdefault(stack, []).append(index)
+        self._shown_bits = bytearray(self._is_shown(index) for index in self.order)
+        self._shown = FenwickTree(list(self._shown_bits))
+
+    def extend(self) -> None:
+        # Records appended to the store (a scan in progress) join the end of the view;
+        # call rebuild() afterwards if the view is not in scan order
+        for index in range(len(self.order), len(self.store)):
+            self.rank.append(len(self.order))
+            self.order.append(index)
+            self._stack_ids.append(-1)
+            bit = 1 if self._passes(index) else 0
+            self._bits.append(bit)
+            self._members.append(bit)
+            self._shown_bits.append(bit)
+            self._shown.append(bit)
+
+    def _set_shown(self, index: int) -> None:
+        position = self.rank[index]
+        bit = self._is_shown(index)
+        if bit != self._shown_bits[position]:
+            self._shown_bits[position] = bit
+            self._shown.add(position, 1 if bit else -1)
+
+    def update(self, index: int) -> bool:
+        # Re-test one record after its like/reject/score changed; True if it moved in or out
+        position = self.rank[index]
+        bit = 1 if self._passes(index) else 0
+        if bit == self._bits[position]:
+            return False
+        self._bits[position] = bit
+        self._members.add(position, 1 if bit else -1)
+        stack = self._stack_ids[index] if self.collapse else -1
+        # The stack's first passing frame may have changed
+        for other in self._stacks[stack] if stack >= 0 else (index,):
+            self._set_shown(other)
+        return True
+
+    def stack_size(self, index: int) -> int:
+        # Frames of this record's stack that pass the filter; 1 when not stacked
+        stack = self._stack_ids[index]
+        if stack < 0:
+            return 1
+        return sum(self._bits[self.rank[other]] for other in self._stacks[stack])
+
+    def position_of(self, index: int) -> Optional[int]:
+        # Position among the records passing the filter (the viewer's counter)
+        position = self.rank[index]
+        if not self._bits[position]:
+            return None
+        return self._members.prefix(position)
+
+    def step(self, index: int, delta: int) -> Optional[int]:
+        # Store index `delta` (+1/-1) places from `index` among the records passing the
+        # filter, wrapping; stacks are walked frame by frame. Works from records the
+        # filter has just dropped, too.
+        total = self.count
+        if not total:
+            return None
+        position = self.rank[index]
+        before = self._members.prefix(position)
+        if delta > 0:
+            k = before + self._bits[position]
+        else:
+            k = before - 1
+        return self.order[self._members.find(k % total)]
+
+    def first(self) -> Optional[int]:
+        return self[0] if len(self) else None
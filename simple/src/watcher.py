@@ -0,0 +1,197 @@
+import os
+import queue
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from .scanner import ScanIndex, is_hidden_name, is_image_filename, iter_image_batches
+from .thumbnails import file_signature
+
+try:
+    from watchdog.events import FileSystemEventHandler  # type: ignore
+    from watchdog.observers import Observer  # type: ignore
+    HAS_WATCHDOG = True
+except Exception:
+    FileSystemEventHandler = object  # type: ignore
+    Observer = None  # type: ignore
+    HAS_WATCHDOG = False
+
+
+# Rescan interval without native events; each rescan stats directories and lists
+# only the ones whose mtime changed
+WATCH_POLL_SECONDS = float(os.environ.get("PHOTO_SELECTOR_WATCH_POLL", "2.0"))
+# An in-place rewrite leaves the directory mtime alone, so without events each poll
+# also stats this many loaded images, rotating through the folder
+WATCH_STAT_SLICE = int(os.environ.get("PHOTO_SELECTOR_WATCH_STAT_SLICE", "1000"))
+# With native events, still rescan now and then in case an event was dropped
+WATCH_RESCAN_SECONDS = 30.0
+# Quiet period after the last event before rescanning, and between the two matching
+# size/mtime checks a new file needs before it is reported (tethered files arrive
+# over a few hundred milliseconds)
+WATCH_SETTLE_SECONDS = 0.5
+
+
+class FolderChanges(NamedTuple):
+    added: List[str]
+    removed: List[str]
+    changed: List[str]
+
+
+class _EventHandler(FileSystemEventHandler):  # type: ignore[misc]
+    def __init__(self, watcher: "FolderWatcher") -> None:
+        super().__init__()
+        self._watcher = watcher
+
+    def on_any_event(self, event) -> None:
+        self._watcher._notify(
+            [event.src_path, getattr(event, "dest_path", "") or ""], bool(getattr(event, "is_directory", False))
+        )
+
+
+class FolderWatcher:
+    """Reports images added to, removed from or rewritten under a loaded folder.
+
+    Native filesystem events (inotify, FSEvents, ReadDirectoryChangesW via the
+    optional `watchdog` package) only wake the watcher; every report comes from an
+    incremental rescan against the folder's `ScanIndex`, so both modes behave the
+    same. Results are put on `changes` for the Tk thread to apply.
+    """
+
+    def __init__(self, folder_path: str, known_paths: Iterable[str]) -> None:
+        self.folder_path = folder_path
+        self.changes: "queue.Queue[FolderChanges]" = queue.Queue()
+        self.native = False
+        self._known: Set[str] = set(known_paths)
+        self._signatures: Dict[str, Optional[str]] = {}
+        self._unsettled: Dict[str, Optional[str]] = {}
+        self._touched: Set[str] = set()
+        # Polling: loaded images still to stat in the current sweep
+        self._sweep: List[str] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "FolderWatcher":
+        if HAS_WATCHDOG:
+            try:
+                observer = Observer()  # type: ignore[misc]
+                observer.schedule(_EventHandler(self), self.folder_path, recursive=True)
+                observer.start()
+                self._observer = observer
+                self.native = True
+            except Exception as ex:
+                print(f"Native folder watching unavailable, polling instead: {ex}")
+        self._thread = threading.Thread(target=self._run, name="folder-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        # Returns immediately; a rescan in progress finishes unobserved
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+            except Exception:
+                pass
+            self._observer = None
+
+    def _notify(self, paths: List[str], is_directory: bool) -> None:
+        # Observer thread: remember image paths for change detection and wake the scan
+        wake = False
+        with self._lock:
+            for path in paths:
+                if not path:
+                    continue
+                rel_path = os.path.relpath(path, self.folder_path)
+                if rel_path.startswith(os.pardir) or any(is_hidden_name(part) for part in rel_path.split(os.sep)):
+                    continue
+                if is_directory:
+                    wake = True
+                elif is_image_filename(os.path.basename(path)):
+                    self._touched.add(path)
+                    wake = True
+        if wake:
+            self._wake.set()
+
+    def _run(self) -> None:
+        index = ScanIndex(self.folder_path).load()
+        while not self._stop.is_set():
+            if self._unsettled:
+                timeout = WATCH_SETTLE_SECONDS
+            else:
+                timeout = WATCH_RESCAN_SECONDS if self.native else WATCH_POLL_SECONDS
+            self._wake.wait(timeout)
+            # Let a burst of events (a camera writing a file) go quiet first
+            while self._wake.is_set() and not self._stop.is_set():
+                self._wake.clear()
+                self._stop.wait(WATCH_SETTLE_SECONDS)
+            if self._stop.is_set():
+                return
+            with self._lock:
+                touched, self._touched = self._touched, set()
+            try:
+                changes = self._rescan(index, touched)
+            except Exception as ex:
+                print(f"Folder watch rescan failed for {self.folder_path}: {ex}")
+                continue
+            if changes.added or changes.removed or changes.changed:
+                self.changes.put(changes)
+
+    def _rescan(self, index: ScanIndex, touched: Set[str]) -> FolderChanges:
+        current: Set[str] = set()
+        for paths, _ in iter_image_batches(self.folder_path, index):
+            current.update(paths)
+        listed = set(index.listed)
+        index.save()
+
+        # A new file is reported once its size and mtime hold still across two scans
+        added: List[str] = []
+        for path in current - self._known:
+            signature = file_signature(path)
+            if signature is not None and self._unsettled.get(path) == signature:
+                del self._unsettled[path]
+                self._signatures[path] = signature
+                added.append(path)
+            else:
+                self._unsettled[path] = signature
+        for path in [p for p in self._unsettled if p not in current]:
+            del self._unsettled[path]
+
+        removed = [path for path in self._known if path not in current]
+        for path in removed:
+            self._signatures.pop(path, None)
+
+        # Rewritten files: paths named by events, plus every file in a directory that
+        # had to be listed again (what polling sees of an atomic save), plus, when
+        # polling, the next slice of the sweep for rewrites made in place
+        candidates = {path for path in touched if path in self._known and path in current}
+        if not self.native:
+            candidates.update(path for path in self._next_slice() if path in current)
+        if listed:
+            listed_dirs = {os.path.join(self.folder_path, rel_dir) if rel_dir else self.folder_path for rel_dir in listed}
+            candidates.update(
+                path for path in self._known if path in current and os.path.dirname(path) in listed_dirs
+            )
+        changed: List[str] = []
+        for path in candidates:
+            signature = file_signature(path)
+            previous = self._signatures.get(path)
+            self._signatures[path] = signature
+            # Without a previous signature only an explicit event counts as a change
+            if (previous is not None and previous != signature) or (previous is None and path in touched):
+                changed.append(path)
+
+        self._known.difference_update(removed)
+        self._known.update(added)
+        return FolderChanges(sorted(added), sorted(removed), sorted(changed))
+
+    def _next_slice(self) -> List[str]:
+        if not self._sweep:
+            # Popped from the end, so reversed to sweep in path order
+            self._sweep = sorted(self._known, reverse=True)
+        count = min(len(self._sweep), max(1, WATCH_STAT_SLICE))
+        batch = self._sweep[-count:]
+        del self._sweep[-count:]
+        return [path for path in batch if path in self._known]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the app package as `src`, as main.py does when run from simple/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,57 @@
+import os
+import time
+
+import pytest
+
+from src.catalog import Catalog, CatalogQuery, parse_query
+from src.metadata import MetadataCache
+
+
+def test_parse_query_terms():
+    query = parse_query("liked score>=4 camera:Nikon IMG_")
+    assert query == CatalogQuery(liked=True, min_score=4, camera="Nikon", name="IMG_")
+    assert parse_query("score=5") == CatalogQuery(min_score=5, max_score=5)
+    assert parse_query("unmarked") == CatalogQuery(liked=False, rejected=False)
+    year = parse_query("date:2024")
+    assert year.since == time.mktime((2024, 1, 1, 0, 0, 0, 0, 0, -1))
+    assert year.until == time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+    assert parse_query("until:2024-12").until == time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+
+
+@pytest.mark.parametrize("text", ["score>5x", "score!3", "date:June", "colour:red"])
+def test_parse_query_rejects_bad_terms(text):
+    with pytest.raises(ValueError):
+        parse_query(text)
+
+
+def _rows(folder, *names_and_state):
+    # RecordStore.csv_row() layout: filename, path, liked, rejected, score, sharpness
+    return [
+        [name, os.path.join(folder, name), "1" if liked else "0", "0", str(score), ""]
+        for name, liked, score in names_and_state
+    ]
+
+
+def test_queries_run_after_pending_syncs(tmp_path):
+    folder = str(tmp_path / "shoot")
+    os.makedirs(folder)
+    catalog = Catalog(str(tmp_path / "catalog.sqlite3"))
+    try:
+        catalog.sync_folder(folder, _rows(folder, ("a.jpg", True, 5), ("b.jpg", False, 3)))
+        answer = catalog.submit_query(parse_query("liked")).get(timeout=5)
+        assert answer.error is None and not answer.truncated
+        assert [row.path for row in answer.rows] == [os.path.join(folder, "a.jpg")]
+
+        # Metadata cached after the first sync reaches the catalog on the next one
+        cache = MetadataCache(folder)
+        cache.put(os.path.join(folder, "b.jpg"), "1:1", {"make": "Nikon", "model": "Z 6", "time": 1.0})
+        cache.save()
+        catalog.sync_folder(folder, _rows(folder, ("a.jpg", True, 5), ("b.jpg", False, 3)))
+        answer = catalog.submit_query(parse_query("camera:nikon")).get(timeout=5)
+        assert [row.path for row in answer.rows] == [os.path.join(folder, "b.jpg")]
+
+        # Nothing matched: the answer says how much was searched
+        answer = catalog.submit_query(parse_query("rejected")).get(timeout=5)
+        assert answer.rows == [] and answer.counts == (1, 2)
+    finally:
+        catalog.close()
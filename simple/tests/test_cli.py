@@ -0,0 +1,25 @@
+from src.cli import merge_csvs
+from src.selections import iter_selection_rows
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_merge_csvs_keeps_sharpness(tmp_path):
+    first = _write(
+        tmp_path / "a.csv",
+        "filename,path,liked,rejected,score,sharpness\n"
+        "1.jpg,/a/1.jpg,1,0,5,812.5\n"
+        "2.jpg,/a/2.jpg,0,0,5,40.0\n",
+    )
+    # An older file without the column: its selections win, the measured value stays
+    second = _write(tmp_path / "b.csv", "filename,path,liked,rejected,score\n1.jpg,/a/1.jpg,0,1,2\n3.jpg,/a/3.jpg,1,0,4\n")
+    out = str(tmp_path / "merged.csv")
+    assert merge_csvs([first, second], out) == 0
+    assert sorted(iter_selection_rows(out)) == [
+        ("/a/1.jpg", (False, True, 2), 812.5),
+        ("/a/2.jpg", (False, False, 5), 40.0),
+        ("/a/3.jpg", (True, False, 4), None),
+    ]
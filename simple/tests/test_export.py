@@ -0,0 +1,38 @@
+from PIL import Image
+
+from src.export import render_jpeg
+from src.metadata import EXIF_IFD_POINTER, ORIENTATION_TAG, read_metadata, render_exif
+
+
+def _tiff_with_exif(path, orientation=1):
+    exif = Image.Exif()
+    exif[0x010F] = "Nikon"
+    exif[0x0110] = "Z 6"
+    exif[ORIENTATION_TAG] = orientation
+    exif_ifd = exif.get_ifd(EXIF_IFD_POINTER)
+    exif_ifd[0x9003] = "2024:05:06 07:08:09"
+    exif_ifd[0x829A] = 1 / 250
+    exif_ifd[0x8827] = 400
+    Image.new("RGB", (60, 40), (10, 120, 200)).save(path, "TIFF", exif=exif.tobytes())
+    return str(path)
+
+
+def test_render_exif_keeps_camera_settings_but_not_orientation(tmp_path):
+    source = _tiff_with_exif(tmp_path / "a.tif", orientation=6)
+    out = tmp_path / "a.jpg"
+    Image.new("RGB", (4, 4)).save(out, exif=render_exif(source))
+    meta = read_metadata(str(out))
+    assert meta["make"] == "Nikon" and meta["model"] == "Z 6" and meta["iso"] == 400
+    assert meta["time"] == read_metadata(source)["time"]
+    assert "orientation" not in meta
+    assert render_exif(str(tmp_path / "missing.dng")) is None
+
+
+def test_raw_render_carries_header_exif(tmp_path):
+    # A TIFF-based RAW; without rawpy it is decoded by PIL, which leaves no "exif" info
+    source = _tiff_with_exif(tmp_path / "a.dng")
+    destination = tmp_path / "a.jpg"
+    assert render_jpeg(source, str(destination), 32) > 0
+    with Image.open(destination) as img:
+        assert max(img.size) == 32
+    assert read_metadata(str(destination))["model"] == "Z 6"
@@ -0,0 +1,73 @@
+import json
+import os
+
+from src.selections import CSV_HEADER, SelectionJournal, iter_selections_csv
+
+
+def _recover(journal: SelectionJournal):
+    applied = []
+
+    def _apply(path, liked, rejected, score):
+        applied.append((os.path.basename(path), liked, rejected, score))
+        return True
+
+    count = journal.recover(_apply)
+    return count, applied
+
+
+def test_recover_replays_appends_in_order(tmp_path):
+    journal = SelectionJournal(str(tmp_path))
+    journal.append(str(tmp_path / "1.jpg"), True, False, 4)
+    journal.append(str(tmp_path / "2.jpg"), False, True, 2)
+    journal.append(str(tmp_path / "1.jpg"), False, False, 3)
+    journal.close()
+    count, applied = _recover(SelectionJournal(str(tmp_path)))
+    assert count == 3
+    assert applied == [("1.jpg", True, False, 4), ("2.jpg", False, True, 2), ("1.jpg", False, False, 3)]
+
+
+def test_recover_skips_torn_and_malformed_lines(tmp_path):
+    journal = SelectionJournal(str(tmp_path))
+    with open(journal.journal_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(["1.jpg", 1, 0, None]) + "\n")
+        f.write(json.dumps(["2.jpg", 1, 0, "x"]) + "\n")
+        f.write(json.dumps(["3.jpg", 1, 0]) + "\n")
+        f.write(json.dumps(["4.jpg", 1, 0, 300]) + "\n")
+        f.write(json.dumps(["4.jpg", 1, 0, 0]) + "\n")
+        f.write(json.dumps([None, 1, 0, 3]) + "\n")
+        f.write(json.dumps(["5.jpg", 0, 1, 1]) + "\n")
+        f.write('["6.jpg", 1, 0')
+    count, applied = _recover(journal)
+    assert count == 1
+    assert applied == [("5.jpg", False, True, 1)]
+
+
+def test_compact_writes_csv_and_keeps_later_changes(tmp_path):
+    journal = SelectionJournal(str(tmp_path))
+    journal.append(str(tmp_path / "1.jpg"), True, False, 5)
+    rows = [["1.jpg", str(tmp_path / "1.jpg"), "1", "0", "5", ""]]
+    assert journal.compact(rows, wait=True)
+    assert journal.last_error is None
+    assert not os.path.exists(journal.compacting_path)
+    assert not os.path.exists(journal.journal_path)
+    with open(journal.csv_path, encoding="utf-8") as f:
+        assert f.readline().strip().split(",") == CSV_HEADER
+    assert list(iter_selections_csv(journal.csv_path)) == [(str(tmp_path / "1.jpg"), (True, False, 5))]
+
+    # A change after the snapshot stays in the journal until the next compaction
+    journal.append(str(tmp_path / "1.jpg"), False, True, 2)
+    journal.close()
+    count, applied = _recover(SelectionJournal(str(tmp_path)))
+    assert count == 1
+    assert applied == [("1.jpg", False, True, 2)]
+
+
+def test_recover_reads_interrupted_compaction_first(tmp_path):
+    journal = SelectionJournal(str(tmp_path))
+    with open(journal.compacting_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(["1.jpg", 1, 0, 4]) + "\n")
+    with open(journal.journal_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(["1.jpg", 0, 1, 2]) + "\n")
+    count, applied = _recover(journal)
+    assert count == 2
+    assert applied[-1] == ("1.jpg", False, True, 2)
@@ -0,0 +1,62 @@
+import os
+
+from src.scanner import ScanIndex, iter_image_batches, scan_sort_key
+from src.thumbnails import cache_dir_for
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb"):
+        pass
+    return str(path)
+
+
+def _scan(folder, index=None, batch_size=2):
+    paths, skipped = [], 0
+    for batch, batch_skipped in iter_image_batches(folder, index, batch_size):
+        paths.extend(batch)
+        skipped += batch_skipped
+    return paths, skipped
+
+
+def test_scan_order_and_skipped_files(tmp_path):
+    folder = str(tmp_path)
+    expected = [_touch(tmp_path / name) for name in ("a.jpg", "b.NEF", "sub/a.png", "sub/deeper/c.jpg", "z/d.jpg")]
+    _touch(tmp_path / "notes.txt")
+    _touch(tmp_path / "a.xmp")
+    _touch(tmp_path / ".hidden" / "e.jpg")
+    paths, skipped = _scan(folder)
+    assert paths == expected == sorted(expected, key=lambda path: scan_sort_key(folder, path))
+    assert skipped == 2
+
+
+def test_scan_index_relists_only_changed_directories(tmp_path):
+    folder = str(tmp_path)
+    # Present up front, so saving the index does not touch the folder's own mtime
+    os.makedirs(cache_dir_for(folder))
+    first = [_touch(tmp_path / name) for name in ("a.jpg", "other/c.jpg", "sub/b.jpg")]
+
+    index = ScanIndex(folder).load()
+    assert _scan(folder, index)[0] == first
+    assert sorted(index.listed) == ["", "other", "sub"]
+    index.save()
+
+    index = ScanIndex(folder).load()
+    assert _scan(folder, index)[0] == first
+    assert index.listed == [] and index.reused == 3
+    index.save()
+
+    added = _touch(tmp_path / "sub" / "a.jpg")
+    index = ScanIndex(folder).load()
+    assert _scan(folder, index)[0] == [first[0], first[1], added, first[2]]
+    assert index.listed == ["sub"]
+    index.save()
+
+    # A removed directory is relisted through its parent and drops out of the index
+    os.remove(first[1])
+    os.rmdir(tmp_path / "other")
+    index = ScanIndex(folder).load()
+    assert _scan(folder, index)[0] == [first[0], added, first[2]]
+    assert index.listed == [""]
+    index.save()
+    assert sorted(ScanIndex(folder).load().dirs) == ["", "sub"]
@@ -0,0 +1,68 @@
+import os
+
+from src.records import RecordStore
+from src.selections import iter_selections_csv, read_selections_csv, selection_key
+from src.views import RecordView
+
+
+def _write(path: str, text: str) -> str:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    return path
+
+
+def test_iter_selections_csv_reads_columns_by_header(tmp_path):
+    csv_path = _write(
+        str(tmp_path / "s.csv"),
+        "score,path,extra,rejected,liked\n4,/a/1.jpg,x,0,1\n2,/a/2.jpg,y,1,0\n",
+    )
+    assert list(iter_selections_csv(csv_path)) == [
+        ("/a/1.jpg", (True, False, 4)),
+        ("/a/2.jpg", (False, True, 2)),
+    ]
+
+
+def test_iter_selections_csv_skips_bad_rows(tmp_path):
+    csv_path = _write(
+        str(tmp_path / "s.csv"),
+        "filename,path,liked,rejected,score\n"
+        "1.jpg,/a/1.jpg,1,0,300\n"
+        "2.jpg,/a/2.jpg,1,0,-1\n"
+        "3.jpg,/a/3.jpg,1,0,five\n"
+        "4.jpg,/a/4.jpg\n"
+        "5.jpg,/a/5.jpg,0,0,0\n"
+        "6.jpg,/a/6.jpg,1,0,5\n"
+        "7.jpg,/a/7.jpg,0,0,1\n",
+    )
+    # Score 0 cannot be set in the app and would be hidden by every score filter
+    assert list(iter_selections_csv(csv_path)) == [
+        ("/a/6.jpg", (True, False, 5)),
+        ("/a/7.jpg", (False, False, 1)),
+    ]
+
+
+def test_iter_selections_csv_missing_file_and_column(tmp_path):
+    assert list(iter_selections_csv(str(tmp_path / "missing.csv"))) == []
+    csv_path = _write(str(tmp_path / "s.csv"), "path,liked,rejected\n/a/1.jpg,1,0\n")
+    try:
+        list(iter_selections_csv(csv_path))
+    except ValueError as ex:
+        assert "score" in str(ex)
+    else:
+        raise AssertionError("missing column was not reported")
+
+
+def test_read_selections_csv_keys_by_normalised_path(tmp_path):
+    csv_path = _write(str(tmp_path / "s.csv"), "path,liked,rejected,score\n/a/b/../1.jpg,1,0,3\n")
+    saved = read_selections_csv(csv_path)
+    assert saved == {selection_key(os.path.join("/a", "1.jpg")): (True, False, 3)}
+
+
+def test_loaded_selections_are_all_in_the_default_view(tmp_path):
+    csv_path = _write(str(tmp_path / "s.csv"), "path,liked,rejected,score\n/a/1.jpg,0,0,0\n/a/2.jpg,0,0,5\n")
+    saved = read_selections_csv(csv_path)
+    store = RecordStore()
+    paths = ["/a/1.jpg", "/a/2.jpg"]
+    store.extend(paths, [saved.get(selection_key(path)) for path in paths])
+    view = RecordView(store)
+    assert not view.filtered and len(view) == view.count == 2
@@ -0,0 +1,41 @@
+from PIL import Image
+
+from src.similarity import MultiIndexHash, dhash, group_bursts, hamming
+
+INF = float("inf")
+
+
+def test_group_bursts_joins_neighbours_and_near_duplicates():
+    h = 0xFFFF0000
+    hashes = [
+        0x0,  # 0: starts a burst
+        0x1F,  # 1: 5 bits from 0, a second later
+        2 ** 64 - 1,  # 2: a different scene
+        0x1F ^ (1 << 40),  # 3: 1 bit from 1, not adjacent: near-duplicate
+        None,  # 4: unreadable, breaks the neighbour chain
+        0xF00,  # 5: 4 bits from 0, too far for a near-duplicate
+        0xF01,  # 6: 1 bit from 5
+        h,  # 7: no capture time
+        h ^ (0x3F << 16),  # 8: no capture time either; compared by image alone
+        h ^ (0x3F << 16) ^ 0x1F,  # 9: alike, but one time is known and the other is not
+        0x1F ^ 0xF << 50,  # 10: alike 1 but taken long after
+    ]
+    times = [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, INF, INF, 1000.0, 5000.0]
+    assert group_bursts(hashes, times) == {0: 0, 1: 0, 3: 0, 5: 5, 6: 5, 7: 7, 8: 7}
+    # Tighter settings split the burst but keep the near-duplicate
+    assert group_bursts(hashes[:4], times[:4], burst_distance=4) == {1: 1, 3: 1}
+
+
+def test_multi_index_hash_finds_everything_within_radius():
+    index = MultiIndexHash(3)
+    values = [0x0, 0x7, 0xF, 0x8000000000000001, 0xFFFF]
+    for value in values:
+        index.add(value)
+    for probe in (0x0, 0x3, 0x8000000000000000):
+        assert index.search(probe) == [i for i, value in enumerate(values) if hamming(probe, value) <= 3]
+
+
+def test_dhash_ignores_size_but_not_content():
+    gradient = Image.linear_gradient("L").rotate(90)
+    assert dhash(gradient) == dhash(gradient.resize((64, 64)))
+    assert hamming(dhash(gradient), dhash(gradient.transpose(Image.FLIP_LEFT_RIGHT))) > 32
@@ -0,0 +1,52 @@
+import threading
+
+from PIL import Image
+
+from src.decode import _cached_thumbnail
+from src.thumbnails import CACHE_DIRNAME, ThumbnailCache, file_signature
+
+
+def _image(path, size=(64, 48)):
+    Image.new("RGB", size, (200, 40, 40)).save(path)
+    return str(path)
+
+
+def test_thumbnail_cache_round_trip_and_invalidation(tmp_path):
+    path = _image(tmp_path / "a.jpg")
+    cache = ThumbnailCache(str(tmp_path), (32, 32))
+    assert cache.load(path) is None
+    cache.store(path, Image.new("RGB", (32, 24)))
+    assert cache.load(path).size == (32, 24)
+    # A different signature (edited file) misses
+    assert cache.load(path, "0:0") is None
+    assert file_signature(str(tmp_path / "missing.jpg")) is None
+
+
+def test_unwritable_cache_is_disabled_once_per_folder(tmp_path, capsys):
+    # A file where the cache directory should be makes every write fail
+    (tmp_path / CACHE_DIRNAME).write_text("")
+    paths = [_image(tmp_path / f"{i}.jpg") for i in range(3)]
+    for path in paths:
+        img, hit = _cached_thumbnail(path, str(tmp_path), (32, 32), file_signature(path))
+        assert img.mode == "RGB" and not hit
+    assert capsys.readouterr().out.count("Disabling thumbnail cache") == 1
+
+
+def test_concurrent_stores_of_one_entry_do_not_collide(tmp_path):
+    # Worker threads of one process share a pid; their temporary files must not
+    path = _image(tmp_path / "a.jpg")
+    cache = ThumbnailCache(str(tmp_path), (32, 32))
+    barrier = threading.Barrier(8)
+
+    def store():
+        barrier.wait()
+        for _ in range(20):
+            cache.store(path, Image.new("RGB", (32, 24)))
+
+    threads = [threading.Thread(target=store) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.enabled
+    assert cache.load(path).size == (32, 24)
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from PIL import Image
+
+from src.viewer_cache import ViewerPrefetcher
+
+
+def _wait_for(prefetcher: ViewerPrefetcher, path: str, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if path in prefetcher.drain() or path in prefetcher.cache:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_request_after_clear_decodes_path_still_in_flight():
+    release = threading.Event()
+    calls = []
+
+    def decode(path: str) -> Image.Image:
+        calls.append(path)
+        if len(calls) == 1:
+            release.wait(5)
+        return Image.new("RGB", (4, 4))
+
+    prefetcher = ViewerPrefetcher(decode, 1 << 20)
+    try:
+        prefetcher.request(["a.jpg"])
+        while not calls:
+            time.sleep(0.01)
+        prefetcher.clear()
+        prefetcher.request(["a.jpg"])
+        release.set()
+        assert _wait_for(prefetcher, "a.jpg")
+        assert "a.jpg" in prefetcher.cache
+        assert len(calls) == 2
+    finally:
+        release.set()
+        prefetcher.shutdown()
+
+
+def test_request_skips_path_in_flight_for_current_generation():
+    release = threading.Event()
+    calls = []
+
+    def decode(path: str) -> Image.Image:
+        calls.append(path)
+        release.wait(5)
+        return Image.new("RGB", (4, 4))
+
+    prefetcher = ViewerPrefetcher(decode, 1 << 20)
+    try:
+        prefetcher.request(["a.jpg"])
+        prefetcher.request(["a.jpg"])
+        release.set()
+        assert _wait_for(prefetcher, "a.jpg")
+        assert calls == ["a.jpg"]
+    finally:
+        release.set()
+        prefetcher.shutdown()
+
+
+def test_raw_mode_switch_during_refine_decodes_again():
+    # The viewer's RAW mode switch: clear() while a full render of the current image is
+    # running, then ask for that image again
+    release = threading.Event()
+    decodes = []
+
+    def decode(path: str) -> Image.Image:
+        decodes.append(path)
+        return Image.new("RGB", (4, 4))
+
+    def refine(path: str) -> Image.Image:
+        release.wait(5)
+        return Image.new("RGB", (8, 8))
+
+    prefetcher = ViewerPrefetcher(decode, 1 << 20, refine=refine)
+    try:
+        prefetcher.refine("a.nef")
+        prefetcher.clear()
+        prefetcher.request(["a.nef"])
+        assert _wait_for(prefetcher, "a.nef")
+        release.set()
+        assert decodes == ["a.nef"]
+        assert prefetcher.cache.peek("a.nef").size == (4, 4)
+    finally:
+        release.set()
+        prefetcher.shutdown()
@@ -0,0 +1,67 @@
+import random
+
+from src.records import RecordStore
+from src.views import SORT_FILENAME, STATE_LIKED, STATE_NOT_REJECTED, FenwickTree, RecordView
+
+
+def test_fenwick_tree_matches_a_plain_list():
+    rng = random.Random(7)
+    bits = [rng.randint(0, 1) for _ in range(50)]
+    tree = FenwickTree(bits[:20])
+    for bit in bits[20:]:
+        tree.append(bit)
+    for _ in range(200):
+        index = rng.randrange(len(bits))
+        delta = 1 - 2 * bits[index]
+        bits[index] += delta
+        tree.add(index, delta)
+        assert len(tree) == len(bits) and tree.total == sum(bits)
+        assert all(tree.prefix(i) == sum(bits[:i]) for i in range(len(bits) + 1))
+        members = [i for i, bit in enumerate(bits) if bit]
+        assert [tree.find(k) for k in range(len(members))] == members
+
+
+def _store(*selections):
+    store = RecordStore()
+    store.extend([f"/shoot/{name}" for name, _ in selections], [selection for _, selection in selections])
+    return store
+
+
+def test_filter_updates_and_steps_without_rebuild():
+    store = _store(
+        ("c.jpg", (True, False, 5)),
+        ("a.jpg", (False, True, 5)),
+        ("b.jpg", (True, False, 2)),
+        ("d.jpg", (False, False, 5)),
+    )
+    view = RecordView(store, state=STATE_LIKED, score_range=(3, 5))
+    assert [view[i] for i in range(len(view))] == [0]
+
+    store.set_selection(2, True, False, 4)
+    assert view.update(2) and not view.update(2)
+    assert [view[i] for i in range(len(view))] == [0, 2]
+    assert view.position_of(2) == 1 and view.position_of(1) is None
+    assert view.step(2, 1) == 0 and view.step(0, -1) == 2
+    # Stepping from a record the filter just dropped continues from where it was
+    store.set_selection(0, False, False, 5)
+    view.update(0)
+    assert view.step(0, 1) == 2
+
+    view.configure(state=STATE_NOT_REJECTED, score_range=(1, 5), sort=SORT_FILENAME)
+    assert [store[view[i]].filename for i in range(len(view))] == ["b.jpg", "c.jpg", "d.jpg"]
+
+
+def test_collapsed_stacks_show_their_first_passing_frame():
+    store = _store(*[(f"{i}.jpg", (False, False, 5)) for i in range(5)])
+    stacks = {"/shoot/1.jpg": 0, "/shoot/2.jpg": 0, "/shoot/3.jpg": 0}
+    view = RecordView(store, state=STATE_NOT_REJECTED, stack_of=stacks.get, collapse=True)
+    assert [view[i] for i in range(len(view))] == [0, 1, 4]
+    assert view.count == 5 and view.stack_size(2) == 3
+
+    store.set_selection(1, False, True, 5)
+    view.update(1)
+    assert [view[i] for i in range(len(view))] == [0, 2, 4]
+    assert view.stack_size(3) == 2
+
+    view.configure(collapse=False)
+    assert len(view) == view.count == 4
@@ -0,0 +1,57 @@
+import os
+
+from src.scanner import ScanIndex
+from src import watcher as watcher_module
+from src.watcher import FolderWatcher
+
+
+def _write(path, data=b"x"):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_polling_reports_files_rewritten_in_place(tmp_path):
+    path = _write(tmp_path / "a.jpg")
+    watcher = FolderWatcher(str(tmp_path), [path])
+    index = ScanIndex(str(tmp_path)).load()
+    # The first save creates the cache directory, which moves the folder's mtime
+    for _ in range(2):
+        assert watcher._rescan(index, set()).changed == []
+
+    # Same directory entry, new contents: the directory mtime does not move
+    dir_mtime = os.stat(tmp_path).st_mtime_ns
+    with open(path, "ab") as f:
+        f.write(b"more")
+    assert os.stat(tmp_path).st_mtime_ns == dir_mtime
+    assert watcher._rescan(index, set()).changed == [path]
+    assert watcher._rescan(index, set()).changed == []
+
+
+def test_polling_stats_a_rotating_slice_of_loaded_images(tmp_path, monkeypatch):
+    monkeypatch.setattr(watcher_module, "WATCH_STAT_SLICE", 2)
+    paths = [_write(tmp_path / f"{i}.jpg") for i in range(5)]
+    watcher = FolderWatcher(str(tmp_path), paths)
+    index = ScanIndex(str(tmp_path)).load()
+    # Two sweeps of three polls each: the first records signatures, the second compares
+    for _ in range(6):
+        assert watcher._rescan(index, set()).changed == []
+    for path in paths:
+        with open(path, "ab") as f:
+            f.write(b"more")
+    changed = []
+    for _ in range(3):
+        batch = watcher._rescan(index, set()).changed
+        assert len(batch) <= 2
+        changed.extend(batch)
+    assert changed == paths
+
+
+def test_new_files_are_reported_once_settled(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), [])
+    index = ScanIndex(str(tmp_path)).load()
+    path = _write(tmp_path / "b.jpg")
+    assert watcher._rescan(index, set()).added == []
+    changes = watcher._rescan(index, set())
+    assert changes.added == [path] and changes.changed == []
+    os.remove(path)
+    assert watcher._rescan(index, set()).removed == [path]